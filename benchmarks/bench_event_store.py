@@ -0,0 +1,75 @@
+"""Memory per recorded event: plain ``Event`` list vs. ``Reporter``'s ``EventStore``.
+
+Usage: python benchmarks/bench_event_store.py [--events N]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from datetime import UTC, datetime
+
+from costcutter.reporter import Event, Reporter
+
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "ap-south-1"]
+ACTIONS = ["catalog", "delete", "terminate", "confirm"]
+
+
+def _events(n: int):
+    for i in range(n):
+        region = REGIONS[i % len(REGIONS)]
+        yield (
+            region,
+            "ec2",
+            "instance",
+            ACTIONS[i % len(ACTIONS)],
+            f"arn:aws:ec2:{region}:123456789012:instance/i-{i:017x}",
+            {"status": "executing", "dry_run": False},
+        )
+
+
+def _measure(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    keep = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return current
+
+
+def bench_event_list(n: int) -> int:
+    def build():
+        # The layout Reporter used before the columnar store
+        return [
+            Event(datetime.now(UTC).isoformat(), region, service, resource, action, arn, dict(meta))
+            for region, service, resource, action, arn, meta in _events(n)
+        ]
+
+    return _measure(build)
+
+
+def bench_event_store(n: int) -> int:
+    def build():
+        reporter = Reporter()
+        for region, service, resource, action, arn, meta in _events(n):
+            reporter.record(region, service, resource, action, arn=arn, meta=dict(meta))
+        return reporter
+
+    return _measure(build)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.events
+    baseline = bench_event_list(n)
+    store = bench_event_store(n)
+    print(f"events: {n}")
+    print(f"list[Event]: {baseline / n:8.1f} bytes/event ({baseline / 2**20:.1f} MiB)")
+    print(f"EventStore:  {store / n:8.1f} bytes/event ({store / 2**20:.1f} MiB)")
+    print(f"reduction:   {baseline / store:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
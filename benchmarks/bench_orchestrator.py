@@ -0,0 +1,187 @@
+"""End-to-end orchestrate_services throughput against the in-memory fake AWS backend.
+
+Runs a real (not dry-run) teardown for every combination of region count,
+service selection and worker count, and measures resources deleted per
+second, time to the first delete, peak thread count and peak traced memory.
+The fake backend lives in tests/fake_aws.py; no network access is needed.
+Results are written as JSON; pass an earlier file as --baseline to print the
+change in throughput per case.
+
+Usage: python benchmarks/bench_orchestrator.py [--regions 1 4 16] [--workers 4 16 64] [--services ec2]
+       [--instances N] [--key-pairs N] [--latency S] [--throttle-rate P] [--page-size N]
+       [--output FILE] [--baseline FILE] [--no-memory]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+
+from fake_aws import FakeAWS  # noqa: E402
+
+from costcutter import orchestrator  # noqa: E402
+from costcutter import reporter as reporter_mod  # noqa: E402
+from costcutter.conf import config as config_mod  # noqa: E402
+from costcutter.conf.config import Config  # noqa: E402
+from costcutter.core.clients import get_client_registry  # noqa: E402
+from costcutter.reporter import Reporter  # noqa: E402
+
+DELETE_ACTIONS = frozenset({"terminate", "delete"})
+REGION_NAMES = [f"{geo}-{n}" for n in range(1, 9) for geo in ("us-east", "eu-west", "ap-south", "sa-east")]
+
+
+class _PeakThreads:
+    """Sample the live thread count until stopped."""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self) -> "_PeakThreads":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _run_case(args, regions: int, services: str, workers: int, trace_memory: bool) -> dict:
+    fake = FakeAWS(
+        REGION_NAMES[:regions],
+        instances=args.instances,
+        key_pairs=args.key_pairs,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        page_size=args.page_size,
+    )
+    config_mod._settings = Config({
+        "aws": {
+            "services": services.split(","),
+            "region": list(fake.regions),
+            "max_workers": workers,
+            "rate_limit": {"requests_per_second": args.rate, "burst": args.rate},
+            "region_cache": {"enabled": False},
+        },
+        "journal": {"enabled": False},
+    })
+    orchestrator.create_aws_session = lambda config: fake.session()
+    get_client_registry().clear()
+    reporter = reporter_mod._reporter = Reporter()
+    first_delete: list[float] = []
+
+    def _watch(rec: tuple) -> None:
+        if not first_delete and rec[5] in DELETE_ACTIONS:
+            first_delete.append(time.perf_counter())
+
+    reporter.forward(_watch)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with _PeakThreads() as threads:
+        summary = orchestrator.orchestrate_services(dry_run=False)
+    elapsed = time.perf_counter() - started
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    left = fake.remaining()
+    deleted = regions * (args.instances + args.key_pairs) - left["instances"] - left["key_pairs"]
+    return {
+        "regions": regions,
+        "services": services,
+        "workers": workers,
+        "resources": deleted,
+        "seconds": round(elapsed, 4),
+        "resources_per_s": round(deleted / elapsed, 1),
+        "first_delete_s": round(first_delete[0] - started, 4) if first_delete else None,
+        "peak_threads": threads.peak,
+        "peak_memory_mb": round(peak_memory / 2**20, 2) if peak_memory is not None else None,
+        "calls": sum(fake.calls.values()),
+        "throttled": summary["throttled"],
+        "failed": summary["failed"],
+    }
+
+
+def _case_key(result: dict) -> tuple:
+    return result["regions"], result["services"], result["workers"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--services", nargs="+", default=["ec2"], help="comma-separated aws.services per case")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--instances", type=int, default=2000, help="instances per region")
+    parser.add_argument("--key-pairs", type=int, default=50, help="key pairs per region")
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds per fake API call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of fake API calls throttled")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=100_000.0, help="aws.rate_limit requests per second and burst")
+    parser.add_argument("--output", type=Path, default=Path("bench_orchestrator.json"))
+    parser.add_argument("--baseline", type=Path, help="earlier --output file to compare throughput with")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args()
+    if max(args.regions) > len(REGION_NAMES):
+        parser.error(f"at most {len(REGION_NAMES)} regions")
+    baseline = {}
+    if args.baseline:
+        baseline = {_case_key(r): r for r in json.loads(args.baseline.read_text())["results"]}
+
+    print(
+        f"{'regions':>7} {'services':>10} {'workers':>7} {'res/s':>10} {'first del':>10} {'threads':>7} {'MiB':>7} {'vs base':>8}"
+    )
+    results = []
+    for regions, services, workers in itertools.product(args.regions, args.services, args.workers):
+        result = _run_case(args, regions, services, workers, trace_memory=False)
+        if not args.no_memory:
+            # tracemalloc slows every allocation, so memory gets its own pass
+            result["peak_memory_mb"] = _run_case(args, regions, services, workers, trace_memory=True)["peak_memory_mb"]
+        results.append(result)
+        base = baseline.get(_case_key(result))
+        change = f"{result['resources_per_s'] / base['resources_per_s'] - 1:+.0%}" if base else "-"
+        first = f"{result['first_delete_s']:.3f}s" if result["first_delete_s"] is not None else "-"
+        mem = f"{result['peak_memory_mb']:.1f}" if result["peak_memory_mb"] is not None else "-"
+        print(
+            f"{regions:>7} {services:>10} {workers:>7} {result['resources_per_s']:>10,.0f} {first:>10}"
+            f" {result['peak_threads']:>7} {mem:>7} {change:>8}"
+        )
+
+    args.output.write_text(
+        json.dumps(
+            {
+                "benchmark": "orchestrator",
+                "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "params": {
+                    k: getattr(args, k)
+                    for k in ("instances", "key_pairs", "latency", "throttle_rate", "page_size", "rate")
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+        + "\n"
+    )
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Teardown throughput of the thread engine vs. the process engine as CPU cores are added.
+
+Each (account, region) shard runs a synthetic handler that does what dominates
+a large real run once network latency is hidden by concurrency: parsing
+DescribeInstances-sized JSON pages and recording one event per instance.
+No AWS calls are made.
+
+Usage: python benchmarks/bench_process_engine.py [--regions N] [--pages N] [--processes 1 2 4]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from costcutter.core.dag import ResourceHandler
+from costcutter.core.journal import Journal
+from costcutter.core.organizations import Account
+from costcutter.orchestrator import RESOURCE_HANDLERS, RunSettings, _run_threaded
+from costcutter.process_engine import run_sharded
+from costcutter.reporter import get_reporter
+
+INSTANCES_PER_PAGE = 1000
+ACCOUNT = "123456789012"
+_PAGE = json.dumps({
+    "Reservations": [
+        {
+            "Instances": [
+                {
+                    "InstanceId": f"i-{n:017x}",
+                    "State": {"Code": 16, "Name": "running"},
+                    "InstanceType": "t3.micro",
+                    "Tags": [{"Key": "Name", "Value": f"bench-{n}"}, {"Key": "team", "Value": "platform"}],
+                    "BlockDeviceMappings": [{"DeviceName": "/dev/xvda", "Ebs": {"VolumeId": f"vol-{n:017x}"}}],
+                }
+                for n in range(INSTANCES_PER_PAGE)
+            ]
+        }
+    ]
+})
+DEFAULT_PAGES = 20
+
+
+def _bench_instances(session, region, dry_run, scheduler):
+    reporter = get_reporter()
+    # Read per call: worker processes inherit the environment, not main()'s arguments
+    for _ in range(int(os.environ.get("BENCH_PAGES", DEFAULT_PAGES))):
+        for reservation in json.loads(_PAGE)["Reservations"]:
+            for inst in reservation["Instances"]:
+                reporter.record(
+                    region,
+                    "ec2",
+                    "instance",
+                    "catalog",
+                    arn=f"arn:aws:ec2:{region}:{ACCOUNT}:instance/{inst['InstanceId']}",
+                    meta={"status": "discovered", "dry_run": dry_run},
+                )
+
+
+# Registered at import time so spawned worker processes, which import this module, see it too
+RESOURCE_HANDLERS["bench"] = {"instances": ResourceHandler(_bench_instances)}
+
+_CONFIG = {
+    "logging": {"enabled": False},
+    "journal": {"enabled": False},
+    "aws": {"aws_access_key_id": "AKIDBENCHMARK", "aws_secret_access_key": "benchmark"},
+}
+
+
+def _settings(regions: int) -> RunSettings:
+    return RunSettings(
+        dry_run=True,
+        service_keys=("bench",),
+        nodes_by_region={f"region-{r}": ["bench.instances"] for r in range(regions)},
+        max_workers=regions,
+    )
+
+
+def _measure(run) -> tuple[float, int]:
+    reporter = get_reporter()
+    reporter.clear()
+    started = time.perf_counter()
+    run()
+    count = reporter.count()
+    return time.perf_counter() - started, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=8, help="shards (one account, N regions)")
+    parser.add_argument(
+        "--pages", type=int, default=DEFAULT_PAGES, help=f"pages of {INSTANCES_PER_PAGE} instances per shard"
+    )
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+    os.environ["BENCH_PAGES"] = str(args.pages)
+    settings = _settings(args.regions)
+    accounts = [Account(ACCOUNT)]
+
+    print(f"{args.regions} shards x {args.pages * INSTANCES_PER_PAGE:,} instances, {os.cpu_count()} CPU(s)")
+    print(f"{'engine':>18} {'seconds':>8} {'events/s':>12} {'speedup':>8}")
+    base, events = _measure(lambda: _run_threaded(settings, None, object(), accounts, 1, None, Journal(), None))
+    print(f"{'threads':>18} {base:>8.2f} {events / base:>12,.0f} {1.0:>7.2f}x")
+    for processes in sorted(set(args.processes)):
+        elapsed, count = _measure(lambda p=processes: run_sharded(settings, _CONFIG, accounts, max_processes=p))
+        assert count == events, (count, events)
+        label = f"processes={processes}"
+        print(f"{label:>18} {elapsed:>8.2f} {count / elapsed:>12,.0f} {base / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Protection lookups: ``ProtectionIndex`` vs. matching every rule in turn.
+
+Usage: python benchmarks/bench_protection.py [--rules N] [--lookups N] [--naive-lookups N]
+"""
+
+import argparse
+import random
+import time
+from fnmatch import fnmatchcase
+
+from costcutter.core.protection import ProtectionIndex
+
+ACCOUNT = "123456789012"
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "ap-south-1"]
+
+
+def _arn(rng: random.Random, kind: str = "instance") -> str:
+    return f"arn:aws:ec2:{rng.choice(REGIONS)}:{ACCOUNT}:{kind}/i-{rng.getrandbits(68):017x}"
+
+
+def _rules(n: int, rng: random.Random) -> tuple[list[str], dict[str, list[str]]]:
+    """Mostly exact ARNs, plus name prefixes in any region and a few mid-string wildcards and tag rules."""
+    arns = [_arn(rng) for _ in range(n * 8 // 10)]
+    while len(arns) < n:
+        name = f"key-{rng.getrandbits(32):08x}"
+        shape = rng.random()
+        if shape < 0.45:
+            arns.append(f"arn:aws:ec2:{rng.choice(REGIONS)}:{ACCOUNT}:key-pair/{name}*")
+        elif shape < 0.9:
+            arns.append(f"arn:aws:ec2:*:{ACCOUNT}:key-pair/{name}*")
+        else:
+            arns.append(f"arn:aws:ec2:{rng.choice(REGIONS)}:{ACCOUNT}:key-pair/{name[:6]}?{name[7:]}*")
+    tags = {"protected": ["*"], "role": ["bastion", "ci", "state"]}
+    return arns, tags
+
+
+def _lookups(n: int, rules: list[str], rng: random.Random) -> list[str]:
+    exact = [r for r in rules if "*" not in r and "?" not in r]
+    # A quarter of the lookups hit an exact rule, the rest are (almost all) misses
+    return [rng.choice(exact) if rng.random() < 0.25 else _arn(rng) for _ in range(n)]
+
+
+def bench_index(index: ProtectionIndex, arns: list[str]) -> tuple[float, int]:
+    reason = index.reason
+    started = time.perf_counter()
+    hits = sum(reason(arn) is not None for arn in arns)
+    return time.perf_counter() - started, hits
+
+
+def bench_naive(rules: list[str], arns: list[str]) -> tuple[float, int]:
+    started = time.perf_counter()
+    hits = sum(any(fnmatchcase(arn, rule) for rule in rules) for arn in arns)
+    return time.perf_counter() - started, hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2_000_000)
+    parser.add_argument("--naive-lookups", type=int, default=2000, help="the linear scan is far slower")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    rules, tags = _rules(args.rules, rng)
+    started = time.perf_counter()
+    index = ProtectionIndex(rules, tags)
+    build = time.perf_counter() - started
+    arns = _lookups(args.lookups, rules, rng)
+    seconds, hits = bench_index(index, arns)
+    naive_arns = arns[: args.naive_lookups]
+    naive_seconds, naive_hits = bench_naive(rules, naive_arns)
+    index_hits = sum(index.reason(arn) is not None for arn in naive_arns)
+    assert naive_hits == index_hits, (naive_hits, index_hits)
+    per_index = seconds / len(arns)
+    per_naive = naive_seconds / len(naive_arns)
+    print(f"rules: {len(index)} ({args.rules} ARN rules), index built in {build * 1000:.1f} ms")
+    print(f"index:  {len(arns):>9} lookups {seconds:7.2f} s  {per_index * 1e6:8.2f} us/lookup  ({hits} protected)")
+    print(f"linear: {len(naive_arns):>9} lookups {naive_seconds:7.2f} s  {per_naive * 1e6:8.2f} us/lookup")
+    print(f"speedup: {per_naive / per_index:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
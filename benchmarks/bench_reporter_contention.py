@@ -0,0 +1,78 @@
+"""Reporter.record throughput under contention: single global lock vs. per-thread buffers.
+
+Usage: python benchmarks/bench_reporter_contention.py [--events N] [--threads 1 8 32]
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter, deque
+
+from costcutter.reporter import TAIL_SIZE, Event, EventStore, Reporter, _format_timestamp
+
+
+class SingleLockReporter:
+    """The previous design: build the Event, then update every structure under one lock."""
+
+    def __init__(self) -> None:
+        self._store = EventStore()
+        self._tail: deque[Event] = deque(maxlen=TAIL_SIZE)
+        self._counts: Counter[tuple[str, str, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, region, service, resource, action, arn=None, meta=None) -> None:
+        ts_us = time.time_ns() // 1000
+        evt = Event(_format_timestamp(ts_us), region, service, resource, action, arn, meta or {})
+        with self._lock:
+            self._store.append(ts_us, region, service, resource, action, arn, evt.meta)
+            self._tail.append(evt)
+            self._counts[(service, resource, action)] += 1
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._store)
+
+
+def _run(reporter, threads: int, per_thread: int) -> tuple[float, float]:
+    """Return (seconds until every worker finished recording, seconds including the merge)."""
+    barrier = threading.Barrier(threads + 1)
+    meta = {"status": "executing", "dry_run": False}
+
+    def work() -> None:
+        barrier.wait()
+        for i in range(per_thread):
+            reporter.record("us-east-1", "ec2", "instance", "delete", arn=f"arn:{i}", meta=meta)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    recorded = time.perf_counter() - started
+    # The merge is what readers pay to make the events visible
+    assert reporter.count() == threads * per_thread
+    return recorded, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=400_000, help="total events per measurement")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    print("events/s while recording (workers) and including the final merge (readers)")
+    print(f"{'threads':>7} {'single lock':>14} {'sharded':>14} {'speedup':>8} {'w/ merge':>9}")
+    for threads in args.threads:
+        per_thread = max(1, args.events // threads)
+        total = per_thread * threads
+        single_rec, single_all = _run(SingleLockReporter(), threads, per_thread)
+        sharded_rec, sharded_all = _run(Reporter(), threads, per_thread)
+        print(
+            f"{threads:>7} {total / single_rec:>10,.0f} ev/s {total / sharded_rec:>10,.0f} ev/s"
+            f" {single_rec / sharded_rec:>7.2f}x {single_all / sharded_all:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
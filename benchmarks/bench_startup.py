@@ -0,0 +1,101 @@
+"""CLI startup cost: import time, ``--help`` latency and time to the first AWS API call.
+
+Each measurement runs in a fresh interpreter. The first-API-call run uses
+dummy credentials and exits from inside botocore as soon as the first request
+would be sent, so no network access is needed.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--json PATH]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_FIRST_CALL = """
+import os, sys, time
+import botocore.client
+
+def _first_call(self, operation_name, api_params):
+    print(operation_name, flush=True)
+    os._exit(0)
+
+botocore.client.BaseClient._make_api_call = _first_call
+from costcutter.cli import app
+sys.argv = ["costcutter", "--dry-run", "--config", sys.argv[1]]
+app()
+"""
+
+_CONFIG = """
+logging:
+  enabled: false
+aws:
+  profile: ""
+  aws_access_key_id: AKIDBENCHMARK
+  aws_secret_access_key: benchmark
+  region_cache:
+    enabled: false
+  region:
+    - us-east-1
+  services:
+    - ec2
+"""
+
+
+def _wall(args: list[str]) -> tuple[float, str]:
+    started = time.perf_counter()
+    out = subprocess.run(args, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - started, out
+
+
+def import_time_ms() -> float:
+    """Cumulative ``-X importtime`` cost of ``costcutter.cli``, in milliseconds."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import costcutter.cli"], capture_output=True, text=True, check=True
+    ).stderr
+    match = re.search(r"\|\s*(\d+)\s*\|\s*costcutter\.cli\s*$", err, re.MULTILINE)
+    return int(match.group(1)) / 1000 if match else float("nan")
+
+
+def help_ms() -> float:
+    return _wall([sys.executable, "-m", "costcutter.cli", "--help"])[0] * 1000
+
+
+def first_api_call_ms(config: Path) -> tuple[float, str]:
+    elapsed, out = _wall([sys.executable, "-c", _FIRST_CALL, str(config)])
+    lines = out.strip().splitlines()
+    return elapsed * 1000, lines[-1] if lines else "?"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="also write the medians to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Path(tmp) / "config.yaml"
+        config.write_text(_CONFIG)
+        imports = [import_time_ms() for _ in range(args.repeat)]
+        helps = [help_ms() for _ in range(args.repeat)]
+        calls = [first_api_call_ms(config) for _ in range(args.repeat)]
+
+    results = {
+        "import_costcutter_cli_ms": round(statistics.median(imports), 1),
+        "help_ms": round(statistics.median(helps), 1),
+        "first_api_call_ms": round(statistics.median(c[0] for c in calls), 1),
+        "first_api_call": calls[0][1],
+    }
+    for key, value in results.items():
+        print(f"{key:>26}: {value}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,25 @@
-from costcutter.conf.config import get_config
-from costcutter.logger import setup_logging
-from costcutter.main import run
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from costcutter.conf.config import get_config
+    from costcutter.logger import setup_logging
+    from costcutter.main import run
 
 __all__ = ["run", "get_config", "setup_logging"]
+
+# Resolved on first access so importing the package (e.g. for the CLI) does not import boto3
+_LAZY = {
+    "run": "costcutter.main",
+    "get_config": "costcutter.conf.config",
+    "setup_logging": "costcutter.logger",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'costcutter' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
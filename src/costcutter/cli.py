@@ -4,19 +4,28 @@ from __future__ import annotations
 import threading
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
-from pyfiglet import Figlet
-from rich.console import Console
-from rich.live import Live
-from rich.table import Table
 
-from costcutter.conf.config import get_config
-from costcutter.logger import setup_logging
-from costcutter.orchestrator import orchestrate_services
-from costcutter.reporter import get_reporter
+# boto3, rich, pyfiglet and the config loader are imported where they are used, so
+# `costcutter --help` and argument errors do not pay for them (see benchmarks/bench_startup.py)
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.progress import Progress, TaskID
+    from rich.table import Table
+
+    from costcutter.progress import RunProgress
 
 TAIL_COUNT = 10  # number of most recent events to display
+API_ROWS = 10  # slowest API operations shown in the summary
+MAX_FPS = 4  # upper bound on live redraws per second
+PLAIN_INTERVAL = 2.0  # seconds between progress lines when not on a terminal
+BANNER_TEXT = "CostCutter"
+BANNER_FONT = "slant"
+# Rendering the Figlet banner costs more than the rest of startup, so it is rendered once
+BANNER_CACHE = f"~/.cache/costcutter/banner-{BANNER_FONT}.txt"
+CREDIT_LINE = "Author: HYP3R00T  GitHub: https://github.com/HYP3R00T  Site: https://hyperoot.dev"
 
 
 def _render_table(reporter, dry_run: bool) -> Table:
@@ -25,9 +34,12 @@ def _render_table(reporter, dry_run: bool) -> Table:
     Adds a placeholder row while no events have been recorded yet so the
     interface never appears visually "empty" and communicates dry-run mode.
     """
+    from rich.table import Table
+
     mode = "DRY-RUN" if dry_run else "EXECUTE"
-    all_events = reporter.snapshot()
-    events = all_events[-TAIL_COUNT:]
+    # Bounded tail and running total: cost does not grow with the number of events
+    events = reporter.tail(TAIL_COUNT)
+    total = reporter.count()
     table = Table(title=f"CostCutter — Live events ({mode}, last {TAIL_COUNT})")
     table.add_column("Time", no_wrap=True, style="dim")
     table.add_column("Region", style="cyan")
@@ -36,7 +48,7 @@ def _render_table(reporter, dry_run: bool) -> Table:
     table.add_column("Action", style="yellow")
     table.add_column("ID", overflow="fold")
     table.add_column("Meta", overflow="fold")
-    if not all_events:
+    if not events:
         # Placeholder row communicates status instead of an empty table body
         table.add_row(
             "-",
@@ -48,8 +60,8 @@ def _render_table(reporter, dry_run: bool) -> Table:
             "No resource events yet (dry run)" if dry_run else "No resource events yet",
         )
         return table
-    if len(all_events) > TAIL_COUNT:
-        table.caption = f"Showing last {TAIL_COUNT} of {len(all_events)} events"
+    if total > TAIL_COUNT:
+        table.caption = f"Showing last {TAIL_COUNT} of {total} events"
 
     for e in events:
         meta = ""
@@ -70,119 +82,316 @@ def _render_table(reporter, dry_run: bool) -> Table:
     return table
 
 
-def _render_summary_table(reporter, dry_run: bool) -> Table:
+def _render_summary_table(reporter, dry_run: bool, stats: dict | None = None) -> Table:
     """Render an aggregated summary of all recorded events.
 
-    Groups by (service, resource, action) and counts occurrences.
+    Uses the reporter's running counts per (service, resource, action), per
+    account as well when events of several accounts were recorded. When
+    run stats from the orchestrator are given, AWS client reuse is added to
+    the caption.
     """
-    events = reporter.snapshot()
+    from rich.table import Table
+
+    counts = reporter.counts()
     mode = "DRY-RUN" if dry_run else "EXECUTE"
     table = Table(title=f"CostCutter — Summary ({mode})")
+    by_account = reporter.counts_by_account()
+    # Break the counts down per account only when the run spanned several
+    multi_account = len({key[0] for key in by_account}) > 1
+    if multi_account:
+        table.add_column("Account", style="cyan")
     table.add_column("Service", style="magenta")
     table.add_column("Resource", style="green")
     table.add_column("Action", style="yellow")
     table.add_column("Count", justify="right")
-    if not events:
-        table.add_row("-", "-", "-", "0")
+    if not counts:
+        table.add_row(*["-"] * (len(table.columns) - 1), "0")
         return table
-    counts: dict[tuple[str, str, str], int] = {}
-    for e in events:
-        key = (
-            getattr(e, "service", ""),
-            getattr(e, "resource", ""),
-            getattr(e, "action", ""),
+    rows = by_account if multi_account else counts
+    for key in sorted(rows):
+        table.add_row(*(k or "-" for k in key), str(rows[key]))
+    table.caption = f"Total events: {sum(counts.values())}"
+    if stats:
+        table.caption += (
+            f" | AWS clients: {stats.get('clients_created', 0)} created"
+            f" ({stats.get('client_create_ms', 0)} ms), {stats.get('client_cache_hits', 0)} cache hits"
         )
-        counts[key] = counts.get(key, 0) + 1
-    for svc, res, act in sorted(counts.keys()):
-        table.add_row(svc, res, act, str(counts[(svc, res, act)]))
-    table.caption = f"Total events: {len(events)}"
+        if stats.get("unchanged"):
+            table.caption += f" | Unchanged since last run: {stats['unchanged']}"
     return table
 
 
-def run_cli(dry_run: bool | None = None, config_file: Path | None = None) -> None:
-    """Run the costcutter CLI with a live updating event tail and final summary.
+def _render_api_table(metrics) -> Table | None:
+    """Render per-(region, service, operation) call metrics, slowest total first.
 
-    The CLI now always shows the Rich live progress UI; simplified per design change.
+    Latency quantiles are histogram estimates (the upper bound of the bucket
+    the quantile falls in). Returns ``None`` when no AWS call was made.
     """
-    overrides = {"dry_run": dry_run}
-    config = get_config(cli_args=overrides, config_file=config_file)
-    setup_logging(config)
+    from rich.table import Table
 
-    dry_run_eff = dry_run if dry_run is not None else getattr(config, "dry_run", True)
+    rows = metrics.rows()
+    if not rows:
+        return None
+    table = Table(title="AWS API calls")
+    table.add_column("Region", style="cyan")
+    table.add_column("Service", style="magenta")
+    table.add_column("Operation", style="green")
+    for column in ("Calls", "p50 ms", "p95 ms", "Max ms", "Total s", "Retries", "Throttled", "Errors", "KiB"):
+        table.add_column(column, justify="right")
+    for (region, service, operation), stats in rows[:API_ROWS]:
+        table.add_row(
+            region,
+            service,
+            operation,
+            str(stats.calls),
+            f"{stats.quantile(0.5) * 1000:.0f}",
+            f"{stats.quantile(0.95) * 1000:.0f}",
+            f"{stats.max_seconds * 1000:.0f}",
+            f"{stats.seconds:.2f}",
+            str(stats.retries),
+            str(stats.throttles),
+            str(stats.errors),
+            f"{stats.response_bytes / 1024:.1f}",
+        )
+    if len(rows) > API_ROWS:
+        table.caption = f"Top {API_ROWS} of {len(rows)} operations by total time"
+    return table
 
-    console = Console()
 
-    banner_text = "CostCutter"
-    credit_line = "Author: HYP3R00T  GitHub: https://github.com/HYP3R00T  Site: https://hyperoot.dev"
+def _render_progress(bars: Progress, task_ids: dict[str, TaskID], run_progress: RunProgress) -> None:
+    """Sync one progress bar per region with the orchestrator's task counts."""
+    for region, (done, failed, total) in run_progress.snapshot().items():
+        task_id = task_ids.get(region)
+        if task_id is None:
+            task_id = task_ids[region] = bars.add_task(region, total=total)
+        label = f"{region} [red]({failed} failed)[/red]" if failed else region
+        bars.update(task_id, completed=done, total=total, description=label)
 
-    # Clear screen and show banner + credits once
+
+def _progress_line(reporter, run_progress: RunProgress) -> str:
+    """One compact line of run progress for non-interactive output."""
+    regions = run_progress.snapshot()
+    done = sum(d for d, _, _ in regions.values())
+    failed = sum(f for _, f, _ in regions.values())
+    total = sum(t for _, _, t in regions.values())
+    line = f"progress: {done}/{total} tasks, {reporter.count()} events"
+    if failed:
+        line += f", {failed} failed"
+    return line
+
+
+def _wait_for_change(wake: threading.Event, done: threading.Event, min_interval: float, last: float) -> None:
+    """Block until something changed, but never return sooner than ``min_interval`` after ``last``."""
+    while not wake.wait(timeout=0.5) and not done.is_set():
+        pass
+    delay = last + min_interval - time.monotonic()
+    if delay > 0 and not done.is_set():
+        time.sleep(delay)
+    wake.clear()
+
+
+def _run_live(console: Console, reporter, run_progress: RunProgress, dry_run: bool, wake, done) -> None:
+    """Redraw the progress bars and event tail whenever something changed, at most ``MAX_FPS`` times a second."""
+    from rich.console import Group
+    from rich.live import Live
+    from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
+
+    bars = Progress(
+        TextColumn("{task.description}", style="cyan"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console,
+        auto_refresh=False,
+    )
+    task_ids: dict[str, TaskID] = {}
+    last = 0.0
+    live_view = Live(Group(bars, _render_table(reporter, dry_run)), auto_refresh=False, transient=True, console=console)
+    with live_view as live:
+        while True:
+            finished = done.is_set()
+            _wait_for_change(wake, done, 1 / MAX_FPS, last)
+            _render_progress(bars, task_ids, run_progress)
+            live.update(Group(bars, _render_table(reporter, dry_run)), refresh=True)
+            last = time.monotonic()
+            if finished:
+                return
+
+
+def _run_plain(console: Console, reporter, run_progress: RunProgress, wake, done) -> None:
+    """Print a progress line when something changed, at most every ``PLAIN_INTERVAL`` seconds."""
+    last = 0.0
+    printed = ""
+    while True:
+        finished = done.is_set()
+        _wait_for_change(wake, done, PLAIN_INTERVAL, last)
+        line = _progress_line(reporter, run_progress)
+        if line != printed:
+            console.print(line, highlight=False)
+            printed = line
+        last = time.monotonic()
+        if finished:
+            return
+
+
+def _banner() -> str | None:
+    """Return the Figlet banner, rendered once and then read from ``BANNER_CACHE``."""
+    cache = Path(BANNER_CACHE).expanduser()
     try:
-        console.clear()
+        return cache.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    try:
+        from pyfiglet import Figlet
+
+        rendered = Figlet(font=BANNER_FONT).renderText(BANNER_TEXT)
     except Exception:
-        print("\033c", end="")
+        return None
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        cache.write_text(rendered, encoding="utf-8")
+    except OSError:
+        pass
+    return rendered
 
-    fig_rendered: str | None = None
+
+def _print_banner(console: Console) -> None:
+    if not console.is_terminal:
+        console.print(f"{BANNER_TEXT} — {CREDIT_LINE}", highlight=False)
+        return
     try:
-        fig = Figlet(font="slant")
-        fig_rendered = fig.renderText(banner_text)
+        console.clear()
     except Exception:
-        fig_rendered = None
-
+        print("\033c", end="")
+    fig_rendered = _banner()
     if fig_rendered:
         console.print(f"[bold cyan]{fig_rendered}[/bold cyan]")
     else:
-        console.print(f"[bold]{banner_text}[/bold]")
-    console.print(f"{credit_line}\n")
+        console.print(f"[bold]{BANNER_TEXT}[/bold]")
+    console.print(f"{CREDIT_LINE}\n")
+
+
+def run_cli(
+    dry_run: bool | None = None,
+    config_file: Path | None = None,
+    incremental: bool = False,
+    resume: bool = False,
+    metrics_file: Path | None = None,
+    trace_file: Path | None = None,
+    discard_journal: bool = False,
+) -> None:
+    """Run the costcutter CLI with live progress and a final summary.
+
+    On a terminal, per-region progress bars and the event tail are redrawn
+    when the reporter or the task counts change, at most ``MAX_FPS`` times a
+    second. Otherwise (CI, pipes) compact progress lines are printed instead.
+    With ``incremental``, only resources that are new or changed since the
+    last inventory snapshot are processed. With ``resume``, an interrupted
+    real run is continued from its journal; with ``discard_journal``, a
+    real run starts over even if that journal holds an unfinished run.
+    Per-call AWS API metrics are
+    summarised after the events and, with ``metrics_file`` (or
+    ``metrics.openmetrics_path``), written as OpenMetrics text. With
+    ``trace_file``, the run's spans are written there as a Chrome trace.
+    """
+    from rich.console import Console
+
+    from costcutter.conf.config import get_config
+    from costcutter.core.metrics import get_api_metrics
+    from costcutter.core.tracing import start_tracing, stop_tracing
+    from costcutter.logger import setup_logging
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.progress import RunProgress
+    from costcutter.reporter import get_reporter
+    from costcutter.sinks import attach_sinks
+
+    overrides = {"dry_run": dry_run}
+    config = get_config(cli_args=overrides, config_file=config_file)
+    setup_logging(config)
+
+    dry_run_eff = dry_run if dry_run is not None else getattr(config, "dry_run", True)
+
+    console = Console()
+    # Banner and credits are printed once; the live view below it is transient
+    _print_banner(console)
 
     reporter = get_reporter()
+    attach_sinks(reporter, config)
+    run_progress = RunProgress()
 
-    # Orchestrator runs in separate thread so Live table can update on main thread
+    # Set on every reporter/progress change and when the orchestrator finishes
+    wake = threading.Event()
+    done = threading.Event()
+    reporter.subscribe(wake)
+    run_progress.subscribe(wake)
+
+    # Orchestrator runs in separate thread so the view can update on main thread
     orchestrator_exc: list[Exception] = []
+    run_stats: dict = {}
 
     def _run_orchestrator():
         try:
-            orchestrate_services(dry_run=dry_run_eff)
+            run_stats.update(
+                orchestrate_services(
+                    dry_run=dry_run_eff,
+                    progress=run_progress,
+                    incremental=incremental,
+                    resume=resume,
+                    discard_journal=discard_journal,
+                )
+                or {}
+            )
         except Exception as exc:
             orchestrator_exc.append(exc)
+        finally:
+            done.set()
+            wake.set()
 
+    if trace_file:
+        start_tracing()
     orb_thread = threading.Thread(target=_run_orchestrator, daemon=True)
     orb_thread.start()
 
     try:
-        # Rich live table path (always enabled now)
-        with Live(_render_table(reporter, dry_run_eff), refresh_per_second=4, console=console) as live:
-            while orb_thread.is_alive():
-                live.update(_render_table(reporter, dry_run_eff))
-                time.sleep(0.25)
-            # final update
-            live.update(_render_table(reporter, dry_run_eff))
+        if console.is_terminal:
+            _run_live(console, reporter, run_progress, dry_run_eff, wake, done)
+        else:
+            _run_plain(console, reporter, run_progress, wake, done)
     except KeyboardInterrupt:
         console.print("\nInterrupted by user. Waiting for tasks to stop...")
     finally:
+        reporter.unsubscribe(wake)
         orb_thread.join(timeout=5)
-        if orchestrator_exc:
-            # re-raise first exception
-            raise orchestrator_exc[0]
-        # final summary: clear screen, show banner again, then summary only
-        try:
-            console.clear()
-        except Exception:
-            print("\033c", end="")
-        if fig_rendered:
-            console.print(f"[bold cyan]{fig_rendered}[/bold cyan]")
-        else:
-            console.print(f"[bold]{banner_text}[/bold]")
-        console.print(credit_line + "\n")
-        console.print(_render_summary_table(reporter, dry_run_eff))
+        if orb_thread.is_alive():
+            from costcutter.core.journal import get_journal
+
+            # The worker threads die with the process: keep what they completed so far
+            get_journal().flush()
+            console.print("Completed deletions are journaled; rerun with --resume to continue.")
+        # Written even when the run failed or was interrupted: that is when the timeline helps most
+        tracer = stop_tracing()
+        if trace_file and tracer is not None:
+            console.print(f"[green]Trace written to:[/green] {tracer.write(trace_file)} ({len(tracer)} spans)")
         try:
-            reporting_cfg = getattr(config, "reporting", None)
-            csv_cfg = getattr(reporting_cfg, "csv", None) if reporting_cfg else None
-            if csv_cfg and getattr(csv_cfg, "enabled", False):
-                path = getattr(csv_cfg, "path", "./events.csv")
-                saved = reporter.write_csv(path)
-                console.print(f"[green]Events exported to CSV:[/green] {saved}")
-        except Exception as exc:
-            console.print(f"[red]Failed to write CSV report: {exc}[/red]")
+            if orchestrator_exc:
+                # re-raise first exception
+                raise orchestrator_exc[0]
+            console.print(_render_summary_table(reporter, dry_run_eff, run_stats))
+            metrics = get_api_metrics()
+            api_table = _render_api_table(metrics)
+            if api_table is not None:
+                console.print(api_table)
+            metrics_path = metrics_file or getattr(getattr(config, "metrics", None), "openmetrics_path", None)
+            if metrics_path:
+                console.print(f"[green]API metrics written to:[/green] {metrics.write_openmetrics(metrics_path)}")
+        finally:
+            # Events were streamed during the run; this only writes the last batch, failed run or not
+            for saved in reporter.close_sinks():
+                console.print(f"[green]Events exported to:[/green] {saved}")
+
+
+def _check_config_path(config: Path | None) -> None:
+    if config is not None and config.suffix.lower() not in {".yaml", ".yml", ".toml", ".json"}:
+        raise typer.BadParameter("Config file must be one of: .yaml, .yml, .toml, .json")
 
 
 app = typer.Typer(help="CostCutter – Kill-switch style cleanup tool for AWS resources.")
@@ -193,13 +402,47 @@ def main(
     ctx: typer.Context,
     dry_run: bool | None = None,
     config: Path | None = None,
+    incremental: bool = typer.Option(False, help="Only process resources that are new or changed since the last run."),
+    resume: bool = typer.Option(False, help="Continue an interrupted run, skipping resources it already deleted."),
+    discard_journal: bool = typer.Option(False, help="Start a new run even if the journal holds an unfinished one."),
+    metrics_file: Path | None = None,
+    trace: Path | None = None,
 ):
-    """Run CostCutter (no subcommands yet)."""
-    if config is not None and config.suffix.lower() not in {".yaml", ".yml", ".toml", ".json"}:
-        raise typer.BadParameter("Config file must be one of: .yaml, .yml, .toml, .json")
-    run_cli(dry_run=dry_run, config_file=config)
-    if ctx.invoked_subcommand is None:
+    """Run CostCutter once, or a subcommand such as ``watch``."""
+    _check_config_path(config)
+    if ctx.invoked_subcommand is not None:
+        # Subcommands fall back to the options given before them
+        ctx.obj = {"dry_run": dry_run, "config": config}
         return
+    run_cli(
+        dry_run=dry_run,
+        config_file=config,
+        incremental=incremental,
+        resume=resume,
+        metrics_file=metrics_file,
+        trace_file=trace,
+        discard_journal=discard_journal,
+    )
+
+
+@app.command()
+def watch(
+    ctx: typer.Context,
+    dry_run: bool | None = None,
+    config: Path | None = None,
+    once: bool = typer.Option(False, help="Poll a single time and exit."),
+):
+    """Poll the AWS budget and run the cleanup when the spend threshold is crossed."""
+    parent = ctx.obj or {}
+    config = config if config is not None else parent.get("config")
+    dry_run = dry_run if dry_run is not None else parent.get("dry_run")
+    _check_config_path(config)
+    from costcutter.watch import run_watch
+
+    try:
+        run_watch(config_file=config, dry_run=dry_run, max_polls=1 if once else None, echo=typer.echo)
+    except KeyboardInterrupt:
+        typer.echo("Stopped watching.")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+from costcutter.core.clients import ClientRegistry, get_client, get_client_registry
 from costcutter.core.session_helper import create_aws_session
 
-__all__ = ["create_aws_session"]
+__all__ = ["ClientRegistry", "create_aws_session", "get_client", "get_client_registry"]
@@ -0,0 +1,47 @@
+"""Minimal ARN parsing.
+
+``arn:partition:service:region:account:resource`` where the resource part is
+``type/id``, ``type:id`` or a bare id, depending on the service.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Arn:
+    partition: str
+    service: str
+    region: str
+    account: str
+    resource_type: str
+    resource_id: str
+
+    @property
+    def type_key(self) -> str:
+        """``service:resource_type``, the form used by tagging API resource type filters."""
+        return f"{self.service}:{self.resource_type}" if self.resource_type else self.service
+
+
+def arn_prefix(type_key: str, region: str, account: str, partition: str = "aws") -> str:
+    """Return the ARN up to the resource id for a ``service:resource_type`` key."""
+    service, _, resource_type = type_key.partition(":")
+    return f"arn:{partition}:{service}:{region}:{account}:{resource_type}/"
+
+
+def parse_arn(arn: str) -> Arn:
+    """Split an ARN into its components.
+
+    Raises:
+        ValueError: If ``arn`` is not an ARN.
+    """
+    parts = arn.split(":", 5)
+    if len(parts) != 6 or parts[0] != "arn":
+        raise ValueError(f"Not an ARN: {arn!r}")
+    _, partition, service, region, account, resource = parts
+    # The first separator wins: resource ids may themselves contain '/' or ':'
+    cut = min((i for i in (resource.find("/"), resource.find(":")) if i >= 0), default=-1)
+    if cut < 0:
+        resource_type, resource_id = "", resource
+    else:
+        resource_type, resource_id = resource[:cut], resource[cut + 1 :]
+    return Arn(partition, service, region, account, resource_type, resource_id)
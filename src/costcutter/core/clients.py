@@ -0,0 +1,130 @@
+"""Shared boto3 client registry.
+
+Building a client reloads the service model and opens a fresh connection
+pool, so resource handlers fetch clients from here instead of calling
+``session.client`` themselves. Clients are built once per
+(session, service, region) and reused by every worker thread. Each new
+client is instrumented for per-call metrics (see ``costcutter.core.metrics``).
+
+Sessions are held weakly: organization mode, process shards and watch mode
+keep creating sessions, and a session's clients (with their connection
+pools) are dropped as soon as nothing else uses the session.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from boto3.session import Session
+from botocore.config import Config as BotoConfig
+
+from costcutter.core.metrics import get_api_metrics
+
+logger = logging.getLogger(__name__)
+
+SDK_MAX_ATTEMPTS = 2
+
+
+@dataclass(slots=True)
+class ClientStats:
+    created: int = 0
+    # Lookups served from the registry, not reuse of pooled connections
+    cache_hits: int = 0
+    create_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class ClientRegistry:
+    """Thread-safe cache of boto3 clients keyed by session, then (service, region).
+
+    boto3 clients are thread-safe but sessions are not, so client creation is
+    serialized behind a lock while lookups of existing clients are lock-free.
+    """
+
+    def __init__(self, max_pool_connections: int | None = None) -> None:
+        self._clients: weakref.WeakKeyDictionary[Session, dict[tuple[str, str | None], Any]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._max_pool_connections = max_pool_connections
+        self._stats = ClientStats()
+        self._stats_lock = threading.Lock()
+
+    def configure(self, max_pool_connections: int | None) -> None:
+        """Set the connection pool size for clients created from now on.
+
+        Cached clients are dropped when the size changes so every client
+        matches the configured worker count.
+        """
+        with self._lock:
+            if max_pool_connections != self._max_pool_connections:
+                self._max_pool_connections = max_pool_connections
+                self._clients.clear()
+
+    def _boto_config(self) -> BotoConfig:
+        # Keep SDK retries short: sustained throttling should reach the adaptive
+        # rate limiter and scheduler requeue instead of sleeping inside a worker.
+        config = BotoConfig(retries={"mode": "standard", "total_max_attempts": SDK_MAX_ATTEMPTS})
+        if self._max_pool_connections:
+            config = config.merge(BotoConfig(max_pool_connections=self._max_pool_connections))
+        return config
+
+    def get(self, session: Session, service_name: str, region_name: str | None = None) -> Any:
+        key = (service_name, region_name)
+        clients = self._clients.get(session)
+        client = clients.get(key) if clients is not None else None
+        if client is None:
+            with self._lock:
+                clients = self._clients.setdefault(session, {})
+                client = clients.get(key)
+                if client is None:
+                    return self._create(clients, session, service_name, region_name)
+        with self._stats_lock:
+            self._stats.cache_hits += 1
+        return client
+
+    def _create(
+        self, clients: dict[tuple[str, str | None], Any], session: Session, service_name: str, region_name: str | None
+    ) -> Any:
+        # Called with self._lock held
+        started = time.perf_counter()
+        client = session.client(service_name, region_name=region_name, config=self._boto_config())
+        elapsed = time.perf_counter() - started
+        get_api_metrics().instrument(client, service_name, region_name)
+        clients[(service_name, region_name)] = client
+        with self._stats_lock:
+            self._stats.created += 1
+            self._stats.create_seconds += elapsed
+        logger.debug("Created %s client for region=%s in %.1f ms", service_name, region_name, elapsed * 1000)
+        return client
+
+    def stats(self) -> ClientStats:
+        with self._stats_lock:
+            return ClientStats(self._stats.created, self._stats.cache_hits, self._stats.create_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+        with self._stats_lock:
+            self._stats = ClientStats()
+
+
+# Lazy singleton
+_registry: ClientRegistry | None = None
+
+
+def get_client_registry() -> ClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
+
+
+def get_client(session: Session, service_name: str, region_name: str | None = None) -> Any:
+    """Return the shared client for (session, service, region), creating it once."""
+    return get_client_registry().get(session, service_name, region_name)
@@ -0,0 +1,176 @@
+"""Dependency-aware teardown ordering.
+
+Resource handlers declare which other resource types must be cleared first
+(instances before volumes, ENIs before security groups, ...). ``DagExecutor``
+runs one node per (region, resource type): independent types run in parallel
+across all regions, and a dependent type starts in a region as soon as every
+type it needs has finished in that same region.
+"""
+
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceHandler:
+    """A resource-type cleanup entrypoint and the resource types it depends on.
+
+    Dependencies are resource keys of the same service (``"instances"``) or
+    qualified with another service (``"ec2.instances"``). ``tagging_type`` is
+    the Resource Groups Tagging API type (``"ec2:instance"``), which is also
+    the ARN's service and resource type; resources with one can be discovered
+    through the tagging API (see ``costcutter.core.discovery``). ``catalog``
+    yields ``(id, fingerprint)`` for the persistent inventory
+    (see ``costcutter.core.inventory``).
+    """
+
+    fn: Callable[..., None]
+    depends_on: tuple[str, ...] = ()
+    tagging_type: str | None = None
+    catalog: Callable[..., Iterator[tuple[str, str | None]]] | None = None
+
+
+def qualify(service: str, resource: str) -> str:
+    return resource if "." in resource else f"{service}.{resource}"
+
+
+def topological_order(graph: dict[str, Iterable[str]]) -> list[str]:
+    """Return the nodes of ``graph`` so that every node follows its dependencies.
+
+    Raises:
+        ValueError: If a dependency is not a node of the graph or the graph
+            has a cycle.
+    """
+    deps = {node: set(d) for node, d in graph.items()}
+    for node, d in deps.items():
+        unknown = d - deps.keys()
+        if unknown:
+            raise ValueError(f"Resource '{node}' depends on unknown resource(s): {sorted(unknown)}")
+    order: list[str] = []
+    done: set[str] = set()
+    while deps:
+        ready = sorted(n for n, d in deps.items() if d <= done)
+        if not ready:
+            raise ValueError(f"Dependency cycle between resources: {sorted(deps)}")
+        for n in ready:
+            order.append(n)
+            done.add(n)
+            del deps[n]
+    return order
+
+
+@dataclass(slots=True)
+class DagResult:
+    completed: list[tuple[str, str]]
+    failed: list[tuple[str, str]]
+    # Nodes never started because a dependency failed in that region
+    blocked: list[tuple[str, str]]
+
+
+class DagExecutor:
+    """Run ``run_node(region, node)`` for every region and node in dependency order.
+
+    Args:
+        graph: ``{node: dependencies}``; validated with ``topological_order``.
+        regions: Regions to run the whole graph in. ``nodes_for_region`` can
+            drop nodes (e.g. a service not offered in a region); a dropped
+            node counts as done for its dependents.
+        run_node: Called on a driver thread for each (region, node).
+        max_workers: Number of driver threads. Nodes usually hand their
+            resource-level work to the shared scheduler, so this only bounds
+            how many nodes are discovering at once.
+        on_node_done: Called with (region, node, status) once a node
+            ``completed``, ``failed`` or was ``blocked``, e.g. for progress.
+    """
+
+    def __init__(
+        self,
+        graph: dict[str, Iterable[str]],
+        regions: Iterable[str],
+        run_node: Callable[[str, str], None],
+        max_workers: int,
+        nodes_for_region: Callable[[str], Iterable[str]] | None = None,
+        on_node_done: Callable[[str, str, str], None] | None = None,
+    ) -> None:
+        topological_order(graph)
+        self.graph = {node: tuple(d) for node, d in graph.items()}
+        self.regions = list(regions)
+        self.run_node = run_node
+        self.max_workers = max(1, max_workers)
+        self.nodes_for_region = nodes_for_region
+        self.on_node_done = on_node_done
+        self._dependents: dict[str, list[str]] = {node: [] for node in self.graph}
+        for node, d in self.graph.items():
+            for dep in d:
+                self._dependents[dep].append(node)
+
+    def _notify(self, region: str, node: str, status: str) -> None:
+        if self.on_node_done is None:
+            return
+        try:
+            self.on_node_done(region, node, status)
+        except Exception as e:
+            logger.warning("[%s][%s] Node callback failed: %s", region, node, e)
+
+    def run(self) -> DagResult:
+        result = DagResult(completed=[], failed=[], blocked=[])
+        waiting: dict[tuple[str, str], set[str]] = {}
+        ready: list[tuple[str, str]] = []
+        for region in self.regions:
+            active = set(self.nodes_for_region(region) if self.nodes_for_region else self.graph)
+            for node, d in self.graph.items():
+                if node not in active:
+                    continue
+                remaining = {dep for dep in d if dep in active}
+                if remaining:
+                    waiting[(region, node)] = remaining
+                else:
+                    ready.append((region, node))
+
+        def _block(region: str, node: str) -> None:
+            for dependent in self._dependents[node]:
+                key = (region, dependent)
+                if waiting.pop(key, None) is not None:
+                    logger.warning("[%s][%s] Skipped: dependency %s did not complete", region, dependent, node)
+                    result.blocked.append(key)
+                    self._notify(region, dependent, "blocked")
+                    _block(region, dependent)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running: dict[Future, tuple[str, str]] = {}
+
+            def _submit(keys: list[tuple[str, str]]) -> None:
+                for region, node in keys:
+                    running[executor.submit(self.run_node, region, node)] = (region, node)
+
+            _submit(ready)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    region, node = running.pop(fut)
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        logger.error("[%s][%s] Failed: %s", region, node, e)
+                        result.failed.append((region, node))
+                        self._notify(region, node, "failed")
+                        _block(region, node)
+                        continue
+                    result.completed.append((region, node))
+                    self._notify(region, node, "completed")
+                    unblocked = []
+                    for dependent in self._dependents[node]:
+                        key = (region, dependent)
+                        remaining = waiting.get(key)
+                        if remaining is None:
+                            continue
+                        remaining.discard(node)
+                        if not remaining:
+                            del waiting[key]
+                            unblocked.append(key)
+                    _submit(unblocked)
+        return result
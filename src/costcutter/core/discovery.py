@@ -0,0 +1,139 @@
+"""Region-wide discovery through the Resource Groups Tagging API.
+
+With ``aws.discovery: tagging`` every resource type that declares a tagging
+type (``ec2:instance``, ``ec2:key-pair``, ...) is listed with one paginated
+``get_resources`` call per region instead of one ``describe_*`` call per
+type. Returned ARNs are routed to the teardown node that owns their type;
+nodes without a tagging type, and every node of a region where the call
+fails, fall back to their own catalog.
+
+The tagging API only returns resources that carry (or once carried) a tag,
+so this backend suits accounts where everything is created with tags.
+Required tags of the ``selection`` rules are sent as ``TagFilters`` and
+excluded tags are checked against the returned tags. Resources protected
+by their tags are noted in the protection index.
+"""
+
+import logging
+import threading
+
+from boto3.session import Session
+from botocore.exceptions import ClientError
+
+from costcutter.core.arn import parse_arn
+from costcutter.core.clients import get_client
+from costcutter.core.protection import get_protection
+from costcutter.core.rate_limiter import ThrottledError, get_rate_limiter
+from costcutter.core.scheduler import Scheduler
+from costcutter.core.selection import Selection, tag_map
+from costcutter.core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_BACKENDS = ("describe", "tagging")
+TAGGING_PAGE_SIZE = 100  # get_resources ResourcesPerPage upper bound
+# get_resources accepts at most this many entries in ResourceTypeFilters
+MAX_TYPE_FILTERS = 100
+
+
+class TaggingDiscovery:
+    """Fetch and route tagged resources once per region.
+
+    Args:
+        session: Session used for the ``resourcegroupstaggingapi`` clients.
+        type_nodes: ``{tagging type: node}``, e.g.
+            ``{"ec2:instance": "ec2.instances"}``.
+        scheduler: When given, each page is fetched under its caps.
+        selection: Tag rules to apply; it must have ``tagging_filters()``.
+        account: Account id of ``session``, for its rate-limit buckets.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        type_nodes: dict[str, str],
+        scheduler: Scheduler | None = None,
+        selection: Selection | None = None,
+        account: str = "",
+    ) -> None:
+        if len(type_nodes) > MAX_TYPE_FILTERS:
+            raise ValueError(f"At most {MAX_TYPE_FILTERS} resource types can be discovered through the tagging API")
+        self.session = session
+        self.account = account
+        self.type_nodes = dict(type_nodes)
+        self.scheduler = scheduler
+        selection = selection or Selection()
+        tag_filters = selection.tagging_filters()
+        if tag_filters is None:
+            raise ValueError("Selection rules other than tags cannot be applied through the tagging API")
+        self.tag_filters = tag_filters
+        self.excluded = selection.exclusion()
+        self._lock = threading.Lock()
+        self._region_locks: dict[str, threading.Lock] = {}
+        # region -> {node: ids}; None when the region must fall back to describe calls
+        self._routed: dict[str, dict[str, list[str]] | None] = {}
+
+    def covers(self, node: str) -> bool:
+        return node in self.type_nodes.values()
+
+    def _region_lock(self, region: str) -> threading.Lock:
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    @traced("catalog", service="tagging")
+    def _fetch(self, region: str) -> dict[str, list[str]] | None:
+        client = get_client(self.session, "resourcegroupstaggingapi", region)
+        paginator = client.get_paginator("get_resources")
+        routed: dict[str, list[str]] = {node: [] for node in self.type_nodes.values()}
+        kwargs = {"TagFilters": self.tag_filters} if self.tag_filters else {}
+        pages = get_rate_limiter().paginate(
+            region,
+            "GetResources",
+            paginator,
+            token_key="PaginationToken",
+            account=self.account,
+            ResourceTypeFilters=sorted(self.type_nodes),
+            ResourcesPerPage=TAGGING_PAGE_SIZE,
+            **kwargs,
+        )
+        if self.scheduler is not None:
+            pages = self.scheduler.iter_limited(pages, region, "tagging")
+        protection = get_protection()
+        count = 0
+        try:
+            for page in pages:
+                for mapping in page.get("ResourceTagMappingList", []):
+                    if self.excluded is not None and self.excluded(tag_map(mapping)):
+                        continue
+                    if protection.has_tag_rules:
+                        protection.note(mapping.get("ResourceARN", ""), tag_map(mapping))
+                    try:
+                        arn = parse_arn(mapping.get("ResourceARN", ""))
+                    except ValueError:
+                        continue
+                    node = self.type_nodes.get(arn.type_key)
+                    if node is not None:
+                        routed[node].append(arn.resource_id)
+                        count += 1
+        except (ClientError, ThrottledError) as e:
+            logger.warning("[%s] Tagging API discovery failed, falling back to describe calls: %s", region, e)
+            return None
+        logger.info("[%s] Tagging API discovered %d resource(s)", region, count)
+        return routed
+
+    def ids_for(self, region: str, node: str) -> list[str] | None:
+        """Return the ids discovered for ``node`` in ``region``.
+
+        The region is fetched on first use; later nodes of the same region
+        reuse that result. ``None`` means the node must run its own catalog.
+        """
+        if not self.covers(node):
+            return None
+        with self._region_lock(region):
+            if region not in self._routed:
+                self._routed[region] = self._fetch(region)
+            routed = self._routed[region]
+            if routed is None:
+                return None
+            # Each node consumes its ids once, so they are not kept for the rest of the run
+            return routed.pop(node, [])
@@ -0,0 +1,195 @@
+"""Persistent resource inventory in SQLite.
+
+Every catalog result is stored keyed by ARN, with the resource's region,
+type, a fingerprint of the attributes that matter for cleanup (e.g. the
+instance state) and when it was first and last seen. ``Inventory.observe``
+passes discovered ids through: in incremental mode only resources that are
+new, or whose fingerprint changed, since the last snapshot are yielded, so
+repeated runs only process and report deltas. A resource only counts as
+processed by a real run once its delete succeeded or it was skipped as
+protected (``Inventory.mark``), so failed deletes are retried by the next
+incremental run. The database can also be
+queried offline, e.g. ``sqlite3 inventory.db 'select * from resources'``.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from itertools import batched
+from pathlib import Path
+
+from costcutter.core.arn import arn_prefix
+from costcutter.core.journal import COMPLETED_STATES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INVENTORY_PATH = "~/.local/share/costcutter/inventory.db"
+# Rows looked up and written per statement
+OBSERVE_BATCH_SIZE = 500
+BUSY_TIMEOUT = 30.0  # seconds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    dry_run INTEGER NOT NULL,
+    incremental INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resources (
+    arn TEXT PRIMARY KEY,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    fingerprint TEXT,
+    -- 0 once a real run deleted the resource; 1 while only dry runs processed it
+    dry_run INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_run INTEGER NOT NULL REFERENCES runs(id)
+);
+CREATE INDEX IF NOT EXISTS idx_resources_region ON resources(region);
+CREATE INDEX IF NOT EXISTS idx_resources_type ON resources(service, resource_type);
+CREATE INDEX IF NOT EXISTS idx_resources_last_seen ON resources(last_seen);
+"""
+
+
+class Inventory:
+    """SQLite inventory shared by every discovery thread of a run.
+
+    Args:
+        path: Database file (created on first use); ``":memory:"`` for tests.
+        dry_run: Mode of this run. A resource last processed by a dry run is
+            still new to a real run.
+        incremental: Only yield new or changed resources from ``observe``.
+        run_id: Join a run started by another connection (the process
+            engine's workers) instead of starting a new one.
+    """
+
+    def __init__(self, path: str | Path, dry_run: bool, incremental: bool = False, run_id: int | None = None) -> None:
+        if str(path) != ":memory:":
+            path = Path(path).expanduser()
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.dry_run = dry_run
+        self.incremental = incremental
+        self.unchanged = 0
+        self._lock = threading.Lock()
+        # Worker processes write concurrently; wait for their transactions instead of failing
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._owner = run_id is None
+        if run_id is None:
+            cur = self._db.execute(
+                "INSERT INTO runs (started_at, dry_run, incremental) VALUES (?, ?, ?)",
+                (time.time(), int(dry_run), int(incremental)),
+            )
+            run_id = cur.lastrowid
+        self.run_id = run_id
+
+    def observe(
+        self,
+        region: str,
+        account: str,
+        tagging_type: str,
+        records: Iterable[tuple[str, str | None]],
+        prune: bool = True,
+    ) -> Iterator[str]:
+        """Store discovered ``(id, fingerprint)`` records and yield the ids to process.
+
+        ``tagging_type`` (``"ec2:instance"``) gives the ARN's service and
+        resource type. With ``prune``, once ``records`` is exhausted, rows of
+        this account, region and type that were not seen again are dropped
+        from the snapshot; pass ``False`` when ``records`` lists only part of
+        the resources (selection rules, tag-based discovery). Nothing is
+        dropped when ``records`` raises.
+        """
+        service, resource_type = tagging_type.split(":", 1)
+        prefix = arn_prefix(tagging_type, region, account)
+        for batch in batched(records, OBSERVE_BATCH_SIZE, strict=False):
+            yield from self._observe_batch(region, service, resource_type, prefix, batch)
+        if not prune:
+            return
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM resources WHERE region = ? AND service = ? AND resource_type = ?"
+                " AND substr(arn, 1, ?) = ? AND last_run != ?",
+                (region, service, resource_type, len(prefix), prefix, self.run_id),
+            )
+
+    def _observe_batch(
+        self,
+        region: str,
+        service: str,
+        resource_type: str,
+        prefix: str,
+        batch: tuple[tuple[str, str | None], ...],
+    ) -> list[str]:
+        now = time.time()
+        arns = [prefix + resource_id for resource_id, _ in batch]
+        changed = []
+        rows = []
+        with self._lock:
+            placeholders = ",".join("?" * len(arns))
+            known = {
+                arn: (fingerprint, dry_run)
+                for arn, fingerprint, dry_run in self._db.execute(
+                    f"SELECT arn, fingerprint, dry_run FROM resources WHERE arn IN ({placeholders})", arns
+                )
+            }
+            for arn, (rid, fp) in zip(arns, batch, strict=True):
+                previous = known.get(arn)
+                # Unchanged only if the same fingerprint was already processed in this mode (or for real)
+                if (
+                    self.incremental
+                    and previous is not None
+                    and previous[0] == fp
+                    and (not previous[1] or self.dry_run)
+                ):
+                    self.unchanged += 1
+                    processed = previous[1]
+                else:
+                    changed.append(rid)
+                    # A real run only sets 0 through mark() once the delete succeeded
+                    processed = 1
+                rows.append((arn, region, service, resource_type, rid, fp, processed, now, now, self.run_id))
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                """
+                INSERT INTO resources (arn, region, service, resource_type, resource_id, fingerprint,
+                                       dry_run, first_seen, last_seen, last_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(arn) DO UPDATE SET
+                    fingerprint = excluded.fingerprint, dry_run = excluded.dry_run,
+                    last_seen = excluded.last_seen, last_run = excluded.last_run
+                """,
+                rows,
+            )
+            self._db.execute("COMMIT")
+        return changed
+
+    def mark(self, arns: list[str], state: str) -> None:
+        """Record ``arns`` as processed for real once a real run deleted or skipped them.
+
+        Subscribed to the run's journal (``Journal.subscribe``), which hands
+        it every outcome the handlers mark; only ``done`` and ``skipped``
+        change anything.
+        """
+        if self.dry_run or state not in COMPLETED_STATES:
+            return
+        with self._lock:
+            for batch in batched(arns, OBSERVE_BATCH_SIZE, strict=False):
+                placeholders = ",".join("?" * len(batch))
+                self._db.execute(
+                    f"UPDATE resources SET dry_run = 0 WHERE arn IN ({placeholders}) AND last_run = ?",
+                    (*batch, self.run_id),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owner:
+                self._db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+            self._db.close()
@@ -0,0 +1,264 @@
+"""Write-ahead journal of teardown operations.
+
+Real (non dry-run) runs append one JSON line per state change of a resource
+ARN: ``planned`` when discovery hands it to a handler, ``inflight`` just
+before the delete call, then ``done`` or ``failed``; protected resources go
+straight from ``planned`` to ``skipped``. A ``node_done`` line is
+written once a region's resource type finished with nothing left
+outstanding. Lines are fsynced in batches, so a crash may lose the last
+batch; those ARNs are simply retried, which is safe because every delete is
+idempotent or reports the resource as already gone.
+
+``costcutter --resume`` reads the journal of the interrupted run, skips
+finished resource types entirely and, for the others, only hands ARNs that
+are not ``done`` or ``skipped`` yet to the handlers. A run that completes ends its journal
+with a ``finished`` line; a new run refuses to overwrite a journal without
+one unless told to discard it (``--discard-journal``).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = "~/.local/share/costcutter/journal.jsonl"
+# Lines written per fsync, and the longest a line waits while others keep coming
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+
+STATES = ("planned", "inflight", "done", "skipped", "failed")
+# States after which an ARN needs no more work in this run
+COMPLETED_STATES = ("done", "skipped")
+# Bytes read from the end of a journal to find its last line
+TAIL_BYTES = 4096
+
+
+class InterruptedRunError(RuntimeError):
+    """A new run would overwrite the journal of a run that did not finish."""
+
+
+def _node_key(region: str, node: str) -> str:
+    return f"{region}/{node}"
+
+
+def _finished(path: Path) -> bool:
+    """Whether the journal at ``path`` is missing, empty or ends with a finished run."""
+    try:
+        with path.open("rb") as fh:
+            fh.seek(max(0, fh.seek(0, os.SEEK_END) - TAIL_BYTES))
+            lines = fh.read().splitlines()
+    except FileNotFoundError:
+        return True
+    if not lines:
+        return True
+    try:
+        return json.loads(lines[-1]).get("state") == "finished"
+    except ValueError:
+        # A torn last line from a crash mid-write
+        return False
+
+
+class Journal:
+    """Append-only operation journal; a journal without a path records nothing.
+
+    Args:
+        path: Journal file. ``None`` disables journaling (dry runs).
+        resume: Continue the journal found at ``path`` instead of starting over.
+        batch_size: Flush and fsync once this many lines are buffered.
+        flush_interval: Flush at least this often while lines are recorded.
+        attach: Append to a journal another process opened for this run
+            (the process engine's workers): never truncate it, and write
+            no run header.
+        discard: Start over even if the journal at ``path`` belongs to a
+            run that did not finish.
+
+    Raises:
+        InterruptedRunError: A new run (neither ``resume`` nor ``attach``)
+            found an unfinished run's journal at ``path`` and ``discard``
+            is not set.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        resume: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        attach: bool = False,
+        discard: bool = False,
+    ) -> None:
+        self.path = Path(path).expanduser() if path is not None else None
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        self._completed: set[str] = set()
+        self._nodes_done: set[str] = set()
+        # node key -> ARNs planned in this run and not done yet
+        self._outstanding: dict[str, set[str]] = {}
+        self._node_of: dict[str, str] = {}
+        self._fd: int | None = None
+        self._listeners: list[Callable[[list[str], str], None]] = []
+        if self.path is None:
+            return
+        if resume:
+            self._load()
+        elif not (attach or discard or _finished(self.path)):
+            raise InterruptedRunError(
+                f"The journal {self.path} holds a run that did not finish; "
+                "continue it with --resume or start over with --discard-journal"
+            )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if not (resume or attach):
+            flags |= os.O_TRUNC
+        self._fd = os.open(self.path, flags, 0o644)
+        if not attach:
+            self._write({"state": "run", "resume": resume})
+
+    @property
+    def enabled(self) -> bool:
+        return self._fd is not None
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            fh = self.path.open(encoding="utf-8")
+        except FileNotFoundError:
+            logger.warning("No journal at %s; nothing to resume", self.path)
+            return
+        with fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                state = entry.get("state")
+                if state in COMPLETED_STATES:
+                    self._completed.add(entry["arn"])
+                elif state in ("planned", "inflight", "failed"):
+                    self._completed.discard(entry["arn"])
+                elif state == "node_done":
+                    self._nodes_done.add(entry["node"])
+        logger.info(
+            "Resuming from %s: %d resource(s) and %d node(s) already done",
+            self.path,
+            len(self._completed),
+            len(self._nodes_done),
+        )
+
+    def _write(self, entry: dict) -> None:
+        entry["ts"] = round(time.time(), 3)
+        with self._lock:
+            self._buffer.append(json.dumps(entry, separators=(",", ":")) + "\n")
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self) -> None:
+        # Called with self._lock held
+        if self._fd is None:
+            return
+        if self._buffer:
+            # One O_APPEND write per batch, so batches of concurrent worker processes never interleave
+            os.write(self._fd, "".join(self._buffer).encode())
+            self._buffer.clear()
+            os.fsync(self._fd)
+        self._last_flush = time.monotonic()
+
+    def node_done(self, region: str, node: str) -> bool:
+        """Whether the interrupted run already finished this region's node."""
+        return _node_key(region, node) in self._nodes_done
+
+    def plan(self, region: str, node: str, prefix: str, ids: Iterable[str]) -> Iterator[str]:
+        """Journal ``ids`` as planned and yield those not completed by the interrupted run.
+
+        ``prefix`` turns an id into its ARN (see ``costcutter.core.arn.arn_prefix``).
+        """
+        if not self.enabled:
+            yield from ids
+            return
+        key = _node_key(region, node)
+        outstanding = self._outstanding.setdefault(key, set())
+        for resource_id in ids:
+            arn = prefix + resource_id
+            if arn in self._completed:
+                self.skipped += 1
+                continue
+            with self._lock:
+                outstanding.add(arn)
+                self._node_of[arn] = key
+            self._write({"state": "planned", "arn": arn})
+            yield resource_id
+
+    def subscribe(self, listener: Callable[[list[str], str], None]) -> None:
+        """Call ``listener(arns, state)`` on every ``mark``, journaled or not (e.g. the inventory)."""
+        self._listeners.append(listener)
+
+    def mark(self, arns: str | Iterable[str], state: str) -> None:
+        """Record ``inflight``, ``done``, ``skipped`` or ``failed`` for one or more ARNs."""
+        if not (self.enabled or self._listeners):
+            return
+        if state not in STATES:
+            raise ValueError(f"Unknown journal state '{state}'")
+        arns = [arns] if isinstance(arns, str) else list(arns)
+        for listener in self._listeners:
+            listener(arns, state)
+        if not self.enabled:
+            return
+        for arn in arns:
+            if state in COMPLETED_STATES:
+                with self._lock:
+                    key = self._node_of.pop(arn, None)
+                    if key is not None:
+                        self._outstanding[key].discard(arn)
+            self._write({"state": state, "arn": arn})
+
+    def finish_node(self, region: str, node: str) -> None:
+        """Journal the node as done unless some of its ARNs did not complete."""
+        if not self.enabled:
+            return
+        key = _node_key(region, node)
+        if self._outstanding.get(key):
+            return
+        self._write({"state": "node_done", "node": key})
+
+    def finish(self) -> None:
+        """Journal that the run completed, so the next run may start a new journal."""
+        if not self.enabled:
+            return
+        self._write({"state": "finished"})
+
+    def flush(self) -> None:
+        """Write and fsync everything buffered so far (e.g. before exiting on Ctrl-C)."""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is None:
+                return
+            self._flush()
+            os.close(self._fd)
+            self._fd = None
+
+
+# Active journal of the current run; handlers mark their ARNs through it
+_journal = Journal()
+
+
+def get_journal() -> Journal:
+    return _journal
+
+
+def set_journal(journal: Journal | None) -> None:
+    """Make ``journal`` the active one (``None`` restores a disabled journal)."""
+    global _journal
+    _journal = journal if journal is not None else Journal()
@@ -0,0 +1,237 @@
+"""Per-API-call metrics collected through botocore's event system.
+
+Every client built by the shared client registry gets handlers on its
+event emitter, so no call site has to be touched. For each
+(region, service, operation) they keep a latency histogram, calls, errors,
+SDK retries, throttled responses (including attempts the SDK retried on
+its own, which the rate limiter never sees) and response bytes.
+
+The CLI summary shows the slowest operations, and the totals can be
+written as an OpenMetrics text file for Prometheus-style tooling.
+"""
+
+import math
+import os
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from costcutter.core.rate_limiter import THROTTLE_CODES
+
+# Upper bounds of the latency histogram buckets, in seconds; a final +Inf bucket follows
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "costcutter_api"
+# Keys kept in botocore's per-request context dict between events
+_STARTED = "costcutter_started"
+_ATTEMPTS = "costcutter_attempts"
+_THROTTLES = "costcutter_throttles"
+_BYTES = "costcutter_bytes"
+
+MetricKey = tuple[str, str, str]
+
+
+@dataclass(slots=True)
+class CallStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttles: int = 0
+    response_bytes: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, seconds: float) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def merge(self, other: "CallStats") -> None:
+        self.calls += other.calls
+        self.errors += other.errors
+        self.retries += other.retries
+        self.throttles += other.throttles
+        self.response_bytes += other.response_bytes
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets, strict=True)]
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile as the upper bound of the bucket it falls in."""
+        if not self.calls:
+            return 0.0
+        rank = math.ceil(q * self.calls)
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max_seconds) if i < len(LATENCY_BUCKETS) else self.max_seconds
+        return self.max_seconds
+
+
+class ApiMetrics:
+    """Thread-safe per-(region, service, operation) call statistics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[MetricKey, CallStats] = {}
+
+    def instrument(self, client: Any, service_name: str, region_name: str | None) -> None:
+        """Register the metric handlers on one client's event emitter."""
+        meta = getattr(client, "meta", None)
+        events = getattr(meta, "events", None)
+        if events is None:
+            return
+        region = region_name or getattr(meta, "region_name", None) or "global"
+
+        def _finish(context: dict, operation: str, seconds: float, error: bool, retries: int | None) -> None:
+            attempts = context.get(_ATTEMPTS, 1)
+            with self._lock:
+                stats = self._stats.setdefault((region, service_name, operation), CallStats())
+                stats.observe(seconds)
+                stats.errors += error
+                stats.retries += retries if retries is not None else max(0, attempts - 1)
+                stats.throttles += context.get(_THROTTLES, 0)
+                stats.response_bytes += context.get(_BYTES, 0)
+
+        def start_timer(context: dict, **kwargs: Any) -> None:
+            context[_STARTED] = time.perf_counter()
+
+        def response_received(context: dict, response_dict=None, parsed_response=None, **kwargs: Any) -> None:
+            # Once per attempt, so throttles the SDK retried itself are counted too
+            context[_ATTEMPTS] = context.get(_ATTEMPTS, 0) + 1
+            if response_dict is not None:
+                context[_BYTES] = context.get(_BYTES, 0) + len(response_dict.get("body") or b"")
+            if _error_code(parsed_response) in THROTTLE_CODES:
+                context[_THROTTLES] = context.get(_THROTTLES, 0) + 1
+
+        def after_call(context: dict, event_name: str, http_response=None, parsed=None, **kwargs: Any) -> None:
+            started = context.get(_STARTED)
+            if started is None:
+                return
+            if _ATTEMPTS not in context and _error_code(parsed) in THROTTLE_CODES:
+                # Stubbed responses skip the HTTP layer and its per-attempt event
+                context[_THROTTLES] = 1
+            status = getattr(http_response, "status_code", 200)
+            retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts")
+            _finish(context, _operation(event_name), time.perf_counter() - started, status >= 300, retries)
+
+        def after_call_error(context: dict, event_name: str, **kwargs: Any) -> None:
+            # Connection errors and the like: no response was parsed
+            started = context.get(_STARTED)
+            if started is not None:
+                _finish(context, _operation(event_name), time.perf_counter() - started, True, None)
+
+        # Not before-call: a stubbed client answers from there and stops the handler chain
+        events.register("before-parameter-build", start_timer)
+        events.register("response-received", response_received)
+        events.register("after-call", after_call)
+        events.register("after-call-error", after_call_error)
+
+    def snapshot(self) -> dict[MetricKey, CallStats]:
+        with self._lock:
+            return {key: _copy(stats) for key, stats in self._stats.items()}
+
+    def drain(self) -> dict[MetricKey, CallStats]:
+        """Return the statistics collected so far and start over."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    def merge(self, data: Mapping[MetricKey, CallStats]) -> None:
+        """Add statistics collected elsewhere, e.g. by a worker process."""
+        with self._lock:
+            for key, other in data.items():
+                self._stats.setdefault(key, CallStats()).merge(other)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def rows(self) -> list[tuple[MetricKey, CallStats]]:
+        """Return the statistics with the operations that took the most time first."""
+        return sorted(self.snapshot().items(), key=lambda item: (-item[1].seconds, item[0]))
+
+    def to_openmetrics(self) -> str:
+        snapshot = sorted(self.snapshot().items())
+        lines: list[str] = []
+
+        def _family(name: str, kind: str, help_text: str, unit: str | None = None) -> None:
+            lines.append(f"# TYPE {name} {kind}")
+            if unit:
+                lines.append(f"# UNIT {name} {unit}")
+            lines.append(f"# HELP {name} {help_text}")
+
+        duration = f"{METRIC_PREFIX}_call_duration_seconds"
+        _family(duration, "histogram", "AWS API call latency, SDK retries included.", "seconds")
+        for key, stats in snapshot:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, math.inf), stats.buckets, strict=True):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{duration}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{duration}_count{{{labels}}} {stats.calls}")
+            lines.append(f"{duration}_sum{{{labels}}} {stats.seconds:.6f}")
+        for suffix, attr, help_text in (
+            ("errors", "errors", "AWS API calls that ended in an error."),
+            ("retries", "retries", "Attempts the SDK retried."),
+            ("throttles", "throttles", "Attempts rejected with a throttling error."),
+            ("response_bytes", "response_bytes", "Bytes of response bodies received."),
+        ):
+            name = f"{METRIC_PREFIX}_{suffix}"
+            _family(name, "counter", help_text, "bytes" if suffix == "response_bytes" else None)
+            for key, stats in snapshot:
+                lines.append(f"{name}_total{{{_labels(key)}}} {getattr(stats, attr)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_openmetrics(self, path: str | Path) -> Path:
+        """Write the OpenMetrics text exposition to ``path`` (replaced atomically)."""
+        target = Path(path).expanduser()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_text(self.to_openmetrics(), encoding="utf-8")
+        os.replace(tmp, target)
+        return target
+
+
+def _copy(stats: CallStats) -> CallStats:
+    copy = CallStats()
+    copy.merge(stats)
+    return copy
+
+
+def _error_code(parsed: Any) -> str | None:
+    if not isinstance(parsed, dict):
+        return None
+    return parsed.get("Error", {}).get("Code")
+
+
+def _operation(event_name: str) -> str:
+    # e.g. "after-call.ec2.TerminateInstances"
+    return event_name.rsplit(".", 1)[-1]
+
+
+def _labels(key: MetricKey) -> str:
+    region, service, operation = (v.replace("\\", "\\\\").replace('"', '\\"') for v in key)
+    return f'region="{region}",service="{service}",operation="{operation}"'
+
+
+# Lazy singleton
+_metrics: ApiMetrics | None = None
+
+
+def get_api_metrics() -> ApiMetrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = ApiMetrics()
+    return _metrics
@@ -0,0 +1,127 @@
+"""Organization mode: run the cleanup in every member account.
+
+Member accounts are listed through AWS Organizations from the configured
+(management or delegated administrator) credentials, and a role is assumed
+in each of them. Assumed-role sessions are cached per account and carry
+botocore refreshable credentials, so a long teardown renews them shortly
+before they expire instead of failing halfway with ``ExpiredToken``.
+"""
+
+import logging
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import boto3
+import botocore.session
+from boto3.session import Session
+from botocore.credentials import RefreshableCredentials
+
+from costcutter.core.clients import get_client
+from costcutter.core.rate_limiter import get_rate_limiter
+from costcutter.services.common import _get_account_id, _set_account_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROLE_NAME = "OrganizationAccountAccessRole"
+DEFAULT_ROLE_SESSION_NAME = "costcutter"
+DEFAULT_SESSION_DURATION = 3600  # seconds
+
+
+@dataclass(frozen=True, slots=True)
+class Account:
+    id: str
+    name: str = ""
+
+
+def list_member_accounts(
+    session: Session,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+) -> list[Account]:
+    """Return the organization's active accounts, optionally filtered by id."""
+    include, exclude = {str(a) for a in include}, {str(a) for a in exclude}
+    client = get_client(session, "organizations", "us-east-1")
+    pages = get_rate_limiter().paginate("global", "ListAccounts", client.get_paginator("list_accounts"))
+    accounts = []
+    for page in pages:
+        for acct in page.get("Accounts", []):
+            account_id = acct.get("Id")
+            if not account_id or acct.get("Status", "ACTIVE") != "ACTIVE":
+                continue
+            if (include and account_id not in include) or account_id in exclude:
+                continue
+            accounts.append(Account(account_id, acct.get("Name", "")))
+    return sorted(accounts, key=lambda a: a.id)
+
+
+class RoleSessions:
+    """Sessions for a role assumed in each member account, built once per account.
+
+    The account the base session belongs to uses the base session itself:
+    the management account usually has no such role to assume.
+    """
+
+    def __init__(
+        self,
+        base_session: Session,
+        role_name: str = DEFAULT_ROLE_NAME,
+        duration_seconds: int = DEFAULT_SESSION_DURATION,
+        external_id: str | None = None,
+        role_session_name: str = DEFAULT_ROLE_SESSION_NAME,
+    ) -> None:
+        self.base_session = base_session
+        self.role_name = role_name
+        self.duration_seconds = int(duration_seconds)
+        self.external_id = external_id or None
+        self.role_session_name = role_session_name
+        self.assumed = 0
+        self._lock = threading.Lock()
+        self._sessions: dict[str, Session] = {}
+
+    def role_arn(self, account_id: str) -> str:
+        return f"arn:aws:iam::{account_id}:role/{self.role_name}"
+
+    def _assume(self, account_id: str) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {
+            "RoleArn": self.role_arn(account_id),
+            "RoleSessionName": self.role_session_name,
+            "DurationSeconds": self.duration_seconds,
+        }
+        if self.external_id:
+            kwargs["ExternalId"] = self.external_id
+        client = get_client(self.base_session, "sts")
+        creds = get_rate_limiter().call("global", "AssumeRole", client.assume_role, **kwargs)["Credentials"]
+        with self._lock:
+            self.assumed += 1
+        logger.info("Assumed %s (expires %s)", kwargs["RoleArn"], creds["Expiration"])
+        expiration = creds["Expiration"]
+        return {
+            "access_key": creds["AccessKeyId"],
+            "secret_key": creds["SecretAccessKey"],
+            "token": creds["SessionToken"],
+            "expiry_time": expiration.isoformat() if isinstance(expiration, datetime) else str(expiration),
+        }
+
+    def get(self, account_id: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(account_id)
+        if session is not None:
+            return session
+        if account_id == _get_account_id(self.base_session):
+            session = self.base_session
+        else:
+            # botocore calls _assume again once the credentials are close to expiry
+            credentials = RefreshableCredentials.create_from_metadata(
+                metadata=self._assume(account_id),
+                refresh_using=lambda: self._assume(account_id),
+                method="assume-role",
+            )
+            botocore_session = botocore.session.Session()
+            botocore_session._credentials = credentials
+            session = boto3.Session(botocore_session=botocore_session, region_name=self.base_session.region_name)
+            _set_account_id(session, account_id)
+        with self._lock:
+            return self._sessions.setdefault(account_id, session)
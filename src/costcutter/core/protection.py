@@ -0,0 +1,228 @@
+"""Resources that are never deleted (the ``protection`` config section).
+
+Rules come from the config and from an optional file, one per line, and
+can run into the thousands. They are indexed so each lookup costs about
+the same however many there are:
+
+- exact ARNs live in a hash table;
+- ARN patterns (``*`` and ``?`` wildcards) live in a path-compressed
+  prefix trie keyed by the text before their first wildcard. A lookup
+  walks the ARN down the trie once, one step per branch point rather than
+  per character, and only tests the patterns stored along that path; a
+  pattern that is a prefix followed by ``*`` needs no test at all;
+- a region or account field that is just ``*`` (``arn:aws:ec2:*:*:...``)
+  is stored as a placeholder, and lookups also try the ARN with that field
+  replaced, so such patterns stay exact ARNs or prefixes;
+- tag rules are a set of keys (any value) and a set of ``(key, value)`` pairs.
+
+Tags are not part of an ARN, so discovery notes the ARNs of tag-protected
+resources as it lists them (``note``); cleanup functions only ever ask
+about ARNs (``reason``) before deleting, and record a ``protected`` event
+instead of the delete.
+"""
+
+import os
+import re
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+from costcutter.conf.config import get_config
+
+_WILDCARDS = re.compile(r"[*?]")
+# Stands for a whole-field wildcard in the region or account field of an ARN
+_ANY_FIELD = "\x00"
+_REGION, _ACCOUNT = 3, 4
+
+
+def _compile(pattern: str) -> re.Pattern[str]:
+    parts = (".*" if p == "*" else "." if p == "?" else re.escape(p) for p in re.split(r"([*?])", pattern))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+class _Node:
+    """Prefix trie node; each edge is labelled with a string, keyed by its first character."""
+
+    __slots__ = ("edges", "rules")
+
+    def __init__(self) -> None:
+        self.edges: dict[str, tuple[str, _Node]] = {}
+        # (pattern, check of the text after the prefix); a None check matches anything
+        self.rules: list[tuple[str, re.Pattern[str] | None]] = []
+
+    def insert(self, key: str) -> "_Node":
+        """Return the node for ``key``, splitting edges as needed."""
+        node, i = self, 0
+        while i < len(key):
+            edge = node.edges.get(key[i])
+            if edge is None:
+                child = _Node()
+                node.edges[key[i]] = (key[i:], child)
+                return child
+            label, child = edge
+            common = len(os.path.commonprefix([label, key[i:]]))
+            if common < len(label):
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[i]] = (label[:common], middle)
+                child = middle
+            node, i = child, i + common
+        return node
+
+
+class ProtectionIndex:
+    """Exact-ARN set, ARN-pattern trie and tag sets of the protection rules."""
+
+    def __init__(self, arns: Iterable[str] = (), tags: Mapping[str, Any] | None = None) -> None:
+        self._exact: dict[str, str] = {}
+        self._trie = _Node()
+        self._patterns = 0
+        # Which of the region and account fields some rule wildcards
+        self._any_fields: set[int] = set()
+        self._tag_keys: set[str] = set()
+        self._tag_pairs: set[tuple[str, str]] = set()
+        # ARNs found protected by their tags during discovery
+        self._noted: dict[str, str] = {}
+        for arn in arns:
+            self.add_arn(arn)
+        for key, values in (tags or {}).items():
+            if values in (None, "", "*") or values == ["*"]:
+                self.add_tag(str(key))
+            else:
+                for value in [values] if isinstance(values, str | int | float) else values:
+                    self.add_tag(str(key), str(value))
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ProtectionIndex":
+        cfg = getattr(config, "protection", None)
+        tags = getattr(cfg, "tags", None)
+        index = cls(
+            arns=[str(a) for a in getattr(cfg, "arns", None) or ()],
+            tags=tags.to_dict() if hasattr(tags, "to_dict") else tags,
+        )
+        path = getattr(cfg, "file", None)
+        if path:
+            index.load_file(path)
+        return index
+
+    def load_file(self, path: str | Path) -> None:
+        """Add the rules of a file: an ARN or ARN pattern, ``tag:key`` or ``tag:key=value`` per line.
+
+        Blank lines and lines starting with ``#`` are ignored.
+        """
+        with Path(path).expanduser().open(encoding="utf-8") as fh:
+            for raw in fh:
+                line = raw.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("tag:"):
+                    key, sep, value = line[4:].partition("=")
+                    self.add_tag(key.strip(), value.strip() if sep else None)
+                else:
+                    self.add_arn(line)
+
+    def add_arn(self, pattern: str) -> None:
+        key = pattern
+        fields = pattern.split(":", 5)
+        if len(fields) == 6:
+            for i in (_REGION, _ACCOUNT):
+                if fields[i] == "*":
+                    fields[i] = _ANY_FIELD
+                    self._any_fields.add(i)
+            key = ":".join(fields)
+        match = _WILDCARDS.search(key)
+        if match is None:
+            self._exact[key] = pattern
+            return
+        prefix, rest = key[: match.start()], key[match.start() :]
+        self._trie.insert(prefix).rules.append((pattern, None if rest == "*" else _compile(rest)))
+        self._patterns += 1
+
+    def add_tag(self, key: str, value: str | None = None) -> None:
+        """Protect resources tagged ``key`` (with any value when ``value`` is ``None``)."""
+        if value is None:
+            self._tag_keys.add(key)
+        else:
+            self._tag_pairs.add((key, value))
+
+    @property
+    def has_tag_rules(self) -> bool:
+        return bool(self._tag_keys or self._tag_pairs)
+
+    def tag_reason(self, tags: Mapping[str, str]) -> str | None:
+        """Return the tag rule ``tags`` match, if any."""
+        for key, value in tags.items():
+            if key in self._tag_keys:
+                return f"tag:{key}"
+            if (key, value) in self._tag_pairs:
+                return f"tag:{key}={value}"
+        return None
+
+    def note(self, arn: str, tags: Mapping[str, str]) -> str | None:
+        """Remember ``arn`` as protected if its tags match a tag rule; return that rule."""
+        reason = self.tag_reason(tags)
+        if reason is not None:
+            self._noted[arn] = reason
+        return reason
+
+    def reason(self, arn: str) -> str | None:
+        """Return the rule protecting ``arn``, or ``None`` if it may be deleted."""
+        rule = self._noted.get(arn) or self._lookup(arn)
+        if rule is not None or not self._any_fields:
+            return rule
+        for variant in self._variants(arn)[1:]:
+            rule = self._lookup(variant)
+            if rule is not None:
+                return rule
+        return None
+
+    def _lookup(self, arn: str) -> str | None:
+        rule = self._exact.get(arn)
+        if rule is None and self._patterns:
+            rule = self._match_patterns(arn)
+        return rule
+
+    def _variants(self, arn: str) -> list[str]:
+        """Return ``arn`` as written and with each wildcarded field replaced by the placeholder."""
+        fields = arn.split(":", 5)
+        if len(fields) != 6:
+            return [arn]
+        variants = [fields]
+        for i in sorted(self._any_fields):
+            variants += [[*v[:i], _ANY_FIELD, *v[i + 1 :]] for v in variants]
+        return [":".join(v) for v in variants]
+
+    def _match_patterns(self, arn: str) -> str | None:
+        node, i = self._trie, 0
+        while True:
+            for pattern, rest in node.rules:
+                if rest is None or rest.fullmatch(arn, i):
+                    return pattern
+            if i == len(arn):
+                return None
+            edge = node.edges.get(arn[i])
+            if edge is None or not arn.startswith(edge[0], i):
+                return None
+            i += len(edge[0])
+            node = edge[1]
+
+    def __len__(self) -> int:
+        return len(self._exact) + self._patterns + len(self._tag_keys) + len(self._tag_pairs)
+
+
+# Lazy singleton, rebuilt from the configuration at the start of every run
+_protection: ProtectionIndex | None = None
+
+
+def get_protection() -> ProtectionIndex:
+    global _protection
+    if _protection is None:
+        _protection = ProtectionIndex.from_config(get_config())
+    return _protection
+
+
+def load_protection(config: Any) -> ProtectionIndex:
+    """Build the index of ``config``'s protection rules and make it the current one."""
+    global _protection
+    _protection = ProtectionIndex.from_config(config)
+    return _protection
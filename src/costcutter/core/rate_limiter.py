@@ -0,0 +1,266 @@
+"""Adaptive client-side rate limiting per region and API action.
+
+Every AWS call made by a resource handler goes through ``AdaptiveLimiter``.
+Each (account, region, action) gets a token bucket that smooths the request rate
+and a concurrency window managed with additive-increase/multiplicative-decrease
+(AIMD): a throttling error halves the window, every success grows it by about
+one slot per window's worth of calls. Throttled calls surface as
+``ThrottledError``, which the scheduler treats as a request to requeue the
+task instead of dropping the resource. AWS applies its limits per account,
+so in organization mode every member account has buckets of its own.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from botocore.exceptions import ClientError
+from botocore.paginate import TokenEncoder
+
+from costcutter.core.scheduler import RequeueTask
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_CODES = frozenset({
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "SlowDown",
+})
+
+DEFAULT_RATE = 10.0  # requests per second per (account, region, action)
+DEFAULT_BURST = 20.0
+DEFAULT_MAX_CONCURRENCY = 16
+DECREASE_FACTOR = 0.5
+# How long a caller waits for a token or window slot before giving its worker back
+ACQUIRE_TIMEOUT = 2.0
+# Discovery calls are retried in place (a generator cannot be requeued)
+MAX_PAGE_ATTEMPTS = 8
+
+
+class ThrottledError(RequeueTask):
+    """An AWS call was throttled, or could not get a local slot in time."""
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(min(10.0, 0.25 * 2**attempt) * random.uniform(0.5, 1.0))
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    if not isinstance(exc, ClientError):
+        return False
+    return exc.response.get("Error", {}).get("Code") in THROTTLE_CODES
+
+
+@dataclass(slots=True)
+class _Bucket:
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    window: float
+    inflight: int = 0
+    throttles: int = 0
+    calls: int = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class AdaptiveLimiter:
+    """Token bucket plus AIMD concurrency window per (account, region, action).
+
+    Calls that pass no ``account`` (e.g. the management account's own
+    setup calls) share the buckets of the empty account.
+
+    Args:
+        rate: Sustained requests per second for each (account, region, action).
+        burst: Bucket capacity, i.e. how many calls may go out back to back.
+        max_concurrency: Upper bound (and starting value) of the AIMD window.
+        per_action: Optional ``{action: rate}`` overrides of ``rate``.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_action: dict[str, float] | None = None,
+    ) -> None:
+        self._cond = threading.Condition()
+        self._buckets: dict[tuple[str, str, str], _Bucket] = {}
+        self.configure(rate=rate, burst=burst, max_concurrency=max_concurrency, per_action=per_action)
+
+    def configure(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_action: dict[str, float] | None = None,
+    ) -> None:
+        """Apply new limits; existing buckets and their learned windows are dropped."""
+        with self._cond:
+            self.rate = max(0.1, float(rate))
+            self.burst = max(1.0, float(burst))
+            self.max_concurrency = max(1, int(max_concurrency))
+            self.per_action = dict(per_action or {})
+            self._buckets.clear()
+            self._cond.notify_all()
+
+    def _bucket(self, region: str, action: str, account: str) -> _Bucket:
+        key = (account, region, action)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = float(self.per_action.get(action, self.rate))
+            bucket = _Bucket(
+                rate=rate,
+                capacity=self.burst,
+                tokens=self.burst,
+                updated=time.monotonic(),
+                window=float(self.max_concurrency),
+            )
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, region: str, action: str, timeout: float | None = ACQUIRE_TIMEOUT, account: str = "") -> bool:
+        """Wait for a token and a window slot; return False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            bucket = self._bucket(region, action, account)
+            while True:
+                now = time.monotonic()
+                bucket.refill(now)
+                if bucket.inflight < max(1, int(bucket.window)) and bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    bucket.inflight += 1
+                    return True
+                wait = None if bucket.tokens >= 1 else (1 - bucket.tokens) / bucket.rate
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(timeout=wait)
+
+    def release(self, region: str, action: str, throttled: bool = False, account: str = "") -> None:
+        with self._cond:
+            bucket = self._bucket(region, action, account)
+            bucket.inflight = max(0, bucket.inflight - 1)
+            bucket.calls += 1
+            if throttled:
+                bucket.throttles += 1
+                bucket.window = max(1.0, bucket.window * DECREASE_FACTOR)
+                # Drain the bucket so the next calls are spaced out by the refill rate
+                bucket.tokens = min(bucket.tokens, 0.0)
+                logger.info(
+                    "[%s] %s throttled%s; concurrency window now %.1f",
+                    region,
+                    action,
+                    f" in account {account}" if account else "",
+                    bucket.window,
+                )
+            else:
+                bucket.window = min(float(self.max_concurrency), bucket.window + 1.0 / bucket.window)
+            self._cond.notify_all()
+
+    @contextmanager
+    def limit(self, region: str, action: str, account: str = "") -> Iterator[None]:
+        """Guard one AWS call; throttling errors are re-raised as ``ThrottledError``."""
+        if not self.acquire(region, action, account=account):
+            raise ThrottledError(f"{action} in {region}: waited too long for a local rate-limit slot")
+        throttled = False
+        try:
+            yield
+        except ClientError as e:
+            if not is_throttle_error(e):
+                raise
+            throttled = True
+            raise ThrottledError(f"{action} in {region}: {e}") from e
+        finally:
+            self.release(region, action, throttled=throttled, account=account)
+
+    def paginate(
+        self,
+        region: str,
+        action: str,
+        paginator: Any,
+        token_key: str = "NextToken",
+        account: str = "",
+        **kwargs: Any,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield pages from a botocore paginator, one limited call per page.
+
+        A throttled page is retried in place after a backoff, resuming from
+        the last page's token, so discovery never restarts from scratch.
+        ``token_key`` names the token in both the response and the request
+        (``NextToken`` for EC2, ``PaginationToken`` for the tagging API).
+        """
+        pagination_config = dict(kwargs.pop("PaginationConfig", {}) or {})
+        attempts = 0
+        while True:
+            pages = iter(paginator.paginate(PaginationConfig=pagination_config, **kwargs))
+            try:
+                while True:
+                    with self.limit(region, action, account):
+                        page = next(pages, None)
+                    if page is None:
+                        return
+                    attempts = 0
+                    yield page
+                    token = page.get(token_key)
+                    if token:
+                        # botocore expects its own encoding of the request's token parameter, not the raw token
+                        pagination_config["StartingToken"] = TokenEncoder().encode({token_key: token})
+            except ThrottledError:
+                attempts += 1
+                if attempts >= MAX_PAGE_ATTEMPTS:
+                    raise
+                _backoff(attempts)
+
+    def call(
+        self, region: str, action: str, fn: Callable[..., Any], *args: Any, account: str = "", **kwargs: Any
+    ) -> Any:
+        """Make one limited call, retrying throttles in place.
+
+        For discovery calls that run on the caller's thread and so cannot be
+        requeued; deletes should use ``limit`` and let the scheduler requeue.
+        ``account`` picks the buckets and is not passed on to ``fn``.
+        """
+        attempts = 0
+        while True:
+            try:
+                with self.limit(region, action, account):
+                    return fn(*args, **kwargs)
+            except ThrottledError:
+                attempts += 1
+                if attempts >= MAX_PAGE_ATTEMPTS:
+                    raise
+                _backoff(attempts)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "throttled": sum(b.throttles for b in self._buckets.values()),
+                "rate_limited_calls": sum(b.calls for b in self._buckets.values()),
+            }
+
+
+# Lazy singleton
+_limiter: AdaptiveLimiter | None = None
+
+
+def get_rate_limiter() -> AdaptiveLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter()
+    return _limiter
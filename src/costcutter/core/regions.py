@@ -0,0 +1,175 @@
+"""Region resolution with an on-disk availability cache.
+
+Which regions a service is offered in comes from the SDK's endpoint data, and
+which regions are enabled for the account comes from ``ec2.describe_regions``
+(opt-in regions that were never enabled are left out). Both are stable for
+long periods, so the combined map is cached on disk with a TTL and repeated
+or scheduled runs start without redoing that setup. Entries are keyed by
+account id: profiles, assumed roles and environment credentials can all
+point at different accounts. Accounts cleaned in parallel, worker processes
+and concurrent runs update the file under a lock, each merging its own
+entry into what is on disk.
+"""
+
+import json
+import logging
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from boto3.session import Session
+
+from costcutter.core.clients import get_client
+from costcutter.core.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Region used for the describe_regions call when the session has none configured
+DEFAULT_API_REGION = "us-east-1"
+
+
+@dataclass(slots=True)
+class RegionInfo:
+    # Regions enabled for the account; None when they could not be determined
+    enabled: set[str] | None
+    # Regions each service is offered in
+    available: dict[str, set[str]]
+    from_cache: bool = False
+
+    def usable(self, service_key: str, region: str) -> bool:
+        """Whether ``service_key`` can run in ``region`` for this account."""
+        if self.enabled is not None and region not in self.enabled:
+            return False
+        regions = self.available.get(service_key)
+        # No regions means the SDK could not tell; default to allowed to avoid over-blocking
+        return True if not regions else region in regions
+
+
+def _load_cache(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable region cache %s: %s", path, e)
+        return {}
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``<path>.lock`` across threads and processes."""
+    with open(path.with_name(path.name + ".lock"), "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _save_entry(path: Path, account_id: str, entry: dict[str, Any]) -> None:
+    """Merge one account's entry into the cache file.
+
+    The file is re-read under the lock so entries written by other accounts
+    or runs since it was loaded are kept, and written through a temp file
+    of its own so a reader never sees a partial file.
+    """
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(path):
+            data = _load_cache(path)
+            data[account_id] = entry
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+            ) as fh:
+                tmp = Path(fh.name)
+                json.dump(data, fh, indent=2, sort_keys=True)
+            tmp.replace(path)
+    except OSError as e:
+        logger.warning("Could not write region cache %s: %s", path, e)
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+
+
+def _fetch_enabled_regions(session: Session, account_id: str) -> set[str] | None:
+    region = getattr(session, "region_name", None) or DEFAULT_API_REGION
+    try:
+        client = get_client(session, "ec2", region)
+        response = get_rate_limiter().call(
+            region, "DescribeRegions", client.describe_regions, account=account_id, AllRegions=False
+        )
+    except Exception as e:
+        logger.warning("Could not list enabled regions; not filtering by opt-in status: %s", e)
+        return None
+    return {r["RegionName"] for r in response.get("Regions", []) if r.get("RegionName")}
+
+
+def _fetch_available(session: Session, service_key: str) -> set[str]:
+    try:
+        return set(session.get_available_regions(service_key))
+    except Exception:
+        # If boto3 cannot determine regions for a service key, leave it unknown
+        return set()
+
+
+def resolve_regions(
+    session: Session,
+    account_id: str,
+    service_keys: list[str],
+    cache_path: str | Path | None = None,
+    ttl_seconds: float = DEFAULT_TTL_SECONDS,
+) -> RegionInfo:
+    """Return enabled regions and per-service availability, using the cache when fresh.
+
+    Args:
+        session: Session whose account the enabled regions are read for.
+        account_id: Account id of ``session`` (the cache key).
+        service_keys: Services the availability map must cover.
+        cache_path: JSON cache file; ``None`` disables the on-disk cache.
+        ttl_seconds: Maximum age of a cache entry.
+    """
+    path = Path(cache_path).expanduser() if cache_path else None
+    entry = (_load_cache(path) if path else {}).get(account_id) or {}
+    fresh = time.time() - float(entry.get("fetched_at", 0)) < ttl_seconds
+    cached_services = entry.get("services", {})
+
+    if fresh and all(s in cached_services for s in service_keys):
+        logger.info("Using cached region availability from %s", path)
+        enabled = entry.get("enabled")
+        return RegionInfo(
+            enabled=set(enabled) if enabled is not None else None,
+            available={s: set(cached_services[s]) for s in service_keys},
+            from_cache=True,
+        )
+
+    enabled = entry.get("enabled") if fresh else None
+    enabled_set = set(enabled) if enabled is not None else _fetch_enabled_regions(session, account_id)
+    services = dict(cached_services) if fresh else {}
+    for s in service_keys:
+        if s not in services:
+            services[s] = sorted(_fetch_available(session, s))
+
+    if path and enabled_set is not None:
+        # Only cache complete answers; an unknown enabled set is retried next run
+        fetched_at = entry["fetched_at"] if fresh else time.time()
+        _save_entry(path, account_id, {"fetched_at": fetched_at, "enabled": sorted(enabled_set), "services": services})
+    return RegionInfo(enabled=enabled_set, available={s: set(services[s]) for s in service_keys})
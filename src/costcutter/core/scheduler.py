@@ -0,0 +1,355 @@
+"""Global work scheduler shared by every region and service.
+
+All resource-level work of a run goes through one ``Scheduler`` so that
+``aws.max_workers`` bounds the total number of in-flight AWS calls, with
+optional per-region and per-service caps on top. Discovery runs on the
+caller's thread but takes a slot for each page it fetches, and submissions
+block once too many tasks are waiting, which keeps paginated discovery in
+step with the delete workers.
+
+When several accounts run side by side, each gets its own ``Scheduler`` and
+they all draw from one ``InflightLimit``, so ``aws.max_workers`` still bounds
+the calls in flight across the whole run.
+"""
+
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Self
+
+logger = logging.getLogger(__name__)
+
+# How many tasks may wait for a worker, per worker thread
+PENDING_PER_WORKER = 4
+# Requeue policy for tasks raising RequeueTask without an explicit delay
+MAX_REQUEUES = 20
+REQUEUE_BASE_DELAY = 0.25  # seconds, doubled per requeue
+REQUEUE_MAX_DELAY = 10.0
+
+
+class RequeueTask(Exception):  # noqa: N818 - a control-flow signal, not an error
+    """Raised by a task to be scheduled again instead of failing.
+
+    Args:
+        message: Why the task is requeued (logged).
+        delay: Seconds to wait before the task becomes runnable again. When
+            omitted an exponential backoff with jitter is used.
+        retry: Zero-argument callable to run instead of the original task,
+            e.g. to retry only the part of a batch that did not complete.
+    """
+
+    def __init__(self, message: str = "", delay: float | None = None, retry: Callable[[], Any] | None = None):
+        super().__init__(message)
+        self.delay = delay
+        self.retry = retry
+
+
+class InflightLimit:
+    """Cap on in-flight calls shared by several schedulers.
+
+    Args:
+        limit: Maximum number of calls in flight across every scheduler
+            drawing from this limit.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._schedulers: weakref.WeakSet[Scheduler] = weakref.WeakSet()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.limit:
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+            waiting = list(self._schedulers)
+        # A freed slot may be taken by any scheduler, so wake all of them
+        for scheduler in waiting:
+            scheduler._wake()
+
+    def register(self, scheduler: "Scheduler") -> None:
+        with self._lock:
+            self._schedulers.add(scheduler)
+
+
+@dataclass(slots=True)
+class _Task:
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    region: str
+    service: str
+    future: Future = field(default_factory=Future)
+    requeues: int = 0
+    not_before: float = 0.0
+
+
+class Scheduler:
+    """Run resource-level tasks under global, per-region and per-service caps.
+
+    Args:
+        max_workers: Maximum number of concurrent AWS calls across the run.
+        region_limit: Optional cap on concurrent calls within one region.
+        service_limit: Optional cap on concurrent calls for one service.
+        max_pending: Number of submitted tasks allowed to wait for a slot
+            before ``submit`` blocks. Defaults to
+            ``max_workers * PENDING_PER_WORKER``.
+        shared: Optional run-wide limit this scheduler shares with others;
+            every call also takes one of its slots.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        region_limit: int | None = None,
+        service_limit: int | None = None,
+        max_pending: int | None = None,
+        shared: InflightLimit | None = None,
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.region_limit = region_limit if region_limit and region_limit > 0 else None
+        self.service_limit = service_limit if service_limit and service_limit > 0 else None
+        self.max_pending = max_pending if max_pending and max_pending > 0 else self.max_workers * PENDING_PER_WORKER
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="costcutter")
+        self._cond = threading.Condition()
+        self._pending: deque[_Task] = deque()
+        self._inflight = 0
+        self._by_region: Counter[str] = Counter()
+        self._by_service: Counter[str] = Counter()
+        # Callers waiting in slot(); the dispatcher leaves room for them so discovery is not starved
+        self._slot_waiters = 0
+        self._local = threading.local()
+        self._peak_inflight = 0
+        self._requeued = 0
+        self._shared = shared
+        if shared is not None:
+            shared.register(self)
+
+    # -- accounting (all called with self._cond held) -------------------------
+
+    def _has_capacity(self, region: str, service: str, reserve: int = 0) -> bool:
+        if self._inflight + reserve >= self.max_workers:
+            return False
+        if self.region_limit is not None and self._by_region[region] >= self.region_limit:
+            return False
+        return not (self.service_limit is not None and self._by_service[service] >= self.service_limit)
+
+    def _admit(self, region: str, service: str, reserve: int = 0) -> bool:
+        """Check the local caps, then take a run-wide slot if there is a shared limit."""
+        if not self._has_capacity(region, service, reserve):
+            return False
+        return self._shared is None or self._shared.try_acquire()
+
+    def _take(self, region: str, service: str) -> None:
+        self._inflight += 1
+        self._by_region[region] += 1
+        self._by_service[service] += 1
+        self._peak_inflight = max(self._peak_inflight, self._inflight)
+
+    def _give_back(self, region: str, service: str) -> None:
+        self._inflight -= 1
+        self._by_region[region] -= 1
+        self._by_service[service] -= 1
+
+    def _pump(self) -> None:
+        """Dispatch every pending task that currently fits under the caps."""
+        if not self._pending:
+            return
+        reserve = min(self._slot_waiters, self.max_workers - 1)
+        now = time.monotonic()
+        kept: deque[_Task] = deque()
+        while self._pending:
+            if self._inflight + reserve >= self.max_workers:
+                break
+            task = self._pending.popleft()
+            if task.not_before > now or not self._has_capacity(task.region, task.service, reserve):
+                kept.append(task)
+                continue
+            if self._shared is not None and not self._shared.try_acquire():
+                # The run-wide limit is full; release() wakes us when a slot frees up
+                kept.append(task)
+                break
+            self._take(task.region, task.service)
+            self._executor.submit(self._run, task)
+        kept.extend(self._pending)
+        self._pending = kept
+        self._cond.notify_all()
+
+    def _release(self, region: str, service: str) -> None:
+        with self._cond:
+            self._give_back(region, service)
+            self._pump()
+            self._cond.notify_all()
+        # Outside our lock: releasing wakes every scheduler sharing the limit
+        if self._shared is not None:
+            self._shared.release()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._pump()
+            # slot() callers may be waiting on the shared limit alone
+            self._cond.notify_all()
+
+    def _requeue(self, task: _Task, signal: RequeueTask) -> None:
+        task.requeues += 1
+        if signal.retry is not None:
+            task.fn, task.args, task.kwargs = signal.retry, (), {}
+        delay = signal.delay
+        if delay is None:
+            delay = min(REQUEUE_MAX_DELAY, REQUEUE_BASE_DELAY * 2 ** (task.requeues - 1))
+            delay *= random.uniform(0.5, 1.0)
+        task.not_before = time.monotonic() + delay
+        logger.info(
+            "[%s][%s] Requeued task (attempt %d, in %.2fs): %s", task.region, task.service, task.requeues, delay, signal
+        )
+        with self._cond:
+            self._requeued += 1
+            # Requeued work was already admitted once, so it skips the pending bound
+            self._pending.append(task)
+        timer = threading.Timer(delay, self._wake)
+        timer.daemon = True
+        timer.start()
+
+    def _run(self, task: _Task) -> None:
+        self._local.in_worker = True
+        try:
+            if task.requeues or task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args, **task.kwargs))
+                except RequeueTask as signal:
+                    if task.requeues < MAX_REQUEUES:
+                        self._requeue(task, signal)
+                    else:
+                        task.future.set_exception(signal)
+                except BaseException as exc:
+                    task.future.set_exception(exc)
+        finally:
+            self._release(task.region, task.service)
+
+    # -- public API ------------------------------------------------------------
+
+    def submit(self, fn: Callable[..., Any], *args: Any, region: str, service: str, **kwargs: Any) -> Future:
+        """Queue ``fn(*args, **kwargs)`` and return its future.
+
+        Blocks while ``max_pending`` tasks are already waiting, unless called
+        from one of the scheduler's own worker threads (which must never wait
+        on the queue they are draining).
+        """
+        task = _Task(fn, args, kwargs, region, service)
+        with self._cond:
+            if not getattr(self._local, "in_worker", False):
+                self._cond.wait_for(lambda: len(self._pending) < self.max_pending)
+            self._pending.append(task)
+            self._pump()
+        return task.future
+
+    @contextmanager
+    def slot(self, region: str, service: str) -> Iterator[None]:
+        """Hold one concurrency slot on the calling thread (e.g. for a discovery call)."""
+        with self._cond:
+            self._slot_waiters += 1
+            try:
+                self._cond.wait_for(lambda: self._admit(region, service))
+            finally:
+                self._slot_waiters -= 1
+            self._take(region, service)
+        try:
+            yield
+        finally:
+            self._release(region, service)
+
+    def iter_limited[T](self, items: Iterable[T], region: str, service: str) -> Iterator[T]:
+        """Yield from ``items``, holding a slot while each item is fetched.
+
+        Wraps a paginated discovery generator so page requests count against
+        the same caps as the delete calls.
+        """
+        it = iter(items)
+        while True:
+            with self.slot(region, service):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def map[T](self, items: Iterable[T], fn: Callable[[T], Any], region: str, service: str) -> int:
+        """Submit ``fn(item)`` for each item and wait for all of them.
+
+        Items are pulled lazily, so submission backpressure throttles the
+        producer. Only a counter is kept per call, not the futures, so memory
+        does not grow with the number of items.
+
+        Returns:
+            Number of items processed.
+
+        Raises:
+            Exception: The first exception raised by ``fn``, after every
+                submitted item has finished. No further items are pulled once
+                a task has failed.
+        """
+        done = threading.Condition()
+        state = {"outstanding": 0}
+        errors: list[BaseException] = []
+
+        def _on_done(fut: Future) -> None:
+            exc = fut.exception()
+            with done:
+                if exc is not None:
+                    errors.append(exc)
+                state["outstanding"] -= 1
+                done.notify_all()
+
+        submitted = 0
+        for item in items:
+            if errors:
+                break
+            with done:
+                state["outstanding"] += 1
+            self.submit(fn, item, region=region, service=service).add_done_callback(_on_done)
+            submitted += 1
+        with done:
+            done.wait_for(lambda: state["outstanding"] == 0)
+        if errors:
+            raise errors[0]
+        return submitted
+
+    @property
+    def peak_inflight(self) -> int:
+        return self._peak_inflight
+
+    @property
+    def requeued(self) -> int:
+        return self._requeued
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+
+
+@contextmanager
+def scheduler_scope(scheduler: Scheduler | None, max_workers: int = 1) -> Iterator[Scheduler]:
+    """Yield ``scheduler``, or a private one shut down on exit when none is given."""
+    if scheduler is not None:
+        yield scheduler
+        return
+    with Scheduler(max_workers=max_workers) as own:
+        yield own
@@ -0,0 +1,239 @@
+"""Resource selection rules (the ``selection`` config section).
+
+By default every resource of the selected types is cleaned up. Selection
+rules narrow that down by tags, instance state, age and name. A rule is
+compiled once per catalog call:
+
+- whatever the describe API can filter on is sent as its ``Filters``
+  parameter, so AWS returns (and we download and parse) only matching
+  resources: required tags (``tag:<key>``, wildcards allowed), instance
+  states and name patterns;
+- the rest (excluded tags, minimum age, and name patterns a resource type
+  cannot filter on) becomes one Python check, built from precompiled
+  parts, that runs on every resource of the streamed pages.
+
+A resource type that cannot evaluate an active rule (e.g. an instance state
+rule for key pairs, which have no state) matches nothing: a narrowed run
+must never delete more than it was narrowed to.
+
+The tagging API discovery backend pushes required tags down as
+``TagFilters`` and applies excluded tags to the returned tags. Rules it
+cannot evaluate (state, age, names, wildcard tag values) make the run fall
+back to describe calls.
+"""
+
+import re
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from fnmatch import translate
+from typing import Any
+
+from costcutter.conf.config import get_config
+
+# Values of a tag rule that match any value of the tag
+ANY_VALUE = ("*",)
+
+TagRules = tuple[tuple[str, tuple[str, ...]], ...]
+Predicate = Callable[[Mapping[str, Any]], bool]
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceFields:
+    """Where a resource type keeps what selection rules look at.
+
+    ``name_filter`` and ``state_filter`` are the describe API filter names,
+    or ``None`` when the API cannot filter on them.
+    """
+
+    name_of: Callable[[Mapping[str, Any]], str | None]
+    name_filter: str | None = None
+    state_of: Callable[[Mapping[str, Any]], str | None] | None = None
+    state_filter: str | None = None
+    created_field: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledSelection:
+    filters: list[dict[str, Any]] = field(default_factory=list)
+    predicate: Predicate | None = None
+    # Config keys of the rules the resource type cannot evaluate; it then matches nothing
+    unsupported: tuple[str, ...] = ()
+
+    def select(self, items: Iterable[Mapping[str, Any]]) -> Iterator[Mapping[str, Any]]:
+        """Yield the items that pass the Python checks (all of them when there are none)."""
+        if self.unsupported:
+            return
+        if self.predicate is None:
+            yield from items
+        else:
+            yield from filter(self.predicate, items)
+
+
+def tag_map(item: Mapping[str, Any]) -> dict[str, str]:
+    """Return a describe/tagging API item's ``Tags`` list as a dict."""
+    return {t.get("Key", ""): t.get("Value", "") for t in item.get("Tags") or ()}
+
+
+def _is_any(values: tuple[str, ...]) -> bool:
+    return not values or values == ANY_VALUE
+
+
+def _pattern(patterns: Iterable[str]) -> re.Pattern[str]:
+    # One regex for all the glob patterns, matched case-sensitively like EC2 filters
+    return re.compile("|".join(f"(?:{translate(p)})" for p in patterns))
+
+
+def _tag_check(rules: TagRules) -> Callable[[dict[str, str]], bool]:
+    """Compile ``rules`` into a check that a tag dict matches every rule."""
+    compiled = [(key, None if _is_any(values) else _pattern(values)) for key, values in rules]
+
+    def check(tags: dict[str, str]) -> bool:
+        for key, pattern in compiled:
+            value = tags.get(key)
+            if value is None or (pattern is not None and not pattern.match(value)):
+                return False
+        return True
+
+    return check
+
+
+def _exclusion(rules: TagRules) -> Callable[[dict[str, str]], bool]:
+    """Compile ``rules`` into a check that a tag dict matches at least one rule."""
+    checks = [_tag_check(((key, values),)) for key, values in rules]
+    return lambda tags: any(check(tags) for check in checks)
+
+
+def _normalize_tags(raw: Any) -> TagRules:
+    if not raw:
+        return ()
+    if hasattr(raw, "to_dict"):
+        raw = raw.to_dict()
+    rules = []
+    for key, values in raw.items():
+        if values is None or values == "":
+            values = ()
+        elif isinstance(values, str | int | float):
+            values = (str(values),)
+        rules.append((str(key), tuple(str(v) for v in values)))
+    return tuple(rules)
+
+
+@dataclass(frozen=True, slots=True)
+class Selection:
+    """Which resources a run cleans up; empty means all of them."""
+
+    tags: TagRules = ()
+    exclude_tags: TagRules = ()
+    states: tuple[str, ...] = ()
+    min_age_days: float = 0.0
+    name_patterns: tuple[str, ...] = ()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "Selection":
+        cfg = getattr(config, "selection", None)
+        if cfg is None:
+            return cls()
+        return cls(
+            tags=_normalize_tags(getattr(cfg, "tags", None)),
+            exclude_tags=_normalize_tags(getattr(cfg, "exclude_tags", None)),
+            states=tuple(str(s) for s in getattr(cfg, "instance_states", None) or ()),
+            min_age_days=float(getattr(cfg, "min_age_days", None) or 0),
+            name_patterns=tuple(str(p) for p in getattr(cfg, "name_patterns", None) or ()),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.exclude_tags or self.states or self.min_age_days or self.name_patterns)
+
+    def compile(self, fields: ResourceFields, now: datetime | None = None) -> CompiledSelection:
+        """Split the rules into describe ``Filters`` and a Python predicate for one resource type."""
+        if not self:
+            return CompiledSelection()
+        unsupported = []
+        if self.states and fields.state_filter is None and fields.state_of is None:
+            unsupported.append("instance_states")
+        if self.min_age_days and fields.created_field is None:
+            unsupported.append("min_age_days")
+        if unsupported:
+            return CompiledSelection(unsupported=tuple(unsupported))
+        filters = [{"Name": f"tag:{key}", "Values": list(values or ANY_VALUE)} for key, values in self.tags]
+        checks: list[Predicate] = []
+
+        if self.states and fields.state_filter is not None:
+            filters.append({"Name": fields.state_filter, "Values": list(self.states)})
+        elif self.states:
+            states, state_of = frozenset(self.states), fields.state_of
+            checks.append(lambda item: state_of(item) in states)
+
+        if self.name_patterns:
+            name_filter = fields.name_filter
+            # A tag:Name rule already uses that filter name; check the patterns here instead
+            if name_filter is not None and not any(name_filter == f["Name"] for f in filters):
+                filters.append({"Name": name_filter, "Values": list(self.name_patterns)})
+            else:
+                pattern, name_of = _pattern(self.name_patterns), fields.name_of
+
+                def name_matches(item: Mapping[str, Any]) -> bool:
+                    name = name_of(item)
+                    return name is not None and pattern.match(name) is not None
+
+                checks.append(name_matches)
+
+        if self.min_age_days:
+            cutoff = (now or datetime.now(UTC)) - timedelta(days=self.min_age_days)
+            created_field = fields.created_field
+            checks.append(lambda item: _created_before(item.get(created_field), cutoff))
+
+        if self.exclude_tags:
+            excluded = _exclusion(self.exclude_tags)
+            checks.append(lambda item: not excluded(tag_map(item)))
+
+        if not checks:
+            predicate = None
+        elif len(checks) == 1:
+            predicate = checks[0]
+        else:
+            predicate = lambda item: all(check(item) for check in checks)  # noqa: E731
+        return CompiledSelection(filters, predicate)
+
+    def tagging_filters(self) -> list[dict[str, Any]] | None:
+        """Return ``TagFilters`` for the tagging API, or ``None`` if it cannot apply these rules.
+
+        The tagging API only returns ARNs and tags and matches tag values
+        exactly, so state, age and name rules and wildcard values need
+        describe calls.
+        """
+        if self.states or self.min_age_days or self.name_patterns:
+            return None
+        filters = []
+        for key, values in self.tags:
+            if _is_any(values):
+                filters.append({"Key": key})
+            elif any(ch in v for v in values for ch in "*?["):
+                return None
+            else:
+                filters.append({"Key": key, "Values": list(values)})
+        return filters
+
+    def exclusion(self) -> Callable[[dict[str, str]], bool] | None:
+        """Return a check whether a tag dict matches an ``exclude_tags`` rule, if there are any."""
+        return _exclusion(self.exclude_tags) if self.exclude_tags else None
+
+
+def _created_before(value: Any, cutoff: datetime) -> bool:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return False
+    if not isinstance(value, datetime):
+        # Unknown age: never old enough to be deleted
+        return False
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value <= cutoff
+
+
+def get_selection() -> Selection:
+    """Return the selection rules of the current configuration."""
+    return Selection.from_config(get_config())
@@ -0,0 +1,191 @@
+"""Timeline spans of a run, exported in Chrome trace-event format.
+
+Tracing is off unless ``start_tracing`` was called (the CLI's ``--trace``).
+While it is off, ``span`` returns a shared no-op context manager and
+``traced`` functions call straight through, so the instrumentation costs a
+global lookup per call. While it is on, each span is appended to a deque
+(thread-safe without a lock) as a complete ("X") event with its thread id
+and its region, service and resource. The file opens in
+``chrome://tracing`` or https://ui.perfetto.dev, with one lane per thread,
+so waiting on discovery, slow deletes, idle workers or a lagging region
+show up at a glance.
+
+Timestamps are wall-clock microseconds, so spans recorded by the process
+engine's workers line up with the parent's when merged.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
+_NOOP = nullcontext()
+
+
+class Tracer:
+    """Collects complete spans from every thread of one process."""
+
+    def __init__(self) -> None:
+        self._events: deque[dict[str, Any]] = deque()
+        self._threads: dict[int, str] = {}
+        self._origin_ns = time.perf_counter_ns()
+        self._epoch_us = time.time_ns() / 1000
+        self.pid = os.getpid()
+
+    def now_us(self) -> float:
+        return self._epoch_us + (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    def add(self, name: str, cat: str, start_us: float, end_us: float, args: dict[str, Any]) -> None:
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self._events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(end_us - start_us, 1),
+            "pid": self.pid,
+            "tid": tid,
+            "args": args,
+        })
+
+    def events(self) -> list[dict[str, Any]]:
+        """Return the spans plus one thread-name record per thread that recorded any."""
+        names = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        return names + list(self._events)
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Return the events recorded so far and start over (used by worker processes)."""
+        events = self.events()
+        self._events.clear()
+        return events
+
+    def merge(self, events: Iterable[dict[str, Any]]) -> None:
+        """Add events recorded by another process; they keep their own pid and tid."""
+        self._events.extend(events)
+
+    def write(self, path: str | Path) -> Path:
+        target = Path(path).expanduser()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("w", encoding="utf-8") as fh:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, fh)
+        return target
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> dict[str, Any]:
+        self.start = self.tracer.now_us()
+        # Callers may add results (counts, status) to the span's args
+        return self.args
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # GeneratorExit only means a traced generator's consumer stopped early
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.cat, self.start, self.tracer.now_us(), self.args)
+
+
+# None while tracing is off
+_tracer: Tracer | None = None
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def start_tracing() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Tracer | None:
+    """Turn tracing off and return the tracer with what it recorded."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name: str, cat: str = "run", **args: Any) -> Any:
+    """Context manager timing a block as one span (a no-op while tracing is off)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, name, cat, args)
+
+
+def traced(cat: str, **static_args: Any) -> Callable[[Callable], Callable]:
+    """Record each call of the decorated function as a span named after it.
+
+    The span's args are ``static_args`` plus the call's ``region`` argument.
+    For generator functions the span runs from the first item to the last
+    and counts the items, so it includes the time the consumer spends
+    between them.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        params = list(inspect.signature(fn).parameters)
+        region_index = params.index("region") if "region" in params else None
+        name = fn.__name__
+
+        def _args(args: tuple, kwargs: dict) -> dict[str, Any]:
+            region = kwargs.get("region")
+            if region is None and region_index is not None and region_index < len(args):
+                region = args[region_index]
+            return {"region": region, **static_args}
+
+        if inspect.isgeneratorfunction(fn):
+
+            def _traced_items(tracer: Tracer, items: Iterator, span_args: dict[str, Any]) -> Iterator:
+                count = 0
+                with _Span(tracer, name, cat, span_args) as out:
+                    try:
+                        for item in items:
+                            count += 1
+                            yield item
+                    finally:
+                        out["items"] = count
+
+            @functools.wraps(fn)
+            def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+                tracer = _tracer
+                if tracer is None:
+                    return fn(*args, **kwargs)
+                return _traced_items(tracer, fn(*args, **kwargs), _args(args, kwargs))
+
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, cat, _args(args, kwargs)):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
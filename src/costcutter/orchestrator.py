@@ -1,15 +1,40 @@
 import inspect
 import logging
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 from boto3.session import Session
 
-from costcutter.conf.config import get_config
+from costcutter.conf.config import Config, get_config
+from costcutter.core.arn import arn_prefix
+from costcutter.core.clients import get_client_registry
+from costcutter.core.dag import DagExecutor, ResourceHandler, qualify
+from costcutter.core.discovery import DISCOVERY_BACKENDS, TaggingDiscovery
+from costcutter.core.inventory import DEFAULT_INVENTORY_PATH, Inventory
+from costcutter.core.journal import DEFAULT_BATCH_SIZE as JOURNAL_BATCH_SIZE
+from costcutter.core.journal import DEFAULT_FLUSH_INTERVAL as JOURNAL_FLUSH_INTERVAL
+from costcutter.core.journal import DEFAULT_JOURNAL_PATH, Journal, set_journal
+from costcutter.core.metrics import get_api_metrics
+from costcutter.core.organizations import (
+    DEFAULT_ROLE_NAME,
+    DEFAULT_SESSION_DURATION,
+    Account,
+    RoleSessions,
+    list_member_accounts,
+)
+from costcutter.core.protection import load_protection
+from costcutter.core.rate_limiter import DEFAULT_BURST, DEFAULT_RATE, get_rate_limiter
+from costcutter.core.regions import DEFAULT_TTL_SECONDS, resolve_regions
+from costcutter.core.scheduler import InflightLimit, Scheduler
+from costcutter.core.selection import Selection
 from costcutter.core.session_helper import create_aws_session
+from costcutter.core.tracing import get_tracer, span
+from costcutter.progress import RunProgress
+from costcutter.services.common import _get_account_id
 
 # Reporter no longer needed at service-level (resource handlers still record events)
+from costcutter.services.ec2 import HANDLERS as EC2_HANDLERS
 from costcutter.services.ec2 import cleanup_ec2
 
 logger = logging.getLogger(__name__)
@@ -21,11 +46,49 @@ SERVICE_HANDLERS = {
     # "lambda": cleanup_lambda,
 }
 
+# Per-resource handlers with their dependencies. Services listed here are torn down
+# resource type by resource type in dependency order; any other service in
+# SERVICE_HANDLERS runs as a single node.
+RESOURCE_HANDLERS: dict[str, dict[str, ResourceHandler]] = {
+    "ec2": EC2_HANDLERS,
+}
+
+
+def _build_graph(service_keys: list[str]) -> tuple[dict[str, tuple[str, ...]], dict[str, tuple[str, Callable]]]:
+    """Return the teardown graph ``{node: deps}`` and ``{node: (service, handler)}``.
+
+    Nodes are ``service.resource`` keys. Dependencies on services that are not
+    selected for this run are dropped: those resources are not being removed.
+    """
+    handlers: dict[str, tuple[str, Callable]] = {}
+    declared: dict[str, tuple[str, ...]] = {}
+    for service_key in service_keys:
+        resources = RESOURCE_HANDLERS.get(service_key)
+        if not resources:
+            handlers[service_key] = (service_key, SERVICE_HANDLERS[service_key])
+            declared[service_key] = ()
+            continue
+        for resource_key, handler in resources.items():
+            node = qualify(service_key, resource_key)
+            handlers[node] = (service_key, handler.fn)
+            declared[node] = tuple(qualify(service_key, d) for d in handler.depends_on)
+    graph = {node: tuple(d for d in deps if d in handlers) for node, deps in declared.items()}
+    return graph, handlers
 
-def _service_supported_in_region(available_regions_map: dict[str, set[str]], service_key: str, region: str) -> bool:
-    regions = available_regions_map.get(service_key)
-    # If mapping unknown, default to allowed to avoid over-blocking
-    return True if regions is None else region in regions
+
+def _tagging_types(service_keys: list[str]) -> dict[str, str]:
+    """Return ``{tagging type: node}`` for the selected resources the tagging API can list."""
+    types: dict[str, str] = {}
+    for service_key in service_keys:
+        for resource_key, handler in (RESOURCE_HANDLERS.get(service_key) or {}).items():
+            if handler.tagging_type:
+                types[handler.tagging_type] = qualify(service_key, resource_key)
+    return types
+
+
+def _resource_handler(node: str) -> ResourceHandler | None:
+    service_key, _, resource_key = node.partition(".")
+    return (RESOURCE_HANDLERS.get(service_key) or {}).get(resource_key)
 
 
 def process_region_service(
@@ -34,6 +97,8 @@ def process_region_service(
     service_key: str,
     handler_entry: Callable,
     dry_run: bool,
+    scheduler: Scheduler | None = None,
+    discovered: Iterable[str] | None = None,
 ) -> None:
     logger.info("[%s][%s] Starting (dry_run=%s)", region, service_key, dry_run)
 
@@ -42,7 +107,12 @@ def process_region_service(
     if inspect.isfunction(handler_entry):
         try:
             logger.info("[%s][%s] Executing service handler", region, service_key)
-            handler_entry(session=session, region=region, dry_run=dry_run)
+            kwargs = {"scheduler": scheduler} if scheduler is not None else {}
+            if discovered is not None:
+                kwargs["discovered"] = discovered
+            service, _, resource = service_key.partition(".")
+            with span(service_key, "node", region=region, service=service, resource=resource or None):
+                handler_entry(session=session, region=region, dry_run=dry_run, **kwargs)
         except Exception as e:
             logger.exception("[%s][%s] Failed: %s", region, service_key, e)
             raise
@@ -53,10 +123,291 @@ def process_region_service(
     raise TypeError(f"Unsupported handler type for service '{service_key}': {type(handler_entry)!r}")
 
 
+ENGINES = ("threads", "processes")
+
+
+@dataclass(frozen=True, slots=True)
+class RunSettings:
+    """What a run needs to execute the teardown graph in one account.
+
+    Plain data, so the process engine can ship it to worker processes.
+    """
+
+    dry_run: bool
+    service_keys: tuple[str, ...]
+    nodes_by_region: dict[str, list[str]]
+    max_workers: int
+    region_limit: int | None = None
+    service_limit: int | None = None
+    # Optional cap on in-flight calls within one account, below the run-wide max_workers
+    account_limit: int | None = None
+    backend: str = "describe"
+    organization: bool = False
+    selection: Selection = Selection()
+    # Where run_account caches each member account's enabled regions in organization mode
+    region_cache_path: str | None = None
+    region_cache_ttl: float = DEFAULT_TTL_SECONDS
+
+    def scope(self, account: str, region: str) -> str:
+        """Progress and journal key of a region; qualified by account only in organization mode."""
+        return f"{account}/{region}" if self.organization else region
+
+    @property
+    def account_workers(self) -> int:
+        """In-flight call cap of one account's scheduler."""
+        if self.account_limit:
+            return min(self.account_limit, self.max_workers)
+        return self.max_workers
+
+
+def configure_limits(config: Config, max_workers: int) -> None:
+    """Size client pools and the adaptive rate limiter for ``max_workers`` concurrent calls."""
+    # Size each client's connection pool to the number of threads that may share it
+    get_client_registry().configure(max_pool_connections=max_workers)
+    # Adaptive per-region/per-action limits; the AIMD window never exceeds the worker count
+    rate_cfg = getattr(getattr(config, "aws", None), "rate_limit", None)
+    per_action = getattr(rate_cfg, "per_action", None)
+    if hasattr(per_action, "to_dict"):
+        per_action = per_action.to_dict()
+    get_rate_limiter().configure(
+        rate=getattr(rate_cfg, "requests_per_second", None) or DEFAULT_RATE,
+        burst=getattr(rate_cfg, "burst", None) or DEFAULT_BURST,
+        max_concurrency=max_workers,
+        per_action=per_action,
+    )
+
+
+def role_sessions(config: Config, session: Session) -> RoleSessions:
+    org_cfg = getattr(getattr(config, "aws", None), "organization", None)
+    return RoleSessions(
+        session,
+        role_name=getattr(org_cfg, "role_name", None) or DEFAULT_ROLE_NAME,
+        duration_seconds=getattr(org_cfg, "session_duration_seconds", None) or DEFAULT_SESSION_DURATION,
+        external_id=getattr(org_cfg, "external_id", None),
+    )
+
+
+def _open_inventory(config: Config, dry_run: bool, incremental: bool, run_id: int | None = None) -> Inventory | None:
+    inventory_cfg = getattr(config, "inventory", None)
+    if not (incremental or getattr(inventory_cfg, "enabled", False)):
+        return None
+    path = getattr(inventory_cfg, "path", None) or DEFAULT_INVENTORY_PATH
+    return Inventory(path, dry_run=dry_run, incremental=incremental, run_id=run_id)
+
+
+def _open_journal(config: Config, dry_run: bool, resume: bool, attach: bool = False, discard: bool = False) -> Journal:
+    """Open the run's journal and make it the active one; a disabled journal for dry runs."""
+    journal_cfg = getattr(config, "journal", None)
+    journal = Journal()
+    # Only real runs are journaled: there is nothing to resume in a dry run
+    if resume and dry_run:
+        if not attach:
+            logger.warning("--resume has no effect on a dry run")
+    elif not dry_run and (resume or getattr(journal_cfg, "enabled", True)):
+        journal = Journal(
+            getattr(journal_cfg, "path", None) or DEFAULT_JOURNAL_PATH,
+            resume=resume,
+            batch_size=getattr(journal_cfg, "batch_size", None) or JOURNAL_BATCH_SIZE,
+            flush_interval=getattr(journal_cfg, "flush_interval_seconds", None) or JOURNAL_FLUSH_INTERVAL,
+            attach=attach,
+            discard=discard,
+        )
+    set_journal(journal)
+    return journal
+
+
+def run_account(
+    settings: RunSettings,
+    session: Session,
+    account: str,
+    regions: Iterable[str],
+    inventory: Inventory | None,
+    journal: Journal,
+    on_node_done: Callable[[str, str, str], None] | None = None,
+    shared_limit: InflightLimit | None = None,
+) -> dict[str, int]:
+    """Run the teardown graph in ``regions`` of one account.
+
+    ``on_node_done`` is called with (scope, node, status) once a node
+    finished (see ``RunSettings.scope``). In organization mode, regions that
+    are not enabled for ``account`` are skipped and their nodes reported
+    with the ``skipped`` status. Accounts run side by side pass the same
+    ``shared_limit`` so ``max_workers`` bounds the calls of all of them.
+    """
+    graph, node_handlers = _build_graph(list(settings.service_keys))
+    nodes_by_region = settings.nodes_by_region
+    regions = list(regions)
+    skipped = 0
+    if settings.organization:
+        enabled = resolve_regions(
+            session,
+            account,
+            list(settings.service_keys),
+            cache_path=settings.region_cache_path,
+            ttl_seconds=settings.region_cache_ttl,
+        ).enabled
+        if enabled is not None:
+            for region in regions:
+                if region in enabled:
+                    continue
+                scope = settings.scope(account, region)
+                logger.warning("[%s] Skipped: region is not enabled for this account", scope)
+                skipped += len(nodes_by_region[region])
+                if on_node_done is not None:
+                    for node in nodes_by_region[region]:
+                        on_node_done(scope, node, "skipped")
+            regions = [r for r in regions if r in enabled]
+    tasks = sum(len(nodes_by_region[r]) for r in regions)
+    # One scheduler bounds every AWS call made in the account. The DAG driver threads only
+    # run discovery and hand resource-level work to it, so they get their own small pool.
+    scheduler = Scheduler(
+        max_workers=settings.account_workers,
+        region_limit=settings.region_limit,
+        service_limit=settings.service_limit,
+        shared=shared_limit,
+    )
+    tagging = None
+    if settings.backend == "tagging":
+        tagging = TaggingDiscovery(
+            session,
+            _tagging_types(list(settings.service_keys)),
+            scheduler=scheduler,
+            selection=settings.selection,
+            account=account,
+        )
+
+    def _on_node_done(region: str, node: str, status: str) -> None:
+        scope = settings.scope(account, region)
+        if status == "completed":
+            journal.finish_node(scope, node)
+        if on_node_done is not None:
+            on_node_done(scope, node, status)
+
+    def _run_node(region: str, node: str) -> None:
+        scope = settings.scope(account, region)
+        if journal.node_done(scope, node):
+            logger.info("[%s][%s] Skipped: already done in the resumed run", scope, node)
+            return
+        service_key, handler_entry = node_handlers[node]
+        discovered = tagging.ids_for(region, node) if tagging is not None else None
+        handler = _resource_handler(node)
+        if (
+            (inventory is not None or journal.enabled)
+            and handler is not None
+            and handler.catalog
+            and handler.tagging_type
+        ):
+            if discovered is not None:
+                records = ((i, None) for i in discovered)
+            else:
+                records = scheduler.iter_limited(handler.catalog(session, region), region, service_key)
+            if inventory is not None:
+                # The inventory records every resource and, in incremental mode,
+                # passes on only the new or changed ones. Only a full describe
+                # listing shows which resources are gone.
+                complete = discovered is None and not settings.selection
+                discovered = inventory.observe(region, account, handler.tagging_type, records, prune=complete)
+            else:
+                discovered = (i for i, _ in records)
+            discovered = journal.plan(scope, node, arn_prefix(handler.tagging_type, region, account), discovered)
+        process_region_service(session, region, node, handler_entry, settings.dry_run, scheduler, discovered)
+
+    with scheduler:
+        result = DagExecutor(
+            graph,
+            regions,
+            _run_node,
+            max_workers=min(settings.account_workers, max(1, tasks)),
+            nodes_for_region=nodes_by_region.__getitem__,
+            on_node_done=_on_node_done,
+        ).run()
+    return {
+        "skipped": skipped,
+        "failed": len(result.failed),
+        "blocked": len(result.blocked),
+        "peak_inflight": scheduler.peak_inflight,
+        "requeued": scheduler.requeued,
+    }
+
+
+def _run_threaded(
+    settings: RunSettings,
+    config: Config,
+    session: Session,
+    accounts: list[Account],
+    accounts_parallel: int,
+    inventory: Inventory | None,
+    journal: Journal,
+    progress: RunProgress | None,
+) -> list[dict]:
+    """Run every account in this process, ``accounts_parallel`` at a time."""
+    configure_limits(config, settings.max_workers)
+    clients = get_client_registry()
+    clients_before = clients.stats()
+    throttled_before = get_rate_limiter().stats()["throttled"]
+    sessions = role_sessions(config, session) if settings.organization else None
+    # Accounts cleaned side by side share one run-wide cap on in-flight calls
+    shared_limit = InflightLimit(settings.max_workers) if accounts_parallel > 1 and len(accounts) > 1 else None
+
+    def _on_node_done(scope: str, node: str, status: str) -> None:
+        if progress is not None:
+            progress.advance(scope, failed=status not in ("completed", "skipped"))
+
+    def _run(account: Account) -> dict[str, int]:
+        account_session = sessions.get(account.id) if sessions is not None else session
+        return run_account(
+            settings,
+            account_session,
+            account.id,
+            settings.nodes_by_region,
+            inventory,
+            journal,
+            _on_node_done,
+            shared_limit=shared_limit,
+        )
+
+    if len(accounts) == 1:
+        stats = [_run(accounts[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=accounts_parallel, thread_name_prefix="costcutter-account") as pool:
+            stats = list(pool.map(_run, accounts))
+    clients_after = clients.stats()
+    # Run-wide counters are reported once, on the first account's stats
+    stats[0].update(
+        clients_created=clients_after.created - clients_before.created,
+        client_cache_hits=clients_after.cache_hits - clients_before.cache_hits,
+        client_create_ms=round((clients_after.create_seconds - clients_before.create_seconds) * 1000, 1),
+        throttled=get_rate_limiter().stats()["throttled"] - throttled_before,
+        roles_assumed=sessions.assumed if sessions is not None else 0,
+    )
+    return stats
+
+
 def orchestrate_services(
     dry_run: bool = False,
-) -> dict[str, int]:
+    progress: RunProgress | None = None,
+    incremental: bool = False,
+    resume: bool = False,
+    discard_journal: bool = False,
+) -> dict[str, int | float]:
+    """Run the teardown graph in every selected region and return run stats.
+
+    With ``aws.organization.enabled``, the graph runs in every member account
+    of the organization through an assumed role, several accounts at a time.
+
+    With ``incremental``, only resources that are new or changed since the
+    last inventory snapshot are processed (and reported); this implies the
+    inventory is enabled. With ``resume``, a real run continues the journal
+    of an interrupted one: finished resource types are skipped and resources
+    already deleted are not handed to the handlers again. A real run that
+    would overwrite the journal of an unfinished one raises
+    ``InterruptedRunError`` unless ``discard_journal`` is set.
+    """
     config = get_config()
+    # Per-call metrics cover this run only (watch mode runs several in one process)
+    get_api_metrics().clear()
+    # Reread the protection rules (and their file) on every run, e.g. in watch mode
+    load_protection(config)
 
     # Resolve services
     selected_services_raw = list(getattr(config.aws, "services", []) or [])
@@ -70,9 +421,6 @@ def orchestrate_services(
     if not selected_service_keys:
         raise ValueError("No valid services selected in the configuration.")
 
-    # Keep both key and handler together to avoid reverse lookups later
-    services_to_process: list[tuple[str, Any]] = [(s, SERVICE_HANDLERS[s]) for s in selected_service_keys]
-
     # Create a base AWS session based on config/credentials
     session = create_aws_session(config)
 
@@ -81,59 +429,184 @@ def orchestrate_services(
     if not regions_raw:
         raise ValueError("No regions configured under aws.region")
 
-    # Build a map of available regions for each selected service dynamically
-    available_regions_map: dict[str, set[str]] = {}
-    for svc_key in selected_service_keys:
-        try:
-            available = session.get_available_regions(svc_key)
-        except Exception:
-            # If boto3 cannot determine regions for a service key, leave it unknown
-            available = []
-        available_regions_map[svc_key] = set(available)
+    # Fails closed before anything else runs when the caller identity is unknown
+    account_id = _get_account_id(session)
+
+    # Enabled regions and per-service availability, cached on disk between runs
+    cache_cfg = getattr(config.aws, "region_cache", None)
+    cache_path = None
+    if cache_cfg is not None and getattr(cache_cfg, "enabled", True):
+        cache_path = getattr(cache_cfg, "path", None)
+    cache_ttl = getattr(cache_cfg, "ttl_seconds", None) or DEFAULT_TTL_SECONDS
+    region_info = resolve_regions(
+        session, account_id, selected_service_keys, cache_path=cache_path, ttl_seconds=cache_ttl
+    )
+    org_cfg = getattr(config.aws, "organization", None)
+    organization = bool(getattr(org_cfg, "enabled", False))
+    if organization:
+        # Member accounts enable opt-in regions independently; run_account checks each account's own
+        region_info.enabled = None
 
     if any(r.lower() == "all" for r in regions_raw):
-        # Union of regions supported by selected services (dynamic)
+        # Union of regions supported by selected services (dynamic), minus regions not enabled for the account
         union: set[str] = set()
         for svc_key in selected_service_keys:
-            union.update(available_regions_map.get(svc_key, set()))
+            union.update(region_info.available.get(svc_key, set()))
+        if region_info.enabled is not None:
+            union &= region_info.enabled
         if not union:
             raise ValueError(
                 "Unable to resolve regions for selected services. Specify explicit aws.region or ensure AWS SDK can list regions."
             )
         regions = sorted(union)
     else:
-        regions = regions_raw
+        regions = []
+        for region in regions_raw:
+            if region_info.enabled is not None and region not in region_info.enabled:
+                logger.warning("[%s] Skipped: region is not enabled for this account", region)
+                continue
+            regions.append(region)
 
     logger.info("Regions to process: %s", regions)
     logger.info("Selected services: %s", selected_service_keys)
-    logger.debug("Service handlers: %s", [h.__name__ for _, h in services_to_process])
 
-    # Prebuild the work list and account for skips up front (still log skips)
-    tasks: list[tuple[str, str, Any]] = []  # (region, service_key, handler_entry)
+    # Build the dependency graph once; each region runs its own copy of it
+    graph, node_handlers = _build_graph(selected_service_keys)
+    logger.debug("Teardown graph: %s", graph)
+    nodes_by_region: dict[str, list[str]] = {}
     skipped = 0
     for region in regions:
-        for service_key, handler_entry in services_to_process:
-            if not _service_supported_in_region(available_regions_map, service_key, region):
+        nodes_by_region[region] = []
+        for service_key in selected_service_keys:
+            if not region_info.usable(service_key, region):
                 logger.info("[%s][%s] Skipped: service not available in region", region, service_key)
                 skipped += 1
                 continue
-            tasks.append((region, service_key, handler_entry))
+            nodes_by_region[region].extend(n for n, (svc, _) in node_handlers.items() if svc == service_key)
+    total_tasks = sum(len(nodes) for nodes in nodes_by_region.values())
 
     # Allow custom worker count via config, fallback to reasonable default based on actual tasks
-    max_workers = getattr(getattr(config, "aws", None), "max_workers", None)
+    aws_cfg = getattr(config, "aws", None)
+    max_workers = getattr(aws_cfg, "max_workers", None)
     if not isinstance(max_workers, int) or max_workers <= 0:
-        total_tasks = max(1, len(tasks))
-        max_workers = min(32, total_tasks)
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map: dict[Any, tuple[str, str]] = {}
-        for region, service_key, handler_entry in tasks:
-            fut = executor.submit(process_region_service, session, region, service_key, handler_entry, dry_run)
-            future_map[fut] = (region, service_key)
-
-        for future in as_completed(future_map):
-            region, svc_name = future_map[future]
-            try:
-                logger.info("[%s][%s] Task completed", region, svc_name)
-            except Exception as e:
-                logger.exception("[%s][%s] Task failed: %s", region, svc_name, e)
+        max_workers = min(32, max(1, total_tasks))
+    region_limit = getattr(aws_cfg, "max_workers_per_region", None)
+    service_limit = getattr(aws_cfg, "max_workers_per_service", None)
+
+    # Organization mode: every member account gets its own session and scheduler
+    if organization:
+        accounts = list_member_accounts(
+            session,
+            include=getattr(org_cfg, "accounts", None) or (),
+            exclude=getattr(org_cfg, "exclude_accounts", None) or (),
+        )
+        if not accounts:
+            raise ValueError("No member accounts selected under aws.organization")
+        account_limit = getattr(org_cfg, "max_workers_per_account", None)
+        if not isinstance(account_limit, int) or account_limit <= 0:
+            account_limit = None
+        accounts_parallel = max(1, int(getattr(org_cfg, "max_accounts_parallel", None) or 1))
+        logger.info("Accounts to process: %s", [a.id for a in accounts])
+    else:
+        accounts = [Account(account_id)]
+        accounts_parallel = 1
+        account_limit = None
+
+    backend = str(getattr(aws_cfg, "discovery", None) or "describe").lower()
+    if backend not in DISCOVERY_BACKENDS:
+        raise ValueError(f"Unknown aws.discovery backend '{backend}'; expected one of {list(DISCOVERY_BACKENDS)}")
+    selection = Selection.from_config(config)
+    if backend == "tagging" and selection.tagging_filters() is None:
+        logger.warning(
+            "Selection rules on state, age, names or wildcard tag values need describe calls; "
+            "ignoring aws.discovery: tagging"
+        )
+        backend = "describe"
+    if backend == "tagging":
+        covered = sorted(_tagging_types(list(selected_service_keys)))
+        logger.warning(
+            "aws.discovery: tagging only finds resources that have or had tags; untagged resources of "
+            "types %s are NOT cleaned up. Use aws.discovery: describe to clean up everything.",
+            covered,
+        )
+    engine = str(getattr(aws_cfg, "engine", None) or "threads").lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown aws.engine '{engine}'; expected one of {list(ENGINES)}")
+
+    settings = RunSettings(
+        dry_run=dry_run,
+        service_keys=tuple(selected_service_keys),
+        nodes_by_region=nodes_by_region,
+        max_workers=max_workers,
+        region_limit=region_limit,
+        service_limit=service_limit,
+        account_limit=account_limit,
+        backend=backend,
+        organization=organization,
+        selection=selection,
+        region_cache_path=cache_path,
+        region_cache_ttl=cache_ttl,
+    )
+    if progress is not None:
+        progress.set_totals({
+            settings.scope(a.id, region): len(nodes) for a in accounts for region, nodes in nodes_by_region.items()
+        })
+
+    # Opened first: it refuses to overwrite the journal of an unfinished run before anything else starts
+    journal = _open_journal(config, dry_run, resume, discard=discard_journal)
+    inventory = None
+    try:
+        inventory = _open_inventory(config, dry_run, incremental)
+        if inventory is not None:
+            journal.subscribe(inventory.mark)
+        if engine == "processes":
+            from costcutter.process_engine import run_sharded
+
+            account_stats = run_sharded(
+                settings,
+                config.to_dict(),
+                accounts,
+                max_processes=getattr(aws_cfg, "max_processes", None),
+                inventory_run=inventory.run_id if inventory is not None else None,
+                incremental=incremental,
+                resume=resume,
+                progress=progress,
+            )
+            tracer = get_tracer()
+            for shard in account_stats:
+                get_api_metrics().merge(shard.pop("api_metrics", {}))
+                trace_events = shard.pop("trace_events", [])
+                if tracer is not None:
+                    tracer.merge(trace_events)
+        else:
+            account_stats = _run_threaded(
+                settings, config, session, accounts, accounts_parallel, inventory, journal, progress
+            )
+        journal.finish()
+    finally:
+        if inventory is not None:
+            inventory.close()
+        journal.close()
+        set_journal(None)
+
+    def _total(key: str) -> int:
+        return sum(s.get(key, 0) for s in account_stats)
+
+    summary = {
+        "accounts": len(accounts),
+        "tasks": total_tasks * len(accounts) - _total("skipped"),
+        "skipped": skipped * len(accounts) + _total("skipped"),
+        "failed": _total("failed"),
+        "blocked": _total("blocked"),
+        "clients_created": _total("clients_created"),
+        "client_cache_hits": _total("client_cache_hits"),
+        "client_create_ms": round(sum(s.get("client_create_ms", 0.0) for s in account_stats), 1),
+        "peak_inflight": max(s["peak_inflight"] for s in account_stats),
+        "requeued": _total("requeued"),
+        "throttled": _total("throttled"),
+        "unchanged": _total("unchanged") + (inventory.unchanged if inventory is not None else 0),
+        "resumed_skipped": _total("resumed_skipped") + journal.skipped,
+        "roles_assumed": _total("roles_assumed"),
+    }
+    logger.info("Run stats: %s", summary)
+    return summary
@@ -0,0 +1,241 @@
+"""Process-pool execution engine (``aws.engine: processes``).
+
+The thread engine runs the whole teardown in one interpreter, where parsing
+large botocore responses and building events contend for the GIL. This
+engine shards the run by (account, region) across a ``ProcessPoolExecutor``.
+Each worker process builds its own session, clients and rate limiter once
+and runs ``run_account`` for one region at a time. It streams its events
+back to the parent ``Reporter`` in batches of plain tuples over a queue,
+along with node completions for the progress view. The parent keeps the
+events' original timestamps, so reports match a threaded run.
+
+Concurrency caps (``aws.max_workers`` and friends) and rate limits apply per
+shard: size ``aws.max_processes`` with that in mind.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from costcutter.conf import config as config_mod
+from costcutter.conf.config import Config
+from costcutter.core.clients import get_client_registry
+from costcutter.core.journal import set_journal
+from costcutter.core.metrics import get_api_metrics
+from costcutter.core.organizations import Account, RoleSessions
+from costcutter.core.protection import load_protection
+from costcutter.core.rate_limiter import get_rate_limiter
+from costcutter.core.session_helper import create_aws_session
+from costcutter.core.tracing import get_tracer, span, start_tracing, stop_tracing
+from costcutter.logger import setup_logging
+from costcutter.orchestrator import (
+    RunSettings,
+    _open_inventory,
+    _open_journal,
+    configure_limits,
+    role_sessions,
+    run_account,
+)
+from costcutter.progress import RunProgress
+from costcutter.reporter import Record, get_reporter
+from costcutter.services.common import _set_account_id
+
+logger = logging.getLogger(__name__)
+
+# Events per message sent to the parent, and the longest an event waits while others keep coming
+EVENT_BATCH_SIZE = 500
+EVENT_FLUSH_INTERVAL = 0.25  # seconds
+
+
+class _EventForwarder:
+    """Batch a worker process' records and send them to the parent."""
+
+    def __init__(self, out: Any, batch_size: int = EVENT_BATCH_SIZE, flush_interval: float = EVENT_FLUSH_INTERVAL):
+        self.out = out
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._batch: list[tuple] = []
+        self._last_flush = time.monotonic()
+
+    def put(self, rec: Record) -> None:
+        with self._lock:
+            # The parent assigns its own sequence numbers
+            self._batch.append(rec[1:])
+            if len(self._batch) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self) -> None:
+        # Called with self._lock held
+        if self._batch:
+            self.out.put(("events", self._batch))
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+
+# Worker process state, set up once by _init_worker
+_out: Any = None
+_forwarder: _EventForwarder | None = None
+_session: Any = None
+_role_sessions: RoleSessions | None = None
+
+
+def _init_worker(out: Any, config_data: dict[str, Any], max_workers: int, trace: bool = False) -> None:
+    global _out, _forwarder, _session, _role_sessions
+    # A forked worker inherits the parent's tracer and its spans: start over
+    stop_tracing()
+    if trace:
+        start_tracing()
+    config_mod._settings = Config(config_data)
+    config = config_mod._settings
+    setup_logging(config)
+    _out = out
+    _forwarder = _EventForwarder(out)
+    get_reporter().forward(_forwarder.put)
+    configure_limits(config, max_workers)
+    load_protection(config)
+    _session = create_aws_session(config)
+    if getattr(getattr(getattr(config, "aws", None), "organization", None), "enabled", False):
+        _role_sessions = role_sessions(config, _session)
+
+
+def _run_shard(
+    settings: RunSettings,
+    account: str,
+    region: str,
+    inventory_run: int | None,
+    incremental: bool,
+    resume: bool,
+) -> dict[str, int | float]:
+    assert _forwarder is not None
+    config = config_mod._settings
+    clients_before = get_client_registry().stats()
+    throttled_before = get_rate_limiter().stats()["throttled"]
+    assumed_before = _role_sessions.assumed if _role_sessions is not None else 0
+    inventory = journal = None
+    try:
+        if _role_sessions is not None:
+            session = _role_sessions.get(account)
+        else:
+            session = _session
+            # Known from the parent: saves every worker a GetCallerIdentity call
+            _set_account_id(session, account)
+        if inventory_run is not None:
+            inventory = _open_inventory(config, settings.dry_run, incremental, run_id=inventory_run)
+        journal = _open_journal(config, settings.dry_run, resume, attach=True)
+        if inventory is not None:
+            journal.subscribe(inventory.mark)
+        with span(f"shard {account}/{region}", "shard", region=region):
+            stats = run_account(
+                settings,
+                session,
+                account,
+                [region],
+                inventory,
+                journal,
+                on_node_done=lambda scope, node, status: _out.put(("node", scope, status)),
+            )
+    finally:
+        if inventory is not None:
+            inventory.close()
+        if journal is not None:
+            journal.close()
+        set_journal(None)
+        _forwarder.flush()
+        # Events only live in the parent; keep the worker's reporter from growing
+        get_reporter().clear()
+        # Queued after this shard's last event batch, so the parent knows it has them all
+        _out.put(("shard_done", f"{account}/{region}"))
+    clients_after = get_client_registry().stats()
+    tracer = get_tracer()
+    stats.update(
+        clients_created=clients_after.created - clients_before.created,
+        client_cache_hits=clients_after.cache_hits - clients_before.cache_hits,
+        client_create_ms=round((clients_after.create_seconds - clients_before.create_seconds) * 1000, 1),
+        throttled=get_rate_limiter().stats()["throttled"] - throttled_before,
+        unchanged=inventory.unchanged if inventory is not None else 0,
+        resumed_skipped=journal.skipped,
+        roles_assumed=(_role_sessions.assumed if _role_sessions is not None else 0) - assumed_before,
+        # Handed to the parent, which merges every shard's calls
+        api_metrics=get_api_metrics().drain(),
+        trace_events=tracer.drain() if tracer is not None else [],
+    )
+    return stats
+
+
+def _pump(inbox: Any, shards: int, progress: RunProgress | None) -> None:
+    """Feed worker messages to the reporter and progress until every shard reported done."""
+    reporter = get_reporter()
+    done = 0
+    while done < shards:
+        msg = inbox.get()
+        if msg is None:
+            return
+        kind = msg[0]
+        if kind == "events":
+            reporter.ingest(msg[1])
+        elif kind == "node":
+            if progress is not None:
+                progress.advance(msg[1], failed=msg[2] not in ("completed", "skipped"))
+        elif kind == "shard_done":
+            done += 1
+
+
+def run_sharded(
+    settings: RunSettings,
+    config_data: dict[str, Any],
+    accounts: Sequence[Account],
+    max_processes: int | None = None,
+    inventory_run: int | None = None,
+    incremental: bool = False,
+    resume: bool = False,
+    progress: RunProgress | None = None,
+    start_method: str = "spawn",
+) -> list[dict]:
+    """Run every (account, region) shard in a pool of worker processes.
+
+    Returns:
+        The stats of each shard, as returned by ``run_account`` plus the
+        worker's client, throttling, inventory and journal counters, its
+        per-call API metrics and, while tracing, its spans.
+    """
+    shards = [(a.id, region) for a in accounts for region in settings.nodes_by_region]
+    if not shards:
+        return [{"peak_inflight": 0}]
+    if not isinstance(max_processes, int) or max_processes <= 0:
+        max_processes = os.cpu_count() or 1
+    # spawn: the parent already runs threads (CLI, sinks), which fork does not mix well with
+    ctx = multiprocessing.get_context(start_method)
+    inbox = ctx.Queue()
+    pump = threading.Thread(target=_pump, args=(inbox, len(shards), progress), name="costcutter-pump", daemon=True)
+    pump.start()
+    logger.info("Running %d shard(s) in up to %d process(es)", len(shards), max_processes)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(max_processes, len(shards)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(inbox, config_data, settings.max_workers, get_tracer() is not None),
+        ) as pool:
+            futures = [
+                pool.submit(_run_shard, settings, account, region, inventory_run, incremental, resume)
+                for account, region in shards
+            ]
+            results = [f.result() for f in futures]
+    except BrokenProcessPool:
+        # A worker died without reporting its shard done
+        inbox.put(None)
+        raise
+    finally:
+        pump.join()
+    return results
@@ -0,0 +1,51 @@
+"""Per-region task progress shared between the orchestrator and the CLI."""
+
+import threading
+
+
+class RunProgress:
+    """Thread-safe done/total task counters per region.
+
+    Subscribers are ``threading.Event`` objects set on every change, so a
+    renderer can sleep until there is something new to draw.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals: dict[str, int] = {}
+        self._done: dict[str, int] = {}
+        self._failed: dict[str, int] = {}
+        self._subscribers: list[threading.Event] = []
+
+    def subscribe(self, event: threading.Event) -> None:
+        with self._lock:
+            self._subscribers.append(event)
+
+    def unsubscribe(self, event: threading.Event) -> None:
+        with self._lock:
+            if event in self._subscribers:
+                self._subscribers.remove(event)
+
+    def _notify(self) -> None:
+        # Called with self._lock held
+        for event in self._subscribers:
+            event.set()
+
+    def set_totals(self, totals: dict[str, int]) -> None:
+        with self._lock:
+            self._totals = dict(totals)
+            self._done = dict.fromkeys(totals, 0)
+            self._failed = dict.fromkeys(totals, 0)
+            self._notify()
+
+    def advance(self, region: str, failed: bool = False) -> None:
+        with self._lock:
+            self._done[region] = self._done.get(region, 0) + 1
+            if failed:
+                self._failed[region] = self._failed.get(region, 0) + 1
+            self._notify()
+
+    def snapshot(self) -> dict[str, tuple[int, int, int]]:
+        """Return ``{region: (done, failed, total)}``."""
+        with self._lock:
+            return {r: (self._done.get(r, 0), self._failed.get(r, 0), t) for r, t in self._totals.items()}
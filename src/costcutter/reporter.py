@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import csv
+import itertools
 import threading
-from collections.abc import Iterable
+import time
+from array import array
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import asdict, dataclass
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from costcutter.sinks import BackgroundWriter, EventSink
 
 
 @dataclass(frozen=True, slots=True)
@@ -18,14 +26,190 @@ class Event:
     arn: str | None
     meta: dict[str, object]
 
+    @property
+    def account(self) -> str:
+        return arn_account(self.arn)
+
+
+def arn_account(arn: str | None) -> str:
+    """Account id field of ``arn`` ("" for a missing ARN or one without an account)."""
+    if not arn or not arn.startswith("arn:"):
+        return ""
+    parts = arn.split(":", 5)
+    return parts[4] if len(parts) == 6 else ""
+
+
+# Number of most recent events kept for the live view
+TAIL_SIZE = 100
+# account is derived from the ARN and kept last so existing column positions do not move
+CSV_FIELDS = ["timestamp", "region", "service", "resource", "action", "arn", "meta", "account"]
+
+
+def csv_row(e: Event) -> dict[str, object]:
+    """Return ``e`` as a CSV row; meta is flattened to ``k=v;k=v``."""
+    row = asdict(e)
+    row["account"] = e.account
+    meta_val = row.get("meta") or {}
+    if isinstance(meta_val, dict):
+        row["meta"] = ";".join(f"{k}={v}" for k, v in meta_val.items())
+    else:
+        row["meta"] = str(meta_val)
+    return row
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+# Events materialized per lock acquisition while iterating
+ITER_CHUNK = 1024
+
+
+def _format_timestamp(us: int) -> str:
+    return (_EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+class EventStore:
+    """Columnar, append-only event storage.
+
+    region/service/resource/action are interned and stored as indexes into a
+    shared string table, timestamps as integer microseconds since the epoch,
+    and meta as one column per key holding indexes into a table of distinct
+    values (0 = key absent). Meta with unhashable values is kept as is on the
+    side. ``Event`` objects are only rebuilt by ``get``/``events``.
+
+    Not thread-safe; ``Reporter`` serializes access.
+    """
+
+    _NAMES = ("region", "service", "resource", "action")
 
-class Reporter:
     def __init__(self) -> None:
-        self._events: list[Event] = []
+        self._ts = array("q")
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._columns = {name: array("I") for name in self._NAMES}
+        self._arns: list[str | None] = []
+        self._meta: dict[str, array] = {}
+        # Index 0 is reserved for "absent"
+        self._values: list[object] = [None]
+        self._value_ids: dict[tuple[type, object], int] = {}
+        self._overflow: dict[int, dict[str, object]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def _intern(self, s: str) -> int:
+        i = self._string_ids.get(s)
+        if i is None:
+            i = self._string_ids[s] = len(self._strings)
+            self._strings.append(s)
+        return i
+
+    def _value_id(self, value: object) -> int:
+        # Keyed by type too, so True and 1 stay distinct
+        key = (type(value), value)
+        i = self._value_ids.get(key)
+        if i is None:
+            i = self._value_ids[key] = len(self._values)
+            self._values.append(value)
+        return i
+
+    def append(
+        self,
+        ts_us: int,
+        region: str,
+        service: str,
+        resource: str,
+        action: str,
+        arn: str | None,
+        meta: dict[str, object],
+    ) -> None:
+        n = len(self._ts)
+        try:
+            ids = {k: self._value_id(v) for k, v in meta.items()}
+        except TypeError:
+            ids = {}
+            self._overflow[n] = dict(meta)
+        for k in ids.keys() - self._meta.keys():
+            self._meta[k] = array("I", bytes(4 * n))
+        for k, col in self._meta.items():
+            col.append(ids.get(k, 0))
+        self._ts.append(ts_us)
+        for name, value in zip(self._NAMES, (region, service, resource, action), strict=True):
+            self._columns[name].append(self._intern(value))
+        self._arns.append(arn)
+
+    def get(self, i: int) -> Event:
+        strings = self._strings
+        meta = self._overflow.get(i)
+        if meta is None:
+            meta = {k: self._values[col[i]] for k, col in self._meta.items() if col[i]}
+        return Event(
+            timestamp=_format_timestamp(self._ts[i]),
+            region=strings[self._columns["region"][i]],
+            service=strings[self._columns["service"][i]],
+            resource=strings[self._columns["resource"][i]],
+            action=strings[self._columns["action"][i]],
+            arn=self._arns[i],
+            meta=meta,
+        )
+
+    def events(self, start: int = 0, stop: int | None = None) -> list[Event]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.get(i) for i in range(start, stop)]
+
+
+# (seq, ts_us, region, service, resource, action, arn, meta) as buffered by Reporter.record
+Record = tuple[int, int, str, str, str, str, str | None, dict[str, object]]
+# Upper bound on waiting for a record whose sequence number was taken but not yet buffered
+GAP_WAIT_SECONDS = 1.0
+
+
+def to_event(rec: Record) -> Event:
+    _, ts_us, region, service, resource, action, arn, meta = rec
+    return Event(_format_timestamp(ts_us), region, service, resource, action, arn, meta)
+
+
+class Reporter:
+    """Thread-safe event store.
+
+    ``record`` only takes a global sequence number and appends a tuple to a
+    buffer owned by the calling thread, so concurrent workers never wait on
+    each other. Buffers are merged in sequence order into a compact
+    ``EventStore`` whenever events are read (``snapshot``, ``count``, exports,
+    the live views). Merging also maintains a bounded tail of the most recent
+    events and running counts per (service, resource, action); ``version``
+    changes on every record so live views can skip redraws when nothing
+    changed.
+    """
+
+    def __init__(self, tail_size: int = TAIL_SIZE) -> None:
+        self._store = EventStore()
         self._events_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._local = threading.local()
+        # (owner thread, buffer); registered once per recording thread
+        self._buffers: list[tuple[threading.Thread, list[Record]]] = []
+        self._buffers_lock = threading.Lock()
+        # Drained records waiting for a lower sequence number still being buffered
+        self._pending: list[Record] = []
+        self._next_seq = 0
+        self._tail: deque[Record] = deque(maxlen=max(1, tail_size))
+        self._counts: Counter[tuple[str, str, str]] = Counter()
+        self._account_counts: Counter[tuple[str, str, str, str]] = Counter()
+        self._clears = 0
+        self._subscribers: list[threading.Event] = []
+        self._writers: list[BackgroundWriter] = []
+        # Called with every record (see forward)
+        self._forwards: list[Callable[[Record], None]] = []
         # Tracks how many events have been flushed to CSV for append mode logic
         self._flushed_count = 0
 
+    def _buffer(self) -> list[Record]:
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            buf = self._local.buffer = []
+            with self._buffers_lock:
+                self._buffers.append((threading.current_thread(), buf))
+        return buf
+
     def record(
         self,
         region: str,
@@ -35,37 +219,191 @@ class Reporter:
         arn: str | None = None,
         meta: dict | None = None,
     ) -> None:
-        evt = Event(
-            timestamp=datetime.now(UTC).isoformat(),
-            region=region,
-            service=service,
-            resource=resource,
-            action=action,
-            arn=arn,
-            meta=meta or {},
-        )
+        rec = (next(self._seq), time.time_ns() // 1000, region, service, resource, action, arn, meta or {})
+        self._buffer().append(rec)
+        for writer in self._writers:
+            writer.put(rec)
+        for forward in self._forwards:
+            forward(rec)
+        for event in self._subscribers:
+            # is_set() is a plain read; only the first record after a redraw pays for set()
+            if not event.is_set():
+                event.set()
+
+    def ingest(self, records: Iterable[tuple[int, str, str, str, str, str | None, dict]]) -> None:
+        """Record events captured elsewhere, e.g. by a worker process, keeping their timestamps.
+
+        Each item is a ``Record`` without its sequence number.
+        """
+        buf = self._buffer()
+        for ts_us, region, service, resource, action, arn, meta in records:
+            rec = (next(self._seq), ts_us, region, service, resource, action, arn, meta)
+            buf.append(rec)
+            for writer in self._writers:
+                writer.put(rec)
+        for event in self._subscribers:
+            event.set()
+
+    def forward(self, fn: Callable[[Record], None]) -> None:
+        """Call ``fn`` with every record from now on, on the recording thread; it must not block."""
         with self._events_lock:
-            self._events.append(evt)
+            self._forwards = [*self._forwards, fn]
+
+    def subscribe(self, event: threading.Event) -> None:
+        """Set ``event`` whenever events are recorded or cleared (change notification)."""
+        with self._buffers_lock:
+            self._subscribers = [*self._subscribers, event]
+
+    def unsubscribe(self, event: threading.Event) -> None:
+        with self._buffers_lock:
+            self._subscribers = [e for e in self._subscribers if e is not event]
+
+    def _collect(self) -> list[Record]:
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        collected: list[Record] = []
+        for owner, buf in buffers:
+            n = len(buf)
+            if n:
+                collected.extend(buf[:n])
+                # Only the owner appends, and only at the end, so the first n are exactly what was copied
+                del buf[:n]
+            elif not owner.is_alive():
+                with self._buffers_lock:
+                    self._buffers.remove((owner, buf))
+        return collected
+
+    def _drain(self) -> None:
+        """Merge every buffered record into the store in sequence order.
+
+        Called with ``self._events_lock`` held. Sequence numbers are
+        contiguous, so a gap means a thread took a number and has not
+        appended its record yet; the merge waits briefly for it.
+        """
+        deadline = None
+        while True:
+            pending = self._pending + self._collect()
+            pending.sort()
+            committed = 0
+            for rec in pending:
+                if rec[0] != self._next_seq:
+                    break
+                self._commit(rec)
+                committed += 1
+            self._pending = pending[committed:]
+            if not self._pending:
+                return
+            deadline = deadline or time.monotonic() + GAP_WAIT_SECONDS
+            if time.monotonic() >= deadline:
+                # Never expected to happen; skip the missing numbers rather than stall readers
+                self._next_seq = self._pending[0][0]
+                continue
+            time.sleep(0)
+
+    def _commit(self, rec: Record) -> None:
+        seq, ts_us, region, service, resource, action, arn, meta = rec
+        self._store.append(ts_us, region, service, resource, action, arn, meta)
+        self._tail.append(rec)
+        self._counts[(service, resource, action)] += 1
+        self._account_counts[(arn_account(arn), service, resource, action)] += 1
+        self._next_seq = seq + 1
 
     def snapshot(self) -> list[Event]:
         # Returns a thread-safe copy
         with self._events_lock:
-            return list(self._events)
+            self._drain()
+            return self._store.events()
 
-    def iter(self) -> Iterable[Event]:
-        # Cheap iteration over a stable snapshot
-        return iter(self.snapshot())
+    def iter(self, start: int = 0) -> Iterator[Event]:
+        """Iterate over the events recorded so far, rebuilding them chunk by chunk.
+
+        Only ``ITER_CHUNK`` events are materialized at a time and the lock is
+        released between chunks, so exporting a large run neither copies it
+        whole nor blocks recording.
+        """
+        with self._events_lock:
+            self._drain()
+            stop = len(self._store)
+        for i in range(start, stop, ITER_CHUNK):
+            with self._events_lock:
+                chunk = self._store.events(i, min(i + ITER_CHUNK, stop))
+            if not chunk:
+                return
+            yield from chunk
 
     def to_dicts(self) -> list[dict]:
         return [asdict(e) for e in self.iter()]
 
+    def tail(self, n: int | None = None) -> list[Event]:
+        """Return up to ``n`` most recent events (at most ``tail_size``), oldest first."""
+        with self._events_lock:
+            self._drain()
+            records = list(self._tail)
+        if n is not None:
+            records = records[-n:] if n > 0 else []
+        return [to_event(r) for r in records]
+
+    def counts(self) -> dict[tuple[str, str, str], int]:
+        """Return event counts keyed by (service, resource, action)."""
+        with self._events_lock:
+            self._drain()
+            return dict(self._counts)
+
+    def counts_by_account(self) -> dict[tuple[str, str, str, str], int]:
+        """Return event counts keyed by (account, service, resource, action); the account comes from the ARN."""
+        with self._events_lock:
+            self._drain()
+            return dict(self._account_counts)
+
+    @property
+    def version(self) -> int:
+        """Changes on every record and clear; equal versions mean identical content."""
+        with self._events_lock, self._buffers_lock:
+            buffered = sum(len(buf) for _, buf in self._buffers)
+            return self._next_seq + len(self._pending) + buffered + self._clears
+
     def clear(self) -> None:
         with self._events_lock:
-            self._events.clear()
+            self._drain()
+            self._store = EventStore()
+            self._tail.clear()
+            self._counts.clear()
+            self._account_counts.clear()
+            self._clears += 1
+        for event in self._subscribers:
+            event.set()
 
     def count(self) -> int:
         with self._events_lock:
-            return len(self._events)
+            self._drain()
+            return len(self._store)
+
+    def add_sink(
+        self, sink: EventSink, batch_size: int | None = None, flush_interval: float | None = None
+    ) -> BackgroundWriter:
+        """Stream every event recorded from now on to ``sink`` on a background thread.
+
+        ``record`` only enqueues; the sink is written in batches of
+        ``batch_size`` events or every ``flush_interval`` seconds.
+        """
+        from costcutter.sinks import DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL, BackgroundWriter
+
+        writer = BackgroundWriter(
+            sink,
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            flush_interval=flush_interval or DEFAULT_FLUSH_INTERVAL,
+        )
+        with self._events_lock:
+            self._writers.append(writer)
+        return writer
+
+    def close_sinks(self) -> list[Path]:
+        """Flush and close every sink; return their paths."""
+        with self._events_lock:
+            writers, self._writers = self._writers, []
+        for writer in writers:
+            writer.close()
+        return [w.sink.path for w in writers]
 
     def write_csv(self, path: str | Path, overwrite: bool = True) -> Path:
         """Write recorded events to a CSV file.
@@ -79,23 +417,16 @@ class Reporter:
         mode = "w" if overwrite or not p.exists() else "a"
         write_header = mode == "w" or not p.exists()
 
-        events = self.snapshot()
-        events_to_write = events if mode == "w" else events[self._flushed_count :]
-
-        fieldnames = ["timestamp", "region", "service", "resource", "action", "arn", "meta"]
+        start = 0 if mode == "w" else self._flushed_count
+        written = start
         with p.open(mode, newline="", encoding="utf-8") as fh:
-            writer = csv.DictWriter(fh, fieldnames=fieldnames)
+            writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
             if write_header:
                 writer.writeheader()
-            for e in events_to_write:
-                row = asdict(e)
-                meta_val = row.get("meta") or {}
-                if isinstance(meta_val, dict):
-                    row["meta"] = ";".join(f"{k}={v}" for k, v in meta_val.items())
-                else:
-                    row["meta"] = str(meta_val)
-                writer.writerow(row)
-        self._flushed_count = len(events)
+            for e in self.iter(start):
+                writer.writerow(csv_row(e))
+                written += 1
+        self._flushed_count = written
         return p
 
 
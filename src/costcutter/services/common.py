@@ -0,0 +1,48 @@
+import logging
+import threading
+import weakref
+
+from boto3.session import Session
+
+from costcutter.core.clients import get_client
+from costcutter.core.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+# Account id per session: in organization mode every member account has its own session
+_ACCOUNT_IDS: weakref.WeakKeyDictionary[Session, str] = weakref.WeakKeyDictionary()
+_ACCOUNT_IDS_LOCK = threading.Lock()
+
+
+class AccountIdError(RuntimeError):
+    """The account id of a session could not be resolved."""
+
+
+def _get_account_id(session: Session) -> str:
+    """Return (and cache per session) the AWS account id of ``session``.
+
+    Raises:
+        AccountIdError: When GetCallerIdentity fails or returns no account.
+            Resource ARNs, protection rules, the inventory and the journal
+            all depend on the account id, so nothing may be deleted without
+            it; the failure is not cached and the next call tries again.
+    """
+    account = _ACCOUNT_IDS.get(session)
+    if account is not None:
+        return account
+    try:
+        client = get_client(session, "sts")
+        identity = get_rate_limiter().call("global", "GetCallerIdentity", client.get_caller_identity)
+    except Exception as e:
+        logger.error("Failed to resolve account id: %s", e)
+        raise AccountIdError(f"Failed to resolve the AWS account id: {e}") from e
+    account = identity.get("Account") or ""
+    if not account:
+        raise AccountIdError("GetCallerIdentity returned no account id")
+    _set_account_id(session, account)
+    return account
+
+
+def _set_account_id(session: Session, account: str) -> None:
+    """Remember the account id of a session whose account is already known (e.g. an assumed role)."""
+    with _ACCOUNT_IDS_LOCK:
+        _ACCOUNT_IDS[session] = account
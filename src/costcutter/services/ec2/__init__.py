@@ -1,28 +1,31 @@
-import logging
-
 from boto3.session import Session
 
-from costcutter.services.ec2.instances import cleanup_instances
-from costcutter.services.ec2.key_pairs import cleanup_key_pairs
-
-logger = logging.getLogger(__name__)
-_ACCOUNT_ID: str | None = None
-_HANDLERS = {"instances": cleanup_instances, "key_pairs": cleanup_key_pairs}
+from costcutter.core.dag import ResourceHandler, topological_order
+from costcutter.core.scheduler import Scheduler
+from costcutter.services.common import _get_account_id
+from costcutter.services.ec2 import instances, key_pairs
 
+# Resource type -> cleanup entrypoint and the resource types it must wait for
+HANDLERS: dict[str, ResourceHandler] = {
+    "instances": ResourceHandler(
+        instances.cleanup_instances,
+        instances.DEPENDS_ON,
+        instances.TAGGING_TYPE,
+        instances.catalog_instance_records,
+    ),
+    "key_pairs": ResourceHandler(
+        key_pairs.cleanup_key_pairs,
+        key_pairs.DEPENDS_ON,
+        key_pairs.TAGGING_TYPE,
+        key_pairs.catalog_key_pair_records,
+    ),
+}
 
-def _get_account_id(session: Session) -> str:
-    """Return (and cache) the current AWS account id (simple module cache)."""
-    global _ACCOUNT_ID
-    if _ACCOUNT_ID is None:
-        try:
-            _ACCOUNT_ID = session.client("sts").get_caller_identity().get("Account", "")
-        except Exception as e:  # pragma: no cover
-            logger.error("Failed to resolve account id: %s", e)
-            _ACCOUNT_ID = ""
-    return _ACCOUNT_ID
+__all__ = ["HANDLERS", "_get_account_id", "cleanup_ec2"]
 
 
-def cleanup_ec2(session: Session, region: str, dry_run: bool = True, max_workers: int = 1):
-    # targets: list[str] or None => run all registered
-    for fn in _HANDLERS.values():
-        fn(session=session, region=region, dry_run=dry_run, max_workers=max_workers)
+def cleanup_ec2(session: Session, region: str, dry_run: bool = True, scheduler: Scheduler | None = None):
+    # Single-region entrypoint: run every resource type serially in dependency order
+    order = topological_order({name: h.depends_on for name, h in HANDLERS.items()})
+    for name in order:
+        HANDLERS[name].fn(session=session, region=region, dry_run=dry_run, scheduler=scheduler)
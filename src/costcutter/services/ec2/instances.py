@@ -1,77 +1,442 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import batched
 from typing import Any
 
 from boto3.session import Session
 from botocore.exceptions import ClientError
 
+from costcutter.conf.config import get_config
+from costcutter.core.clients import get_client
+from costcutter.core.journal import get_journal
+from costcutter.core.protection import get_protection
+from costcutter.core.rate_limiter import ThrottledError, get_rate_limiter
+from costcutter.core.scheduler import RequeueTask, Scheduler, scheduler_scope
+from costcutter.core.selection import ResourceFields, get_selection, tag_map
+from costcutter.core.tracing import traced
 from costcutter.reporter import get_reporter
-from costcutter.services.ec2 import _get_account_id
+from costcutter.services.common import _get_account_id
 
 SERVICE: str = "ec2"
 RESOURCE: str = "instance"
+# Resource Groups Tagging API type (see costcutter.core.discovery)
+TAGGING_TYPE: str = "ec2:instance"
+# Resource types that must be cleared in a region before this one (see costcutter.core.dag)
+DEPENDS_ON: tuple[str, ...] = ()
+PAGE_SIZE: int = 1000  # describe_instances MaxResults upper bound
+# TerminateInstances accepts up to 1000 ids, but one bad id fails the whole call; keep chunks small
+TERMINATE_BATCH_SIZE: int = 100
+MAX_ATTEMPTS: int = 5  # for ids missing from an otherwise successful response
+# Transient server-side errors: requeued like throttling, but without shrinking the concurrency window
+_TRANSIENT_CODES = frozenset({"InternalError", "Unavailable", "ServiceUnavailable"})
+# Errors caused by one of the ids: when the message names none, the chunk is bisected to find it.
+# Any other error (auth, permissions, unknown codes) would fail every half as well, so it fails the chunk.
+_PER_INSTANCE_CODES = frozenset({
+    "IncorrectInstanceState",
+    "InvalidInstanceID",
+    "InvalidInstanceID.Malformed",
+    "InvalidInstanceID.NotFound",
+    "UnsupportedOperation",
+})
+# Termination confirmation polling
+CONFIRM_CHUNK_SIZE: int = 200  # max values per describe_instances filter
+CONFIRM_INITIAL_DELAY: float = 2.0
+CONFIRM_MAX_DELAY: float = 30.0
+CONFIRM_TIMEOUT: float = 600.0
+_NOT_TERMINATED = ("pending", "running", "shutting-down", "stopping", "stopped")
+_INSTANCE_ID_RE = re.compile(r"\bi-[0-9a-f]{8,17}\b")
+# What selection rules look at (see costcutter.core.selection); all but the age are describe filters
+SELECTION_FIELDS = ResourceFields(
+    name_of=lambda instance: tag_map(instance).get("Name"),
+    name_filter="tag:Name",
+    state_of=lambda instance: instance.get("State", {}).get("Name"),
+    state_filter="instance-state-name",
+    created_field="LaunchTime",
+)
 logger = logging.getLogger(__name__)
 
 
-def catalog_instances(session: Session, region: str) -> list[str]:
-    client = session.client(service_name="ec2", region_name=region)
+def catalog_instances(session: Session, region: str) -> Iterator[str]:
+    """Yield instance ids page by page.
 
-    arns: list[str] = []
+    Only the instance id is kept from each page, so the caller can start
+    cleanup on the first page without holding the whole inventory in memory.
+    A failed describe call ends the listing early.
+    """
     try:
-        reservations = client.describe_instances().get("Reservations", [])
-        arns = [i.get("InstanceId") for r in reservations for i in r.get("Instances", [])]
-    except ClientError as e:
+        for instance_id, _ in catalog_instance_records(session, region):
+            yield instance_id
+    except (ClientError, ThrottledError) as e:
         logger.error("[%s][ec2] Failed to describe instances: %s", region, e)
-        arns = []
-    return arns
 
 
-def cleanup_instance(session: Session, region: str, instance_id: Any, dry_run: bool = True) -> None:
+@traced("catalog", service=SERVICE, resource=RESOURCE)
+def catalog_instance_records(session: Session, region: str) -> Iterator[tuple[str, str]]:
+    """Yield ``(instance_id, fingerprint)``; the fingerprint changes with the state and protection.
+
+    Only instances matching the ``selection`` rules are yielded: most rules
+    are sent as ``describe_instances`` filters, the rest are checked here.
+    Instances protected by their tags are noted in the protection index.
+
+    Raises:
+        ClientError, ThrottledError: When a describe call fails, so callers
+            can tell a partial listing from a complete one.
+    """
+    selection = get_selection().compile(SELECTION_FIELDS)
+    protection = get_protection()
+    account = _get_account_id(session)
+    kwargs = {"Filters": selection.filters} if selection.filters else {}
+    client = get_client(session, "ec2", region)
+    paginator = client.get_paginator("describe_instances")
+    pages = get_rate_limiter().paginate(
+        region, "DescribeInstances", paginator, account=account, PaginationConfig={"PageSize": PAGE_SIZE}, **kwargs
+    )
+    for page in pages:
+        for reservation in page.get("Reservations", []):
+            for instance in selection.select(reservation.get("Instances", [])):
+                instance_id = instance.get("InstanceId")
+                if instance_id:
+                    arn = _instance_arn(region, account, instance_id)
+                    if protection.has_tag_rules:
+                        protection.note(arn, tag_map(instance))
+                    state = instance.get("State", {}).get("Name", "")
+                    fingerprint = f"{state}|{instance.get('LaunchTime', '')}"
+                    # Lifting a protection makes the instance show up again in incremental runs
+                    yield instance_id, fingerprint + ("|protected" if protection.reason(arn) else "")
+
+
+def _instance_arn(region: str, account: str, instance_id: str) -> str:
+    return f"arn:aws:ec2:{region}:{account}:instance/{instance_id}"
+
+
+def _ids_in_message(message: str, candidates: list[str]) -> list[str]:
+    """Return the candidate ids an EC2 error message refers to."""
+    mentioned = set(_INSTANCE_ID_RE.findall(message or ""))
+    return [i for i in candidates if i in mentioned]
+
+
+@traced("cleanup", service=SERVICE, resource=RESOURCE)
+def cleanup_instance_batch(
+    session: Session,
+    region: str,
+    instance_ids: Sequence[str],
+    dry_run: bool = True,
+    requested: dict[str, float] | None = None,
+) -> list[str]:
+    """Terminate a batch of instances with as few API calls as possible.
+
+    Instances matching a protection rule only get a ``protected`` event.
+    Each other instance gets its catalog/delete event up front, then the ids are sent
+    to ``terminate_instances`` in chunks of at most ``TERMINATE_BATCH_SIZE``.
+    The per-instance ``TerminatingInstances`` states are recorded as
+    ``terminate`` events. EC2 rejects the whole request when any single id is
+    bad, so ids named in the error message are recorded as failed and only the
+    remaining ids are sent again; ids missing from the response are retried.
+    A per-instance error that names no id is narrowed down by splitting the
+    chunk; any other error (e.g. ``UnauthorizedOperation``) fails the chunk.
+
+    When ``requested`` is given, every id EC2 accepted is added to it with the
+    (monotonic) time of the request, for ``confirm_terminations``.
+
+    Raises:
+        RequeueTask: When a chunk is throttled or hits a transient error. The
+            exception's ``retry`` resumes with only the unfinished ids, so the
+            scheduler can requeue it without repeating completed work.
+
+    Returns:
+        The instance ids that could not be terminated.
+    """
+    if not instance_ids:
+        return []
     reporter = get_reporter()
     action = "catalog" if dry_run else "delete"
     status = "discovered" if dry_run else "executing"
     account = _get_account_id(session)
-    # Construct proper ARN for the instance resource
-    arn = f"arn:aws:ec2:{region}:{account}:instance/{instance_id}"
-    reporter.record(
-        region,
-        SERVICE,
-        RESOURCE,
-        action,
-        arn=arn,
-        meta={"status": status, "dry_run": dry_run},
+    protection = get_protection()
+    allowed = []
+    protected = []
+    for instance_id in instance_ids:
+        arn = _instance_arn(region, account, instance_id)
+        rule = protection.reason(arn)
+        if rule is not None:
+            logger.info(
+                "[%s][ec2][instance] protected, not terminating instance_id=%s rule=%s", region, instance_id, rule
+            )
+            reporter.record(
+                region,
+                SERVICE,
+                RESOURCE,
+                "protected",
+                arn=arn,
+                meta={"status": "skipped", "rule": rule, "dry_run": dry_run},
+            )
+            protected.append(arn)
+            continue
+        allowed.append(instance_id)
+        reporter.record(region, SERVICE, RESOURCE, action, arn=arn, meta={"status": status, "dry_run": dry_run})
+    if protected:
+        # Resolves them in the journal and the inventory, so resumed and incremental runs skip them too
+        get_journal().mark(protected, "skipped")
+    # Work queue of (ids, attempt); chunks are pushed back when only part of them went through
+    work: deque[tuple[list[str], int]] = deque(
+        (list(chunk), 1) for chunk in batched(allowed, TERMINATE_BATCH_SIZE, strict=False)
     )
-    client = session.client("ec2", region_name=region)
-    try:
-        response = client.terminate_instances(
-            InstanceIds=[instance_id],
-            Force=True,
-            SkipOsShutdown=True,
-            DryRun=dry_run,
-        )
-        ti = response.get("TerminatingInstances", [])
-        for inst in ti:
+    return _terminate_chunks(session, region, account, work, dry_run, [], requested)
+
+
+def _terminate_chunks(
+    session: Session,
+    region: str,
+    account: str,
+    work: deque[tuple[list[str], int]],
+    dry_run: bool,
+    failed: list[str],
+    requested: dict[str, float] | None = None,
+) -> list[str]:
+    reporter = get_reporter()
+    limiter = get_rate_limiter()
+    journal = get_journal()
+
+    def _fail(ids: Iterable[str], error: str) -> None:
+        for instance_id in ids:
+            failed.append(instance_id)
+            journal.mark(_instance_arn(region, account, instance_id), "failed")
+            reporter.record(
+                region,
+                SERVICE,
+                RESOURCE,
+                "terminate",
+                arn=_instance_arn(region, account, instance_id),
+                meta={"status": "failed", "error": error, "dry_run": dry_run},
+            )
+
+    def _resume() -> list[str]:
+        return _terminate_chunks(session, region, account, work, dry_run, failed, requested)
+
+    client = get_client(session, "ec2", region)
+    while work:
+        ids, attempt = work.popleft()
+        journal.mark([_instance_arn(region, account, i) for i in ids], "inflight")
+        try:
+            with limiter.limit(region, "TerminateInstances", account):
+                response = client.terminate_instances(
+                    InstanceIds=ids,
+                    Force=True,
+                    SkipOsShutdown=True,
+                    DryRun=dry_run,
+                )
+        except ThrottledError as e:
+            work.appendleft((ids, attempt))
+            raise ThrottledError(str(e), retry=_resume) from e
+        except ClientError as e:
+            error = e.response.get("Error", {}) if hasattr(e, "response") else {}
+            code = error.get("Code") or "ClientError"
+            if dry_run and code == "DryRunOperation":
+                logger.info("[%s][ec2][instance] dry-run terminate would succeed instance_ids=%s", region, ids)
+                continue
+            rejected = _ids_in_message(error.get("Message", ""), ids)
+            if rejected:
+                logger.error("[%s][ec2][instance] terminate rejected instance_ids=%s error=%s", region, rejected, e)
+                _fail(rejected, code)
+                remaining = [i for i in ids if i not in rejected]
+                if remaining:
+                    work.append((remaining, attempt))
+            elif code in _TRANSIENT_CODES:
+                work.appendleft((ids, attempt))
+                raise RequeueTask(f"TerminateInstances in {region}: {code}", retry=_resume) from e
+            elif len(ids) > 1 and code in _PER_INSTANCE_CODES:
+                # The error does not say which id is at fault; bisect to isolate it
+                mid = len(ids) // 2
+                work.extend([(ids[:mid], attempt), (ids[mid:], attempt)])
+            else:
+                logger.error("[%s][ec2][instance] terminate failed instance_ids=%s error=%s", region, ids, e)
+                _fail(ids, code)
+            continue
+
+        seen: set[str] = set()
+        requested_at = time.monotonic()
+        for inst in response.get("TerminatingInstances", []):
+            instance_id = inst.get("InstanceId")
+            if not instance_id:
+                continue
+            seen.add(instance_id)
+            if requested is not None:
+                requested[instance_id] = requested_at
             cur = inst.get("CurrentState", {}).get("Name")
             prev = inst.get("PreviousState", {}).get("Name")
             logger.info(
                 "[%s][ec2][instance] terminate requested instance_id=%s previous=%s current=%s dry_run=%s",
                 region,
-                inst.get("InstanceId"),
+                instance_id,
                 prev,
                 cur,
                 dry_run,
             )
-    except ClientError as e:
-        code = e.response.get("Error", {}).get("Code") if hasattr(e, "response") else None
-        if dry_run and code == "DryRunOperation":
-            logger.info("[%s][ec2][instance] dry-run terminate would succeed instance_id=%s", region, instance_id)
-        else:
-            logger.error("[%s][ec2][instance] terminate failed instance_id=%s error=%s", region, instance_id, e)
-
-
-def cleanup_instances(session: Session, region: str, dry_run: bool = True, max_workers: int = 1) -> None:
-    arns: list = catalog_instances(session=session, region=region)
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(cleanup_instance, session, region, arn, dry_run) for arn in arns]
-        for fut in as_completed(futures):
-            fut.result()
+            reporter.record(
+                region,
+                SERVICE,
+                RESOURCE,
+                "terminate",
+                arn=_instance_arn(region, account, instance_id),
+                meta={"status": cur, "previous": prev, "dry_run": dry_run},
+            )
+            journal.mark(_instance_arn(region, account, instance_id), "done")
+        missing = [i for i in ids if i not in seen]
+        if missing:
+            if attempt < MAX_ATTEMPTS:
+                work.append((missing, attempt + 1))
+            else:
+                logger.error("[%s][ec2][instance] terminate not acknowledged instance_ids=%s", region, missing)
+                _fail(missing, "NotAcknowledged")
+    return failed
+
+
+def cleanup_instance(session: Session, region: str, instance_id: Any, dry_run: bool = True) -> None:
+    cleanup_instance_batch(session, region, [instance_id], dry_run)
+
+
+@traced("cleanup", service=SERVICE, resource=RESOURCE)
+def confirm_terminations(
+    session: Session,
+    region: str,
+    requested: dict[str, float],
+    scheduler: Scheduler | None = None,
+    timeout: float = CONFIRM_TIMEOUT,
+) -> float:
+    """Poll until every requested instance is gone and record a final event for each.
+
+    Instead of one waiter per instance, the whole pending set is polled with
+    ``describe_instances`` in chunks filtered by instance id and by the
+    not-yet-terminated states, so terminated instances drop out of the response
+    and only stragglers cost payload. The poll interval backs off
+    exponentially for the set as a whole. Each instance gets a ``confirm``
+    event with status ``terminated`` (or ``timeout``) and the seconds elapsed
+    since its terminate request; a final summary event carries the tail time.
+
+    Returns:
+        Seconds between the last terminate request and the last confirmation.
+    """
+    if not requested:
+        return 0.0
+    reporter = get_reporter()
+    limiter = get_rate_limiter()
+    account = _get_account_id(session)
+    paginator = get_client(session, "ec2", region).get_paginator("describe_instances")
+    pending = dict(requested)
+    last_request = max(requested.values())
+    last_confirmed = last_request
+    deadline = time.monotonic() + timeout
+    delay = CONFIRM_INITIAL_DELAY
+
+    def _record(instance_id: str, status: str, now: float) -> None:
+        reporter.record(
+            region,
+            SERVICE,
+            RESOURCE,
+            "confirm",
+            arn=_instance_arn(region, account, instance_id),
+            meta={"status": status, "elapsed_s": round(now - requested[instance_id], 1)},
+        )
+
+    with scheduler_scope(scheduler) as sched:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(min(delay, deadline - now))
+            delay = min(delay * 2, CONFIRM_MAX_DELAY)
+            for chunk in batched(list(pending), CONFIRM_CHUNK_SIZE, strict=False):
+                pages = limiter.paginate(
+                    region,
+                    "DescribeInstances",
+                    paginator,
+                    account=account,
+                    Filters=[
+                        {"Name": "instance-id", "Values": list(chunk)},
+                        {"Name": "instance-state-name", "Values": list(_NOT_TERMINATED)},
+                    ],
+                    PaginationConfig={"PageSize": PAGE_SIZE},
+                )
+                still_running: set[str] = set()
+                try:
+                    for page in sched.iter_limited(pages, region, SERVICE):
+                        for reservation in page.get("Reservations", []):
+                            still_running.update(i.get("InstanceId") for i in reservation.get("Instances", []))
+                except (ClientError, ThrottledError) as e:
+                    logger.warning("[%s][ec2][instance] confirmation poll failed, will retry: %s", region, e)
+                    continue
+                now = time.monotonic()
+                for instance_id in chunk:
+                    if instance_id not in still_running:
+                        del pending[instance_id]
+                        last_confirmed = now
+                        _record(instance_id, "terminated", now)
+
+    now = time.monotonic()
+    for instance_id in pending:
+        _record(instance_id, "timeout", now)
+    tail = last_confirmed - last_request
+    logger.info(
+        "[%s][ec2][instance] termination confirmed=%d timed_out=%d tail=%.1fs",
+        region,
+        len(requested) - len(pending),
+        len(pending),
+        tail,
+    )
+    reporter.record(
+        region,
+        SERVICE,
+        RESOURCE,
+        "confirm",
+        meta={
+            "status": "complete" if not pending else "incomplete",
+            "confirmed": len(requested) - len(pending),
+            "timed_out": len(pending),
+            "tail_s": round(tail, 1),
+        },
+    )
+    return tail
+
+
+def _confirm_settings() -> tuple[bool, float]:
+    confirm_cfg = getattr(getattr(get_config(), "aws", None), "confirm_terminations", None)
+    enabled = bool(getattr(confirm_cfg, "enabled", False))
+    timeout = getattr(confirm_cfg, "timeout_seconds", None) or CONFIRM_TIMEOUT
+    return enabled, float(timeout)
+
+
+@traced("cleanup", service=SERVICE, resource=RESOURCE)
+def cleanup_instances(
+    session: Session,
+    region: str,
+    dry_run: bool = True,
+    scheduler: Scheduler | None = None,
+    confirm: bool | None = None,
+    discovered: Iterable[str] | None = None,
+) -> None:
+    """Discover and terminate every instance in the region.
+
+    ``discovered`` replaces the ``describe_instances`` catalog with ids that
+    were already listed (e.g. through the tagging API). With ``confirm`` (default: ``aws.confirm_terminations.enabled``) the call
+    only returns once the terminated instances are actually gone, or the
+    confirmation timeout expires. Dry runs are never confirmed.
+    """
+    confirm_enabled, confirm_timeout = _confirm_settings()
+    if confirm is None:
+        confirm = confirm_enabled
+    requested: dict[str, float] | None = {} if confirm and not dry_run else None
+    with scheduler_scope(scheduler) as sched:
+        # Discovery pages are fetched under the scheduler's caps, deletes run on its workers
+        if discovered is None:
+            discovered = sched.iter_limited(catalog_instances(session=session, region=region), region, SERVICE)
+        sched.map(
+            batched(discovered, TERMINATE_BATCH_SIZE, strict=False),
+            lambda instance_ids: cleanup_instance_batch(session, region, instance_ids, dry_run, requested),
+            region=region,
+            service=SERVICE,
+        )
+        if requested:
+            confirm_terminations(session, region, requested, sched, timeout=confirm_timeout)
@@ -1,36 +1,108 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Iterable, Iterator
+from functools import partial
 
 from boto3.session import Session
 from botocore.exceptions import ClientError
 
+from costcutter.core.clients import get_client
+from costcutter.core.journal import get_journal
+from costcutter.core.protection import get_protection
+from costcutter.core.rate_limiter import ThrottledError, get_rate_limiter
+from costcutter.core.scheduler import Scheduler, scheduler_scope
+from costcutter.core.selection import ResourceFields, get_selection, tag_map
+from costcutter.core.tracing import traced
 from costcutter.reporter import get_reporter
-from costcutter.services.ec2 import _get_account_id
+from costcutter.services.common import _get_account_id
 
 SERVICE: str = "ec2"
 RESOURCE: str = "key_pair"
+# Resource Groups Tagging API type (see costcutter.core.discovery)
+TAGGING_TYPE: str = "ec2:key-pair"
+# Resource types that must be cleared in a region before this one (see costcutter.core.dag)
+DEPENDS_ON: tuple[str, ...] = ()
+# What selection rules look at (see costcutter.core.selection); key pairs have no state
+SELECTION_FIELDS = ResourceFields(
+    name_of=lambda key_pair: key_pair.get("KeyName"),
+    name_filter="key-name",
+    created_field="CreateTime",
+)
 logger = logging.getLogger(__name__)
 
 
-def catalog_key_pairs(session: Session, region: str) -> list[str]:
-    client = session.client(service_name="ec2", region_name=region)
+def catalog_key_pairs(session: Session, region: str) -> Iterator[str]:
+    """Yield key pair ids.
 
-    arns: list[str] = []
+    DescribeKeyPairs has no paginator (the API returns every key pair in one
+    response), but exposing a generator keeps the same streaming contract as
+    the other catalog functions. A failed describe call yields nothing.
+    """
     try:
-        keypairs = client.describe_key_pairs().get("KeyPairs", [])
-        arns.extend([k.get("KeyPairId") for k in keypairs])
-    except ClientError as e:
+        for key_pair_id, _ in catalog_key_pair_records(session, region):
+            yield key_pair_id
+    except (ClientError, ThrottledError) as e:
         logger.error("[%s][ec2] Failed to describe key pairs: %s", region, e)
-        arns = []
-    return arns
 
 
+@traced("catalog", service=SERVICE, resource=RESOURCE)
+def catalog_key_pair_records(session: Session, region: str) -> Iterator[tuple[str, str]]:
+    """Yield ``(key_pair_id, fingerprint)``; the key material's fingerprint plus its protection.
+
+    Only key pairs matching the ``selection`` rules are yielded: tag and
+    name rules are sent as ``describe_key_pairs`` filters, the rest are
+    checked here. Key pairs have no state, so an ``instance_states`` rule
+    selects none of them. Key pairs protected by their tags are noted in the
+    protection index.
+
+    Raises:
+        ClientError, ThrottledError: When the describe call fails, so callers
+            can tell a failed listing from an empty one.
+    """
+    selection = get_selection().compile(SELECTION_FIELDS)
+    if selection.unsupported:
+        logger.warning(
+            "[%s][ec2][key_pair] Skipped: key pairs cannot be selected by %s", region, ", ".join(selection.unsupported)
+        )
+        return
+    protection = get_protection()
+    account = _get_account_id(session)
+    kwargs = {"Filters": selection.filters} if selection.filters else {}
+    client = get_client(session, "ec2", region)
+    response = get_rate_limiter().call(region, "DescribeKeyPairs", client.describe_key_pairs, account=account, **kwargs)
+    keypairs = response.get("KeyPairs", [])
+    for k in selection.select(keypairs):
+        key_pair_id = k.get("KeyPairId")
+        if key_pair_id:
+            arn = _key_pair_arn(region, account, key_pair_id)
+            if protection.has_tag_rules:
+                protection.note(arn, tag_map(k))
+            # Lifting a protection makes the key pair show up again in incremental runs
+            yield key_pair_id, k.get("KeyFingerprint", "") + ("|protected" if protection.reason(arn) else "")
+
+
+def _key_pair_arn(region: str, account: str, key_pair_id: str) -> str:
+    return f"arn:aws:ec2:{region}:{account}:key-pair/{key_pair_id}"
+
+
+@traced("cleanup", service=SERVICE, resource=RESOURCE)
 def cleanup_key_pair(session: Session, region: str, key_pair_id: str, dry_run: bool = True) -> None:
     reporter = get_reporter()
     action = "catalog" if dry_run else "delete"
     status = "discovered" if dry_run else "executing"
-    account = _get_account_id(session)
-    arn = f"arn:aws:ec2:{region}:{account}:key-pair/{key_pair_id}"
+    arn = _key_pair_arn(region, _get_account_id(session), key_pair_id)
+    rule = get_protection().reason(arn)
+    if rule is not None:
+        logger.info("[%s][ec2][key_pair] protected, not deleting key_pair_id=%s rule=%s", region, key_pair_id, rule)
+        reporter.record(
+            region,
+            SERVICE,
+            RESOURCE,
+            "protected",
+            arn=arn,
+            meta={"status": "skipped", "rule": rule, "dry_run": dry_run},
+        )
+        get_journal().mark(arn, "skipped")
+        return
     reporter.record(
         region,
         SERVICE,
@@ -39,9 +111,19 @@ def cleanup_key_pair(session: Session, region: str, key_pair_id: str, dry_run: b
         arn=arn,
         meta={"status": status, "dry_run": dry_run},
     )
-    client = session.client("ec2", region_name=region)
+    _delete_key_pair(session, region, key_pair_id, dry_run)
+
+
+def _delete_key_pair(session: Session, region: str, key_pair_id: str, dry_run: bool) -> None:
+    client = get_client(session, "ec2", region)
+    journal = get_journal()
+    account = _get_account_id(session)
+    arn = _key_pair_arn(region, account, key_pair_id)
+    journal.mark(arn, "inflight")
     try:
-        response = client.delete_key_pair(KeyPairId=key_pair_id, DryRun=dry_run)
+        with get_rate_limiter().limit(region, "DeleteKeyPair", account):
+            response = client.delete_key_pair(KeyPairId=key_pair_id, DryRun=dry_run)
+        journal.mark(arn, "done")
         logger.info(
             "[%s][ec2][key_pair] delete requested key_pair_id=%s return=%s dry_run=%s",
             region,
@@ -49,17 +131,38 @@ def cleanup_key_pair(session: Session, region: str, key_pair_id: str, dry_run: b
             response.get("Return"),
             dry_run,
         )
+    except ThrottledError as e:
+        # Requeue only the delete call; the catalog/delete event was already recorded
+        raise ThrottledError(str(e), retry=partial(_delete_key_pair, session, region, key_pair_id, dry_run)) from e
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code") if hasattr(e, "response") else None
         if dry_run and code == "DryRunOperation":
             logger.info("[%s][ec2][key_pair] dry-run delete would succeed key_pair_id=%s", region, key_pair_id)
         else:
             logger.error("[%s][ec2][key_pair] delete failed key_pair_id=%s error=%s", region, key_pair_id, e)
+            journal.mark(arn, "failed")
 
 
-def cleanup_key_pairs(session: Session, region: str, dry_run: bool = True, max_workers: int = 1) -> None:
-    arns: list = catalog_key_pairs(session=session, region=region)
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(cleanup_key_pair, session, region, arn, dry_run) for arn in arns]
-        for fut in as_completed(futures):
-            fut.result()
+@traced("cleanup", service=SERVICE, resource=RESOURCE)
+def cleanup_key_pairs(
+    session: Session,
+    region: str,
+    dry_run: bool = True,
+    scheduler: Scheduler | None = None,
+    discovered: Iterable[str] | None = None,
+) -> None:
+    """Discover and delete every key pair in the region.
+
+    ``discovered`` replaces the ``describe_key_pairs`` catalog with ids that
+    were already listed (e.g. through the tagging API).
+    """
+    with scheduler_scope(scheduler) as sched:
+        # Discovery pages are fetched under the scheduler's caps, deletes run on its workers
+        if discovered is None:
+            discovered = sched.iter_limited(catalog_key_pairs(session=session, region=region), region, SERVICE)
+        sched.map(
+            discovered,
+            lambda key_pair_id: cleanup_key_pair(session, region, key_pair_id, dry_run),
+            region=region,
+            service=SERVICE,
+        )
@@ -0,0 +1,184 @@
+"""Incremental event export.
+
+Sinks receive batches of events from a ``BackgroundWriter`` thread, so
+worker threads only enqueue and never touch the file system. Batches are
+flushed when ``batch_size`` events are waiting or ``flush_interval`` seconds
+have passed, which keeps the report on disk close to current if the process
+is killed halfway through a teardown.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import logging
+import queue
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import asdict
+from pathlib import Path
+from typing import IO, Any, Protocol
+
+from costcutter.reporter import CSV_FIELDS, Event, Record, Reporter, csv_row, to_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+
+
+class EventSink(Protocol):
+    path: Path
+
+    def write(self, events: Sequence[Event]) -> None: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+def _open_text(path: Path, compress: bool) -> IO[str]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        # GzipFile.flush() ends a deflate block, so every flushed batch is readable
+        return io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8", newline="")
+    return path.open("w", encoding="utf-8", newline="")
+
+
+class _FileSink:
+    def __init__(self, path: str | Path, compress: bool | None = None) -> None:
+        self.path = Path(path).expanduser()
+        self.compress = self.path.suffix == ".gz" if compress is None else compress
+        self._fh: IO[str] | None = None
+
+    def _file(self) -> IO[str]:
+        if self._fh is None:
+            self._fh = _open_text(self.path, self.compress)
+            self._start(self._fh)
+        return self._fh
+
+    def _start(self, fh: IO[str]) -> None:
+        pass
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self) -> None:
+        # Opening here creates the file (with its header) even when no event was written
+        self._file().close()
+        self._fh = None
+
+
+class CsvSink(_FileSink):
+    """Write events as CSV rows (same columns as ``Reporter.write_csv``)."""
+
+    def _start(self, fh: IO[str]) -> None:
+        self._writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, events: Sequence[Event]) -> None:
+        self._file()
+        self._writer.writerows(csv_row(e) for e in events)
+
+
+class JsonlSink(_FileSink):
+    """Write one JSON object per event (newline-delimited JSON)."""
+
+    def write(self, events: Sequence[Event]) -> None:
+        fh = self._file()
+        fh.writelines(json.dumps({**asdict(e), "account": e.account}, default=str) + "\n" for e in events)
+
+
+class BackgroundWriter:
+    """Feed a sink from a queue on a dedicated daemon thread.
+
+    Args:
+        sink: Destination for the batched events.
+        batch_size: Flush as soon as this many events are waiting.
+        flush_interval: Flush at least this often while events keep coming.
+    """
+
+    def __init__(
+        self,
+        sink: EventSink,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self._queue: queue.SimpleQueue[Record | None] = queue.SimpleQueue()
+        self._closed = False
+        self.written = 0
+        self._thread = threading.Thread(target=self._loop, name="costcutter-sink", daemon=True)
+        self._thread.start()
+
+    def put(self, rec: Record) -> None:
+        # Never blocks: called from worker threads inside Reporter.record
+        if not self._closed:
+            self._queue.put(rec)
+
+    def _write(self, batch: list[Record]) -> None:
+        if not batch:
+            return
+        # Records of concurrent threads can be enqueued slightly out of order
+        batch.sort()
+        try:
+            self.sink.write([to_event(r) for r in batch])
+            self.sink.flush()
+            self.written += len(batch)
+        except Exception as e:
+            logger.error("Failed to write %d event(s) to %s: %s", len(batch), self.sink.path, e)
+
+    def _loop(self) -> None:
+        batch: list[Record] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    break
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+            self._write(batch)
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+        self._write(batch)
+        try:
+            self.sink.close()
+        except Exception as e:
+            logger.error("Failed to close %s: %s", self.sink.path, e)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write everything queued so far, close the sink and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+def attach_sinks(reporter: Reporter, config: Any) -> None:
+    """Stream events to the CSV/JSONL reports enabled under ``reporting``."""
+    reporting_cfg = getattr(config, "reporting", None)
+    if reporting_cfg is None:
+        return
+    batch_size = getattr(reporting_cfg, "batch_size", None)
+    flush_interval = getattr(reporting_cfg, "flush_interval_seconds", None)
+    for key, sink_cls, default_path in (("csv", CsvSink, "./events.csv"), ("jsonl", JsonlSink, "./events.jsonl")):
+        sink_cfg = getattr(reporting_cfg, key, None)
+        if not sink_cfg or not getattr(sink_cfg, "enabled", False):
+            continue
+        path = str(getattr(sink_cfg, "path", None) or default_path)
+        compress = bool(getattr(sink_cfg, "gzip", False))
+        if compress and not path.endswith(".gz"):
+            path += ".gz"
+        reporter.add_sink(sink_cls(path, compress=compress), batch_size=batch_size, flush_interval=flush_interval)
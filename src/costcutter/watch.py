@@ -0,0 +1,288 @@
+"""Budget-driven kill-switch loop (``costcutter watch``).
+
+Polls the spend of the current period from AWS Budgets or Cost Explorer and
+runs ``orchestrate_services`` once per period when it crosses the configured
+share of the limit. The session and clients are built once and reused across
+polls; the config file is only re-read when its mtime changes.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Protocol
+
+from boto3.session import Session
+from botocore.exceptions import BotoCoreError, ClientError
+
+from costcutter.conf.config import Config, reload_config
+from costcutter.core.clients import get_client
+from costcutter.core.rate_limiter import ThrottledError, get_rate_limiter
+from costcutter.core.session_helper import create_aws_session
+from costcutter.logger import setup_logging
+from costcutter.reporter import get_reporter
+from costcutter.services.common import AccountIdError, _get_account_id
+from costcutter.sinks import attach_sinks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 3600
+# Budgets and Cost Explorer are global services served from us-east-1
+BILLING_REGION = "us-east-1"
+# Cost Explorer keeps revising a day's cost for about this long; older days are fetched once
+SETTLE_DAYS = 2
+
+
+@dataclass(frozen=True, slots=True)
+class Spend:
+    actual: float
+    limit: float
+    forecast: float | None = None
+    unit: str = "USD"
+    # Billing period the spend belongs to (e.g. "2026-10"); a new period re-arms the trigger
+    period: str = ""
+
+
+class SpendSource(Protocol):
+    def fetch(self) -> Spend: ...
+
+
+class BudgetsSource:
+    """Current spend of one AWS Budgets budget."""
+
+    def __init__(self, session: Session, budget_name: str) -> None:
+        if not budget_name:
+            raise ValueError("watch.budget_name is required for the budgets source")
+        self.session = session
+        self.budget_name = budget_name
+
+    def fetch(self) -> Spend:
+        client = get_client(self.session, "budgets", BILLING_REGION)
+        response = get_rate_limiter().call(
+            "global",
+            "DescribeBudget",
+            client.describe_budget,
+            AccountId=_get_account_id(self.session),
+            BudgetName=self.budget_name,
+        )
+        budget = response["Budget"]
+        spend = budget.get("CalculatedSpend", {})
+        forecast = spend.get("ForecastedSpend")
+        start = budget.get("TimePeriod", {}).get("Start")
+        return Spend(
+            actual=float(spend.get("ActualSpend", {}).get("Amount", 0)),
+            limit=float(budget.get("BudgetLimit", {}).get("Amount", 0)),
+            forecast=float(forecast["Amount"]) if forecast else None,
+            unit=budget.get("BudgetLimit", {}).get("Unit", "USD"),
+            period=start.strftime("%Y-%m") if hasattr(start, "strftime") else str(start or ""),
+        )
+
+
+class CostExplorerSource:
+    """Month-to-date unblended cost against a fixed limit, fetched incrementally.
+
+    Days older than ``SETTLE_DAYS`` are kept from earlier polls, so each poll
+    only asks Cost Explorer (billed per request) for the last few days.
+    """
+
+    def __init__(self, session: Session, limit: float, today: Callable[[], date] = date.today) -> None:
+        self.session = session
+        self.limit = float(limit)
+        self._today = today
+        self._month = ""
+        self._settled: dict[str, float] = {}
+
+    def _query(self, start: date, end: date) -> dict[str, float]:
+        client = get_client(self.session, "ce", BILLING_REGION)
+        kwargs: dict[str, Any] = {
+            "TimePeriod": {"Start": start.isoformat(), "End": end.isoformat()},
+            "Granularity": "DAILY",
+            "Metrics": ["UnblendedCost"],
+        }
+        days: dict[str, float] = {}
+        while True:
+            response = get_rate_limiter().call("global", "GetCostAndUsage", client.get_cost_and_usage, **kwargs)
+            for result in response.get("ResultsByTime", []):
+                amount = result.get("Total", {}).get("UnblendedCost", {}).get("Amount", 0)
+                days[result["TimePeriod"]["Start"]] = float(amount)
+            token = response.get("NextPageToken")
+            if not token:
+                return days
+            kwargs["NextPageToken"] = token
+
+    def fetch(self) -> Spend:
+        today = self._today()
+        month = today.strftime("%Y-%m")
+        if month != self._month:
+            self._month, self._settled = month, {}
+        month_start = today.replace(day=1)
+        settled_before = today - timedelta(days=SETTLE_DAYS)
+        start = month_start
+        if self._settled:
+            start = max(month_start, date.fromisoformat(max(self._settled)) + timedelta(days=1))
+        days = self._query(start, today + timedelta(days=1))
+        recent = 0.0
+        for day, amount in days.items():
+            if date.fromisoformat(day) < settled_before:
+                self._settled[day] = amount
+            else:
+                recent += amount
+        return Spend(actual=sum(self._settled.values()) + recent, limit=self.limit, period=month)
+
+
+class Trigger:
+    """Fire once per period when spend reaches ``threshold`` of the limit."""
+
+    def __init__(self, threshold_percent: float = 100.0, use_forecast: bool = False) -> None:
+        self.threshold = float(threshold_percent) / 100
+        self.use_forecast = use_forecast
+        self.fired_period: str | None = None
+
+    def check(self, spend: Spend) -> bool:
+        value = spend.forecast if self.use_forecast and spend.forecast is not None else spend.actual
+        if spend.limit <= 0 or value < spend.limit * self.threshold:
+            return False
+        if self.fired_period == spend.period:
+            return False
+        self.fired_period = spend.period
+        return True
+
+    def rearm(self) -> None:
+        """Let the current period fire again, e.g. after its cleanup failed."""
+        self.fired_period = None
+
+
+class ConfigWatcher:
+    """Reload the config only when the config file's mtime changes."""
+
+    def __init__(self, config_file: Path | None, cli_args: dict[str, Any] | None = None) -> None:
+        self.config_file = config_file
+        self.cli_args = cli_args
+        self._mtime = self._stat()
+        self.config = reload_config(cli_args=cli_args, config_file=config_file)
+
+    def _stat(self) -> int | None:
+        if self.config_file is None:
+            return None
+        try:
+            return self.config_file.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self) -> bool:
+        """Return True when the file changed and ``config`` was reloaded."""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        self.config = reload_config(cli_args=self.cli_args, config_file=self.config_file)
+        logger.info("Reloaded config from %s", self.config_file)
+        return True
+
+
+def build_source(config: Config, session: Session) -> SpendSource:
+    watch_cfg = getattr(config, "watch", None)
+    kind = str(getattr(watch_cfg, "source", None) or "budgets").lower()
+    if kind == "budgets":
+        return BudgetsSource(session, getattr(watch_cfg, "budget_name", "") or "")
+    if kind == "cost_explorer":
+        limit = getattr(watch_cfg, "monthly_limit", 0) or 0
+        if limit <= 0:
+            raise ValueError("watch.monthly_limit must be positive for the cost_explorer source")
+        return CostExplorerSource(session, limit)
+    raise ValueError(f"Unknown watch.source '{kind}'; expected 'budgets' or 'cost_explorer'")
+
+
+def _aws_settings(config: Config) -> dict[str, Any]:
+    aws_cfg = getattr(config, "aws", None)
+    return aws_cfg.to_dict() if isinstance(aws_cfg, Config) else {}
+
+
+def _source_settings(config: Config) -> tuple[Any, ...]:
+    watch_cfg = getattr(config, "watch", None)
+    return tuple(getattr(watch_cfg, key, None) for key in ("source", "budget_name", "monthly_limit"))
+
+
+def run_watch(
+    config_file: Path | None = None,
+    dry_run: bool | None = None,
+    max_polls: int | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    source_factory: Callable[[Config, Session], SpendSource] = build_source,
+    orchestrate: Callable[..., Any] | None = None,
+    echo: Callable[[str], None] = print,
+) -> int:
+    """Poll spend until interrupted (or ``max_polls``) and run the cleanup on a breach.
+
+    Returns:
+        Number of times the cleanup was triggered.
+    """
+    if orchestrate is None:
+        from costcutter.orchestrator import orchestrate_services as orchestrate
+
+    watcher = ConfigWatcher(config_file, cli_args={"dry_run": dry_run})
+    setup_logging(watcher.config)
+    aws = _aws_settings(watcher.config)
+    session = create_aws_session(watcher.config)
+    source = source_factory(watcher.config, session)
+    source_settings = _source_settings(watcher.config)
+    watch_cfg = getattr(watcher.config, "watch", None)
+    trigger = Trigger(
+        getattr(watch_cfg, "threshold_percent", 100) or 100, bool(getattr(watch_cfg, "use_forecast", False))
+    )
+
+    fired = 0
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        if polls and watcher.poll():
+            setup_logging(watcher.config)
+            watch_cfg = getattr(watcher.config, "watch", None)
+            rebuild = _source_settings(watcher.config) != source_settings
+            if _aws_settings(watcher.config) != aws:
+                # Credentials changed: new session (and so new clients)
+                aws = _aws_settings(watcher.config)
+                session = create_aws_session(watcher.config)
+                rebuild = True
+            if rebuild:
+                # Otherwise keep the source, and with it any incremental spend state
+                source_settings = _source_settings(watcher.config)
+                source = source_factory(watcher.config, session)
+            trigger.threshold = float(getattr(watch_cfg, "threshold_percent", 100) or 100) / 100
+            trigger.use_forecast = bool(getattr(watch_cfg, "use_forecast", False))
+        polls += 1
+        interval = float(getattr(watch_cfg, "interval_seconds", None) or DEFAULT_INTERVAL_SECONDS)
+        try:
+            spend = source.fetch()
+        except (BotoCoreError, ClientError, ThrottledError, AccountIdError) as e:
+            logger.error("Failed to fetch spend: %s", e)
+            echo(f"spend: unavailable ({e})")
+        else:
+            pct = spend.actual / spend.limit * 100 if spend.limit else 0.0
+            line = f"spend: {spend.actual:.2f}/{spend.limit:.2f} {spend.unit} ({pct:.0f}%)"
+            if spend.forecast is not None:
+                line += f", forecast {spend.forecast:.2f}"
+            echo(line)
+            if trigger.check(spend):
+                logger.warning("Spend threshold crossed (%s); running cleanup", line)
+                echo("threshold crossed: running cleanup")
+                fired += 1
+                # Each triggered run gets its own reports, as a run from the CLI does
+                reporter = get_reporter()
+                attach_sinks(reporter, watcher.config)
+                try:
+                    # A kill switch cannot wait for someone to resume an interrupted run by hand
+                    orchestrate(dry_run=getattr(watcher.config, "dry_run", True), discard_journal=True)
+                except Exception as e:
+                    # Keep watching and try again on the next poll while spend stays over the threshold
+                    logger.exception("Cleanup failed: %s", e)
+                    echo(f"cleanup failed: {e}")
+                    trigger.rearm()
+                finally:
+                    for saved in reporter.close_sinks():
+                        echo(f"events exported to: {saved}")
+                    reporter.clear()
+        if max_polls is None or polls < max_polls:
+            sleep(interval)
+    return fired
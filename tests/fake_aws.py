@@ -0,0 +1,343 @@
+"""In-memory stand-in for the AWS APIs costcutter calls.
+
+``FakeAWS`` holds EC2 instances and key pairs per region and hands out
+sessions whose clients answer the calls the handlers, region resolution
+and tagging discovery make: paginated ``describe_instances`` (with the
+instance-id, instance-state-name, ``tag:<key>`` and tag-key filters),
+``terminate_instances``, ``describe_key_pairs`` (key-name and tag filters),
+``delete_key_pair``, ``describe_regions``, ``get_caller_identity`` and
+tagging ``get_resources`` (with ``TagFilters``; like AWS, it only lists
+resources that have or had tags). Resources can be given
+tags and creation times with ``tag``, ``untag`` and ``set_created``. Every call can be
+slowed by a fixed latency and throttled at a given rate, and pages are
+capped at ``page_size`` whatever the caller asks for. Dry-run calls answer
+``DryRunOperation`` like EC2 does.
+
+Used by tests and by ``benchmarks/bench_orchestrator.py``; nothing here
+touches the network.
+"""
+
+# Keyword arguments mirror the AWS API parameter names
+# ruff: noqa: N803
+
+import random
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from fnmatch import fnmatchcase
+from typing import Any
+
+from botocore.exceptions import ClientError
+from botocore.paginate import TokenDecoder
+
+ACCOUNT = "123456789012"
+LAUNCH_TIME = datetime(2024, 1, 1, tzinfo=UTC)
+_STATE_CODES = {"pending": 0, "running": 16, "shutting-down": 32, "terminated": 48, "stopping": 64, "stopped": 80}
+
+
+def _error(code: str, operation: str, message: str = "") -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message or code}}, operation)
+
+
+def _matches(filters: dict[str, list[str]], attributes: dict[str, str], tags: dict[str, str]) -> bool:
+    """Apply describe ``Filters`` like EC2: values are ORed (``*``/``?`` wildcards), filters ANDed."""
+    for name, values in filters.items():
+        if name == "tag-key":
+            candidates = list(tags)
+        elif name.startswith("tag:"):
+            candidates = [tags[name[4:]]] if name[4:] in tags else []
+        elif name in attributes:
+            candidates = [attributes[name]]
+        else:
+            raise _error("InvalidParameterValue", "Describe", f"The filter '{name}' is invalid")
+        if not any(fnmatchcase(c, v) for c in candidates for v in values):
+            return False
+    return True
+
+
+def _tags_list(tags: dict[str, str]) -> list[dict[str, str]]:
+    return [{"Key": k, "Value": v} for k, v in tags.items()]
+
+
+class FakeAWS:
+    """Shared state behind every fake session and client.
+
+    Args:
+        regions: Enabled regions, also reported as every service's regions.
+        instances: Instances created in each region.
+        key_pairs: Key pairs created in each region.
+        latency: Seconds each call (and each page) takes.
+        throttle_rate: Probability that a call fails with ``Throttling``.
+        page_size: Most items returned per page.
+        seed: Seed for the throttling decisions.
+    """
+
+    def __init__(
+        self,
+        regions: Iterable[str] = ("us-east-1",),
+        instances: int = 0,
+        key_pairs: int = 0,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        page_size: int = 1000,
+        account: str = ACCOUNT,
+        seed: int = 0,
+    ) -> None:
+        self.regions = tuple(regions)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.account = account
+        self.calls: Counter[str] = Counter()
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        # Dicts keep insertion order, so offsets into them make stable page tokens
+        self._instances = {region: {f"i-{n:017x}": "running" for n in range(instances)} for region in self.regions}
+        self._key_pairs = {region: {f"key-{n:017x}": f"fp:{n}" for n in range(key_pairs)} for region in self.regions}
+        # (region, resource id) -> tags / creation time; instances are named after their id by default
+        self._tags: dict[tuple[str, str], dict[str, str]] = {
+            (region, i): {"Name": i} for region, ids in self._instances.items() for i in ids
+        }
+        self._created: dict[tuple[str, str], datetime] = {}
+
+    def session(self, region_name: str | None = None) -> "FakeSession":
+        return FakeSession(self, region_name or self.regions[0])
+
+    def remaining(self) -> dict[str, int]:
+        """Count the instances not yet terminated and the key pairs not yet deleted."""
+        with self._lock:
+            return {
+                "instances": sum(s != "terminated" for r in self._instances.values() for s in r.values()),
+                "key_pairs": sum(len(r) for r in self._key_pairs.values()),
+            }
+
+    def tag(self, region: str, resource_id: str, **tags: str) -> None:
+        """Add tags to an instance or key pair."""
+        with self._lock:
+            self._tags.setdefault((region, resource_id), {}).update(tags)
+
+    def untag(self, region: str, resource_id: str, *keys: str) -> None:
+        """Remove tags from an instance or key pair."""
+        with self._lock:
+            for key in keys:
+                self._tags.get((region, resource_id), {}).pop(key, None)
+
+    def set_created(self, region: str, resource_id: str, when: datetime) -> None:
+        """Set an instance's launch time or a key pair's creation time."""
+        with self._lock:
+            self._created[(region, resource_id)] = when
+
+    def _tags_of(self, region: str, resource_id: str) -> dict[str, str]:
+        return self._tags.get((region, resource_id), {})
+
+    def _created_at(self, region: str, resource_id: str) -> datetime:
+        return self._created.get((region, resource_id), LAUNCH_TIME)
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+            throttled = self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise _error("Throttling", operation, "Rate exceeded")
+
+
+class FakeSession:
+    """The parts of ``boto3.Session`` costcutter uses."""
+
+    profile_name = "fake"
+
+    def __init__(self, aws: FakeAWS, region_name: str) -> None:
+        self.aws = aws
+        self.region_name = region_name
+
+    def client(self, service_name: str, region_name: str | None = None, **kwargs: Any) -> "FakeClient":
+        return FakeClient(self.aws, service_name, region_name or self.region_name)
+
+    def get_available_regions(self, service_name: str) -> list[str]:
+        return list(self.aws.regions)
+
+
+class _Paginator:
+    def __init__(self, client: "FakeClient", operation: str) -> None:
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, PaginationConfig: dict[str, Any] | None = None, **kwargs: Any) -> Iterator[dict[str, Any]]:
+        config = PaginationConfig or {}
+        limit = min(
+            config.get("PageSize") or kwargs.get("ResourcesPerPage") or self.client.aws.page_size,
+            self.client.aws.page_size,
+        )
+        # Starting tokens are botocore-encoded {"NextToken"/"PaginationToken": offset}
+        start = config.get("StartingToken")
+        offset = int(next(iter(TokenDecoder().decode(start).values()))) if start else 0
+        page_fn = getattr(self.client, f"_{self.operation}_page")
+        while True:
+            page, more = page_fn(offset, limit, **kwargs)
+            offset += limit
+            yield page
+            if not more:
+                return
+
+
+class FakeClient:
+    """A client for one (service, region); calls outside what costcutter uses are missing on purpose."""
+
+    def __init__(self, aws: FakeAWS, service_name: str, region_name: str) -> None:
+        self.aws = aws
+        self.service_name = service_name
+        self.region_name = region_name
+
+    def get_paginator(self, operation_name: str) -> _Paginator:
+        if not hasattr(self, f"_{operation_name}_page"):
+            raise NotImplementedError(f"{self.service_name}.{operation_name} is not paginated by the fake")
+        return _Paginator(self, operation_name)
+
+    # sts
+
+    def get_caller_identity(self) -> dict[str, Any]:
+        self.aws._call("GetCallerIdentity")
+        account = self.aws.account
+        return {"Account": account, "Arn": f"arn:aws:iam::{account}:user/fake", "UserId": "AIDAFAKE"}
+
+    # ec2
+
+    def describe_regions(self, AllRegions: bool = False) -> dict[str, Any]:
+        self.aws._call("DescribeRegions")
+        return {"Regions": [{"RegionName": r, "OptInStatus": "opt-in-not-required"} for r in self.aws.regions]}
+
+    def _describe_instances_page(
+        self, offset: int, limit: int, Filters: list[dict[str, Any]] | None = None
+    ) -> tuple[dict[str, Any], bool]:
+        self.aws._call("DescribeInstances")
+        filters = {f["Name"]: list(f["Values"]) for f in Filters or []}
+        ids = filters.pop("instance-id", None)
+        aws, name = self.aws, self.region_name
+        with aws._lock:
+            region = aws._instances.get(name, {})
+            candidates = [
+                i
+                for i in (region if ids is None else [i for i in ids if i in region])
+                if _matches(filters, {"instance-state-name": region[i]}, aws._tags_of(name, i))
+            ]
+            instances = [
+                {
+                    "InstanceId": instance_id,
+                    "State": {"Code": _STATE_CODES[region[instance_id]], "Name": region[instance_id]},
+                    "InstanceType": "t3.micro",
+                    "LaunchTime": aws._created_at(name, instance_id),
+                    "Tags": _tags_list(aws._tags_of(name, instance_id)),
+                }
+                for instance_id in candidates[offset : offset + limit]
+            ]
+        more = offset + limit < len(candidates)
+        page: dict[str, Any] = {"Reservations": [{"Instances": instances}] if instances else []}
+        if more:
+            page["NextToken"] = str(offset + limit)
+        return page, more
+
+    def terminate_instances(self, InstanceIds: list[str], DryRun: bool = False, **kwargs: Any) -> dict[str, Any]:
+        self.aws._call("TerminateInstances")
+        with self.aws._lock:
+            region = self.aws._instances.get(self.region_name, {})
+            missing = [i for i in InstanceIds if i not in region]
+            if missing:
+                raise _error(
+                    "InvalidInstanceID.NotFound",
+                    "TerminateInstances",
+                    f"The instance IDs '{', '.join(missing)}' do not exist",
+                )
+            if DryRun:
+                raise _error("DryRunOperation", "TerminateInstances", "Request would have succeeded")
+            terminating = []
+            for instance_id in InstanceIds:
+                previous = region[instance_id]
+                region[instance_id] = "terminated"
+                current = "terminated" if previous == "terminated" else "shutting-down"
+                terminating.append({
+                    "InstanceId": instance_id,
+                    "CurrentState": {"Code": _STATE_CODES[current], "Name": current},
+                    "PreviousState": {"Code": _STATE_CODES[previous], "Name": previous},
+                })
+        return {"TerminatingInstances": terminating}
+
+    def describe_key_pairs(self, Filters: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+        self.aws._call("DescribeKeyPairs")
+        filters = {f["Name"]: list(f["Values"]) for f in Filters or []}
+        aws, name = self.aws, self.region_name
+        with aws._lock:
+            region = aws._key_pairs.get(name, {})
+            return {
+                "KeyPairs": [
+                    {
+                        "KeyPairId": key_pair_id,
+                        "KeyName": key_pair_id,
+                        "KeyFingerprint": fingerprint,
+                        "CreateTime": aws._created_at(name, key_pair_id),
+                        "Tags": _tags_list(aws._tags_of(name, key_pair_id)),
+                    }
+                    for key_pair_id, fingerprint in region.items()
+                    if _matches(filters, {"key-name": key_pair_id}, aws._tags_of(name, key_pair_id))
+                ]
+            }
+
+    def delete_key_pair(self, KeyPairId: str, DryRun: bool = False) -> dict[str, Any]:
+        self.aws._call("DeleteKeyPair")
+        if DryRun:
+            raise _error("DryRunOperation", "DeleteKeyPair", "Request would have succeeded")
+        with self.aws._lock:
+            self.aws._key_pairs.get(self.region_name, {}).pop(KeyPairId, None)
+        return {"Return": True, "KeyPairId": KeyPairId}
+
+    # resourcegroupstaggingapi
+
+    def _get_resources_page(
+        self,
+        offset: int,
+        limit: int,
+        ResourceTypeFilters: list[str] | None = None,
+        TagFilters: list[dict[str, Any]] | None = None,
+        **kwargs: Any,
+    ) -> tuple[dict[str, Any], bool]:
+        self.aws._call("GetResources")
+        types = set(ResourceTypeFilters or ("ec2:instance", "ec2:key-pair"))
+        aws, name = self.aws, self.region_name
+        prefix = f"arn:aws:ec2:{name}:{aws.account}"
+
+        def selected(tags: dict[str, str]) -> bool:
+            # Keys are ANDed, values of one key ORed and matched exactly
+            return all(
+                f["Key"] in tags and tags[f["Key"]] in f.get("Values", [tags[f["Key"]]]) for f in TagFilters or []
+            )
+
+        with aws._lock:
+            mappings = []
+            if "ec2:instance" in types:
+                mappings += [
+                    (f"{prefix}:instance/{i}", aws._tags_of(name, i))
+                    for i, state in aws._instances.get(name, {}).items()
+                    if state != "terminated" and (name, i) in aws._tags
+                ]
+            if "ec2:key-pair" in types:
+                mappings += [
+                    (f"{prefix}:key-pair/{k}", aws._tags_of(name, k))
+                    for k in aws._key_pairs.get(name, {})
+                    if (name, k) in aws._tags
+                ]
+            mappings = [(arn, tags) for arn, tags in mappings if selected(tags)]
+        more = offset + limit < len(mappings)
+        page: dict[str, Any] = {
+            "ResourceTagMappingList": [
+                {"ResourceARN": arn, "Tags": _tags_list(tags)} for arn, tags in mappings[offset : offset + limit]
+            ]
+        }
+        if more:
+            page["PaginationToken"] = str(offset + limit)
+        return page, more
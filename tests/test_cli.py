@@ -1,4 +1,23 @@
-from costcutter.cli import _render_summary_table, _render_table, main, run_cli
+import io
+import subprocess
+import sys
+import threading
+
+import pytest
+from rich.console import Console
+
+from costcutter.cli import (
+    API_ROWS,
+    _render_api_table,
+    _render_summary_table,
+    _render_table,
+    _run_live,
+    _run_plain,
+    main,
+    run_cli,
+)
+from costcutter.core.metrics import ApiMetrics, CallStats
+from costcutter.progress import RunProgress
 
 
 class DummyEvent:
@@ -13,12 +32,41 @@ class DummyEvent:
 
 
 class DummyReporter:
+    version = 0
+
+    def __init__(self):
+        self.sinks = []
+
     def snapshot(self):
         return [DummyEvent(), DummyEvent(meta={"foo": "bar"})]
 
+    def tail(self, n=None):
+        return self.snapshot()[-n:]
+
+    def count(self):
+        return len(self.snapshot())
+
+    def counts(self):
+        return {("s", "res", "a"): 2}
+
+    def counts_by_account(self):
+        return {("", "s", "res", "a"): 2}
+
     def write_csv(self, path):
         return path
 
+    def add_sink(self, sink, batch_size=None, flush_interval=None):
+        self.sinks.append(sink)
+
+    def subscribe(self, event):
+        pass
+
+    def unsubscribe(self, event):
+        pass
+
+    def close_sinks(self):
+        return [s.path for s in self.sinks]
+
 
 def test_render_table_empty():
     reporter = DummyReporter()
@@ -32,15 +80,100 @@ def test_render_summary_table_empty():
     assert table.title.startswith("CostCutter")
 
 
+def test_render_summary_table_splits_accounts():
+    reporter = DummyReporter()
+    reporter.counts_by_account = lambda: {("111111111111", "s", "res", "a"): 1, ("222222222222", "s", "res", "a"): 1}
+    table = _render_summary_table(reporter, dry_run=True)
+    assert [c.header for c in table.columns] == ["Account", "Service", "Resource", "Action", "Count"]
+    assert table.row_count == 2
+
+
+def test_render_api_table_lists_slowest_operations_first():
+    metrics = ApiMetrics()
+    assert _render_api_table(metrics) is None
+    metrics.merge({
+        (f"region-{n}", "ec2", "DescribeInstances"): CallStats(calls=1, seconds=float(n)) for n in range(API_ROWS + 2)
+    })
+    table = _render_api_table(metrics)
+    assert table.row_count == API_ROWS
+    assert table.columns[0]._cells[0] == f"region-{API_ROWS + 1}"
+    assert table.caption == f"Top {API_ROWS} of {API_ROWS + 2} operations by total time"
+
+
 def test_run_cli(monkeypatch):
-    monkeypatch.setattr("costcutter.cli.get_reporter", lambda: DummyReporter())
-    monkeypatch.setattr("costcutter.cli.orchestrate_services", lambda dry_run: None)
+    # The CLI imports these when it runs, so patch them where they are defined
+    monkeypatch.setattr("costcutter.reporter.get_reporter", lambda: DummyReporter())
+    monkeypatch.setattr(
+        "costcutter.orchestrator.orchestrate_services",
+        lambda dry_run, progress=None, incremental=False, resume=False, discard_journal=False: None,
+    )
     run_cli(dry_run=True)
 
 
+def test_run_cli_closes_sinks_when_the_run_fails(monkeypatch):
+    reporter = DummyReporter()
+    closed = []
+    reporter.close_sinks = lambda: closed.append(True) or []
+    monkeypatch.setattr("costcutter.reporter.get_reporter", lambda: reporter)
+
+    def orchestrate(dry_run, progress=None, incremental=False, resume=False, discard_journal=False):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("costcutter.orchestrator.orchestrate_services", orchestrate)
+    with pytest.raises(RuntimeError, match="boom"):
+        run_cli(dry_run=True)
+    assert closed == [True]
+
+
 def test_main(monkeypatch):
     class Ctx:
         invoked_subcommand = None
 
-    monkeypatch.setattr("costcutter.cli.run_cli", lambda dry_run, config_file: None)
+    monkeypatch.setattr("costcutter.cli.run_cli", lambda dry_run, config_file, **kwargs: None)
     main(Ctx(), dry_run=True, config=None)
+
+
+def _finished_run():
+    progress = RunProgress()
+    progress.set_totals({"us-east-1": 2})
+    progress.advance("us-east-1")
+    progress.advance("us-east-1")
+    done = threading.Event()
+    done.set()
+    return progress, threading.Event(), done
+
+
+def test_run_plain_prints_compact_progress():
+    console = Console(file=io.StringIO(), force_terminal=False)
+    progress, wake, done = _finished_run()
+    _run_plain(console, DummyReporter(), progress, wake, done)
+    assert console.file.getvalue().strip() == "progress: 2/2 tasks, 2 events"
+
+
+def test_run_live_draws_region_bars():
+    console = Console(file=io.StringIO(), force_terminal=True, width=120)
+    progress, wake, done = _finished_run()
+    _run_live(console, DummyReporter(), progress, True, wake, done)
+    assert "us-east-1" in console.file.getvalue()
+
+
+def test_cli_import_does_not_load_heavy_dependencies():
+    code = "import sys, costcutter.cli; print(sorted(m for m in ('boto3', 'pyfiglet', 'yaml') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_main_skips_run_for_subcommands(monkeypatch):
+    class Ctx:
+        invoked_subcommand = "watch"
+        obj = None
+
+    calls = []
+    monkeypatch.setattr(
+        "costcutter.cli.run_cli",
+        lambda dry_run, config_file, **kwargs: calls.append(dry_run),
+    )
+    ctx = Ctx()
+    main(ctx, dry_run=True, config=None)
+    assert calls == []
+    assert ctx.obj == {"dry_run": True, "config": None}
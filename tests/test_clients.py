@@ -0,0 +1,75 @@
+import gc
+import threading
+
+import boto3
+
+from costcutter.core.clients import ClientRegistry
+
+
+class DummySession:
+    def __init__(self):
+        self.calls = []
+
+    def client(self, service_name, region_name=None, config=None):
+        self.calls.append((service_name, region_name, config))
+        return object()
+
+
+def test_registry_builds_each_client_once():
+    registry = ClientRegistry()
+    session = DummySession()
+    a = registry.get(session, "ec2", "us-east-1")
+    assert registry.get(session, "ec2", "us-east-1") is a
+    assert registry.get(session, "ec2", "eu-west-1") is not a
+    assert registry.get(DummySession(), "ec2", "us-east-1") is not a
+    assert len(session.calls) == 2
+    stats = registry.stats()
+    assert stats.created == 3
+    assert stats.cache_hits == 1
+
+
+def test_registry_drops_the_clients_of_discarded_sessions():
+    registry = ClientRegistry()
+    sessions = [
+        boto3.Session(aws_access_key_id="testing", aws_secret_access_key="testing", region_name="us-east-1")
+        for _ in range(3)
+    ]
+    for session in sessions:
+        registry.get(session, "ec2", "us-east-1")
+    kept = sessions.pop()
+    del session, sessions
+    gc.collect()
+    assert list(registry._clients) == [kept]
+    assert registry.get(kept, "ec2", "us-east-1") is registry.get(kept, "ec2", "us-east-1")
+
+
+def test_registry_sets_pool_size_and_resets_on_change():
+    registry = ClientRegistry(max_pool_connections=8)
+    session = DummySession()
+    first = registry.get(session, "ec2", "us-east-1")
+    assert session.calls[0][2].max_pool_connections == 8
+    registry.configure(max_pool_connections=8)
+    assert registry.get(session, "ec2", "us-east-1") is first
+    registry.configure(max_pool_connections=16)
+    assert registry.get(session, "ec2", "us-east-1") is not first
+    assert session.calls[-1][2].max_pool_connections == 16
+
+
+def test_registry_is_thread_safe():
+    registry = ClientRegistry()
+    session = DummySession()
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get(session, "ec2", "us-east-1"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(r) for r in results}) == 1
+    assert len(session.calls) == 1
+    assert registry.stats().cache_hits == 7
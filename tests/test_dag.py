@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from costcutter.core.dag import DagExecutor, topological_order
+
+
+def test_topological_order():
+    graph = {"sg": ["eni"], "eni": ["instances"], "instances": [], "eip": ["nat"], "nat": []}
+    order = topological_order(graph)
+    for node, deps in graph.items():
+        assert all(order.index(d) < order.index(node) for d in deps)
+
+
+def test_topological_order_rejects_cycles_and_unknown_nodes():
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order({"a": ["b"], "b": ["a"]})
+    with pytest.raises(ValueError, match="unknown"):
+        topological_order({"a": ["missing"]})
+
+
+def test_dependents_wait_per_region_only():
+    slow_region_gate = threading.Event()
+    lock = threading.Lock()
+    log = []
+
+    def run_node(region, node):
+        if region == "slow" and node == "instances":
+            assert slow_region_gate.wait(timeout=5)
+        with lock:
+            log.append((region, node))
+        if region == "fast" and node == "volumes":
+            # The fast region's dependent ran while the slow region was still busy
+            slow_region_gate.set()
+
+    graph = {"instances": [], "volumes": ["instances"], "key_pairs": []}
+    result = DagExecutor(graph, ["slow", "fast"], run_node, max_workers=4).run()
+    assert len(result.completed) == 6
+    for region in ("slow", "fast"):
+        assert log.index((region, "instances")) < log.index((region, "volumes"))
+    assert log.index(("fast", "volumes")) < log.index(("slow", "instances"))
+
+
+def test_failed_dependency_blocks_dependents_in_that_region():
+    def run_node(region, node):
+        if region == "a" and node == "instances":
+            raise RuntimeError("boom")
+
+    graph = {"instances": [], "volumes": ["instances"], "snapshots": ["volumes"]}
+    result = DagExecutor(graph, ["a", "b"], run_node, max_workers=2).run()
+    assert result.failed == [("a", "instances")]
+    assert sorted(result.blocked) == [("a", "snapshots"), ("a", "volumes")]
+    assert sorted(n for r, n in result.completed if r == "b") == ["instances", "snapshots", "volumes"]
+
+
+def test_nodes_dropped_for_a_region_do_not_block_dependents():
+    seen = []
+    graph = {"instances": [], "volumes": ["instances"]}
+    DagExecutor(
+        graph,
+        ["a"],
+        lambda region, node: seen.append(node),
+        max_workers=1,
+        nodes_for_region=lambda region: ["volumes"],
+    ).run()
+    assert seen == ["volumes"]
@@ -0,0 +1,90 @@
+import boto3
+from botocore.stub import Stubber
+
+from costcutter.core.arn import parse_arn
+from costcutter.core.clients import get_client_registry
+from costcutter.core.discovery import TaggingDiscovery
+from costcutter.orchestrator import _tagging_types
+
+TYPES = {"ec2:instance": "ec2.instances", "ec2:key-pair": "ec2.key_pairs"}
+
+
+class StubSession:
+    def __init__(self, client):
+        self._client = client
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return self._client
+
+
+def _tagging_client():
+    return boto3.client(
+        "resourcegroupstaggingapi",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+
+
+def _mapping(arn):
+    return {"ResourceARN": arn, "Tags": []}
+
+
+def setup_function(_):
+    get_client_registry().clear()
+
+
+def test_parse_arn_variants():
+    arn = parse_arn("arn:aws:ec2:us-east-1:123456789012:instance/i-0abc")
+    assert (arn.service, arn.region, arn.account) == ("ec2", "us-east-1", "123456789012")
+    assert (arn.type_key, arn.resource_id) == ("ec2:instance", "i-0abc")
+    assert parse_arn("arn:aws:logs:us-east-1:1:log-group:/aws/x").resource_id == "/aws/x"
+    assert parse_arn("arn:aws:s3:::bucket").type_key == "s3"
+
+
+def test_tagging_discovery_routes_arns_across_pages():
+    client = _tagging_client()
+    params = {"ResourceTypeFilters": sorted(TYPES), "ResourcesPerPage": 100}
+    with Stubber(client) as stub:
+        stub.add_response(
+            "get_resources",
+            {
+                "PaginationToken": "next",
+                "ResourceTagMappingList": [
+                    _mapping("arn:aws:ec2:us-east-1:1:instance/i-0aaa"),
+                    _mapping("arn:aws:ec2:us-east-1:1:key-pair/key-0bbb"),
+                ],
+            },
+            params,
+        )
+        stub.add_response(
+            "get_resources",
+            {
+                "PaginationToken": "",
+                "ResourceTagMappingList": [
+                    _mapping("arn:aws:ec2:us-east-1:1:instance/i-0ccc"),
+                    _mapping("arn:aws:ec2:us-east-1:1:volume/vol-0ddd"),
+                ],
+            },
+            {**params, "PaginationToken": "next"},
+        )
+        discovery = TaggingDiscovery(StubSession(client), TYPES)
+        assert discovery.ids_for("us-east-1", "ec2.instances") == ["i-0aaa", "i-0ccc"]
+        # Second node of the region reuses the same fetch
+        assert discovery.ids_for("us-east-1", "ec2.key_pairs") == ["key-0bbb"]
+        stub.assert_no_pending_responses()
+
+
+def test_tagging_discovery_falls_back_on_error_and_uncovered_nodes():
+    client = _tagging_client()
+    with Stubber(client) as stub:
+        stub.add_client_error("get_resources", service_error_code="AccessDeniedException")
+        discovery = TaggingDiscovery(StubSession(client), TYPES)
+        assert discovery.ids_for("us-east-1", "ec2.instances") is None
+        assert discovery.ids_for("us-east-1", "ec2.key_pairs") is None
+        assert discovery.ids_for("us-east-1", "ec2.volumes") is None
+        stub.assert_no_pending_responses()
+
+
+def test_tagging_types_cover_ec2_handlers():
+    assert _tagging_types(["ec2"]) == TYPES
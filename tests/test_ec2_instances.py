@@ -1,14 +1,33 @@
+from functools import partial
+
+import pytest
+from botocore.exceptions import ClientError
+
+from costcutter.core.rate_limiter import ThrottledError
+from costcutter.core.scheduler import RequeueTask, Scheduler
+from costcutter.reporter import Reporter
 from costcutter.services.ec2 import instances
 
 
+class Paginator:
+    def __init__(self):
+        self.kwargs = None
+
+    def paginate(self, **kwargs):
+        self.kwargs = kwargs
+        yield {"Reservations": [{"Instances": [{"InstanceId": "i-123"}]}]}
+        yield {"Reservations": [{"Instances": [{"InstanceId": "i-456"}, {"State": {"Name": "running"}}]}]}
+
+
 class DummySession:
-    def client(self, service_name=None, region_name=None):
+    def client(self, service_name=None, region_name=None, **kwargs):
         class Client:
             def get_caller_identity(self):
                 return {"Account": "123456789012"}
 
-            def describe_instances(self):
-                return {"Reservations": [{"Instances": [{"InstanceId": "i-123"}]}]}
+            def get_paginator(self, operation_name):
+                assert operation_name == "describe_instances"
+                return Paginator()
 
             def terminate_instances(self, **kwargs):
                 return {
@@ -29,10 +48,52 @@ def test_get_account_id():
     assert instances._get_account_id(session) == "123456789012"
 
 
+def test_get_account_id_fails_closed_and_retries(monkeypatch):
+    from costcutter.services.common import AccountIdError
+
+    identities = [
+        ClientError({"Error": {"Code": "ExpiredToken"}}, "GetCallerIdentity"),
+        {},
+        {"Account": "210987654321"},
+    ]
+
+    class Session:
+        def client(self, service_name=None, region_name=None, **kwargs):
+            class Client:
+                def get_caller_identity(self):
+                    identity = identities.pop(0)
+                    if isinstance(identity, Exception):
+                        raise identity
+                    return identity
+
+            return Client()
+
+    session = Session()
+    with pytest.raises(AccountIdError, match="ExpiredToken"):
+        instances._get_account_id(session)
+    # Nothing is cached for a failure: an empty account id is refused too, then resolved
+    with pytest.raises(AccountIdError, match="no account id"):
+        instances._get_account_id(session)
+    assert instances._get_account_id(session) == "210987654321"
+
+
 def test_catalog_instances():
     session = DummySession()
     arns = instances.catalog_instances(session, "us-east-1")
-    assert "i-123" in arns
+    # Discovery is lazy: nothing is fetched until the generator is consumed
+    assert next(arns) == "i-123"
+    assert list(arns) == ["i-456"]
+
+
+def test_cleanup_instances_streams_all_pages(monkeypatch):
+    seen = []
+    monkeypatch.setattr(
+        "costcutter.services.ec2.instances.cleanup_instance_batch",
+        lambda session, region, instance_ids, dry_run, requested: seen.append(instance_ids),
+    )
+    instances.cleanup_instances(DummySession(), "us-east-1", dry_run=True, scheduler=Scheduler(max_workers=2))
+    # Both pages fit in one terminate batch
+    assert seen == [("i-123", "i-456")]
 
 
 def test_cleanup_instance(monkeypatch):
@@ -45,6 +106,176 @@ def test_cleanup_instance(monkeypatch):
 
 def test_cleanup_instances(monkeypatch):
     session = DummySession()
-    monkeypatch.setattr("costcutter.services.ec2.instances.catalog_instances", lambda *args, **kwargs: ["i-123"])
-    monkeypatch.setattr("costcutter.services.ec2.instances.cleanup_instance", lambda *args, **kwargs: None)
-    instances.cleanup_instances(session, "us-east-1", dry_run=True, max_workers=1)
+    monkeypatch.setattr("costcutter.services.ec2.instances.catalog_instances", lambda *args, **kwargs: iter(["i-123"]))
+    monkeypatch.setattr("costcutter.services.ec2.instances.cleanup_instance_batch", lambda *args, **kwargs: None)
+    instances.cleanup_instances(session, "us-east-1", dry_run=True)
+
+
+class BatchClient:
+    """Fake EC2 client scripted with one outcome per terminate_instances call."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def terminate_instances(self, InstanceIds, **kwargs):  # noqa: N803
+        self.calls.append(list(InstanceIds))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        ids = InstanceIds if outcome == "all" else outcome
+        return {
+            "TerminatingInstances": [
+                {"InstanceId": i, "CurrentState": {"Name": "shutting-down"}, "PreviousState": {"Name": "running"}}
+                for i in ids
+            ]
+        }
+
+
+class BatchSession:
+    def __init__(self, client):
+        self._client = client
+
+    def client(self, service_name=None, region_name=None, **kwargs):
+        return self._client
+
+
+def _client_error(code, message=""):
+    return ClientError({"Error": {"Code": code, "Message": message}}, "TerminateInstances")
+
+
+def _run_batch(monkeypatch, client, ids, dry_run=False):
+    reporter = Reporter()
+    monkeypatch.setattr(instances, "get_reporter", lambda: reporter)
+    monkeypatch.setattr(instances, "_get_account_id", lambda session: "123456789012")
+    monkeypatch.setattr(instances, "get_client", lambda session, service, region: client)
+    run = partial(instances.cleanup_instance_batch, BatchSession(client), "us-east-1", ids, dry_run=dry_run)
+    while True:
+        # Stand-in for the scheduler: run the retry a requeue would have scheduled
+        try:
+            failed = run()
+            break
+        except RequeueTask as requeue:
+            assert requeue.retry is not None
+            run = requeue.retry
+    terminate = {e.arn.rsplit("/", 1)[1]: e.meta["status"] for e in reporter.snapshot() if e.action == "terminate"}
+    return failed, terminate
+
+
+def test_cleanup_instance_batch_chunks_ids(monkeypatch):
+    monkeypatch.setattr(instances, "TERMINATE_BATCH_SIZE", 2)
+    client = BatchClient(["all", "all"])
+    failed, terminate = _run_batch(monkeypatch, client, ["i-00000001", "i-00000002", "i-00000003"])
+    assert client.calls == [["i-00000001", "i-00000002"], ["i-00000003"]]
+    assert failed == []
+    assert terminate == dict.fromkeys(["i-00000001", "i-00000002", "i-00000003"], "shutting-down")
+
+
+def test_cleanup_instance_batch_retries_only_valid_ids(monkeypatch):
+    client = BatchClient([
+        _client_error("InvalidInstanceID.NotFound", "The instance ID 'i-0000000b' does not exist"),
+        "all",
+    ])
+    failed, terminate = _run_batch(monkeypatch, client, ["i-0000000a", "i-0000000b", "i-0000000c"])
+    assert client.calls[1] == ["i-0000000a", "i-0000000c"]
+    assert failed == ["i-0000000b"]
+    assert terminate == {"i-0000000a": "shutting-down", "i-0000000b": "failed", "i-0000000c": "shutting-down"}
+
+
+def test_cleanup_instance_batch_retries_throttled_and_unacknowledged(monkeypatch):
+    client = BatchClient([_client_error("RequestLimitExceeded"), ["i-0000000a"], "all"])
+    failed, terminate = _run_batch(monkeypatch, client, ["i-0000000a", "i-0000000b"])
+    assert client.calls == [["i-0000000a", "i-0000000b"], ["i-0000000a", "i-0000000b"], ["i-0000000b"]]
+    assert failed == []
+    assert set(terminate) == {"i-0000000a", "i-0000000b"}
+
+
+def test_cleanup_instance_batch_throttle_requeues_only_unfinished_chunks(monkeypatch):
+    monkeypatch.setattr(instances, "TERMINATE_BATCH_SIZE", 1)
+    reporter = Reporter()
+    monkeypatch.setattr(instances, "get_reporter", lambda: reporter)
+    monkeypatch.setattr(instances, "_get_account_id", lambda session: "123456789012")
+    client = BatchClient(["all", _client_error("Throttling"), "all"])
+    monkeypatch.setattr(instances, "get_client", lambda session, service, region: client)
+    with pytest.raises(ThrottledError) as info:
+        instances.cleanup_instance_batch(BatchSession(client), "eu-west-1", ["i-0000000a", "i-0000000b"], False)
+    assert info.value.retry() == []
+    assert client.calls == [["i-0000000a"], ["i-0000000b"], ["i-0000000b"]]
+    # The catalog/delete event is recorded once per instance, not once per attempt
+    assert sum(e.action == "delete" for e in reporter.snapshot()) == 2
+
+
+def test_cleanup_instance_batch_bisects_anonymous_per_instance_errors(monkeypatch):
+    client = BatchClient([_client_error("IncorrectInstanceState"), "all", _client_error("IncorrectInstanceState")])
+    failed, terminate = _run_batch(monkeypatch, client, ["i-0000000a", "i-0000000b"])
+    assert failed == ["i-0000000b"]
+    assert terminate == {"i-0000000a": "shutting-down", "i-0000000b": "failed"}
+
+
+@pytest.mark.parametrize("code", ["UnauthorizedOperation", "AuthFailure", "OperationNotPermitted", "SomethingNew"])
+def test_cleanup_instance_batch_fails_the_chunk_on_other_errors(monkeypatch, code):
+    ids = [f"i-{n:08x}" for n in range(8)]
+    client = BatchClient([_client_error(code, "You are not authorized to perform this operation.")])
+    failed, terminate = _run_batch(monkeypatch, client, ids)
+    assert client.calls == [ids]
+    assert failed == ids
+    assert terminate == dict.fromkeys(ids, "failed")
+
+
+def test_cleanup_instance_batch_dry_run(monkeypatch):
+    client = BatchClient([_client_error("DryRunOperation")])
+    failed, terminate = _run_batch(monkeypatch, client, ["i-0000000a", "i-0000000b"], dry_run=True)
+    assert client.calls == [["i-0000000a", "i-0000000b"]]
+    assert failed == []
+    assert terminate == {}
+
+
+class ConfirmClient:
+    """describe_instances fake: each poll, the listed ids are still not terminated."""
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.filters = []
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class _Paginator:
+            def paginate(self, Filters, PaginationConfig):  # noqa: N803
+                client.filters.append(Filters)
+                alive = [i for i in client.polls.pop(0) if i in Filters[0]["Values"]]
+                yield {"Reservations": [{"Instances": [{"InstanceId": i} for i in alive]}]}
+
+        return _Paginator()
+
+
+def test_confirm_terminations_polls_pending_set(monkeypatch):
+    reporter = Reporter()
+    client = ConfirmClient([["i-0000000b"], []])
+    monkeypatch.setattr(instances, "get_reporter", lambda: reporter)
+    monkeypatch.setattr(instances, "_get_account_id", lambda session: "123456789012")
+    monkeypatch.setattr(instances, "get_client", lambda session, service, region: client)
+    sleeps = []
+    monkeypatch.setattr(instances.time, "sleep", sleeps.append)
+    tail = instances.confirm_terminations(
+        BatchSession(client), "us-east-1", {"i-0000000a": 0.0, "i-0000000b": 0.0}, Scheduler(max_workers=1)
+    )
+    assert tail >= 0
+    # Second poll only asks about the straggler; the delay backs off between polls
+    assert [f[0]["Values"] for f in client.filters] == [["i-0000000a", "i-0000000b"], ["i-0000000b"]]
+    assert sleeps == [instances.CONFIRM_INITIAL_DELAY, instances.CONFIRM_INITIAL_DELAY * 2]
+    confirms = [e for e in reporter.snapshot() if e.action == "confirm"]
+    assert [e.meta["status"] for e in confirms] == ["terminated", "terminated", "complete"]
+    assert confirms[-1].meta["confirmed"] == 2
+
+
+def test_confirm_terminations_times_out(monkeypatch):
+    reporter = Reporter()
+    client = ConfirmClient([["i-0000000a"]] * 10)
+    monkeypatch.setattr(instances, "get_reporter", lambda: reporter)
+    monkeypatch.setattr(instances, "_get_account_id", lambda session: "123456789012")
+    monkeypatch.setattr(instances, "get_client", lambda session, service, region: client)
+    monkeypatch.setattr(instances.time, "sleep", lambda s: None)
+    instances.confirm_terminations(BatchSession(client), "us-east-1", {"i-0000000a": 0.0}, timeout=0)
+    statuses = [e.meta["status"] for e in reporter.snapshot()]
+    assert statuses == ["timeout", "incomplete"]
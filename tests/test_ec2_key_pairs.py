@@ -1,8 +1,11 @@
+import json
+
+from costcutter.core.journal import Journal, set_journal
 from costcutter.services.ec2 import key_pairs
 
 
 class DummySession:
-    def client(self, service_name=None, region_name=None):
+    def client(self, service_name=None, region_name=None, **kwargs):
         class Client:
             def get_caller_identity(self):
                 return {"Account": "123456789012"}
@@ -24,7 +27,7 @@ def test_get_account_id():
 def test_catalog_key_pairs():
     session = DummySession()
     arns = key_pairs.catalog_key_pairs(session, "us-east-1")
-    assert "kp-123" in arns
+    assert list(arns) == ["kp-123"]
 
 
 def test_cleanup_key_pair(monkeypatch):
@@ -37,6 +40,24 @@ def test_cleanup_key_pair(monkeypatch):
 
 def test_cleanup_key_pairs(monkeypatch):
     session = DummySession()
-    monkeypatch.setattr("costcutter.services.ec2.key_pairs.catalog_key_pairs", lambda *args, **kwargs: ["kp-123"])
+    monkeypatch.setattr("costcutter.services.ec2.key_pairs.catalog_key_pairs", lambda *args, **kwargs: iter(["kp-123"]))
     monkeypatch.setattr("costcutter.services.ec2.key_pairs.cleanup_key_pair", lambda *args, **kwargs: None)
-    key_pairs.cleanup_key_pairs(session, "us-east-1", dry_run=True, max_workers=1)
+    key_pairs.cleanup_key_pairs(session, "us-east-1", dry_run=True)
+
+
+def test_cleanup_key_pair_is_journaled(monkeypatch, tmp_path):
+    session = DummySession()
+    monkeypatch.setattr(
+        "costcutter.services.ec2.key_pairs.get_reporter", lambda: type("R", (), {"record": lambda *a, **k: None})()
+    )
+    monkeypatch.setattr("costcutter.services.ec2.key_pairs._get_account_id", lambda session: "123456789012")
+    journal = Journal(tmp_path / "journal.jsonl")
+    set_journal(journal)
+    try:
+        key_pairs.cleanup_key_pair(session, "us-east-1", "kp-123", dry_run=False)
+    finally:
+        journal.close()
+        set_journal(None)
+    entries = [json.loads(line) for line in journal.path.read_text().splitlines()]
+    assert [e["state"] for e in entries] == ["run", "inflight", "done"]
+    assert entries[-1]["arn"] == "arn:aws:ec2:us-east-1:123456789012:key-pair/kp-123"
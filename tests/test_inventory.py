@@ -0,0 +1,163 @@
+import sqlite3
+
+import pytest
+
+from costcutter.core.inventory import Inventory
+
+ACCOUNT = "123456789012"
+
+
+def _observe(path, records, dry_run=True, incremental=True, region="us-east-1"):
+    inventory = Inventory(path, dry_run=dry_run, incremental=incremental)
+    try:
+        ids = list(inventory.observe(region, ACCOUNT, "ec2:instance", records))
+    finally:
+        inventory.close()
+    return ids, inventory.unchanged
+
+
+def test_first_run_yields_everything_and_stores_arns(tmp_path):
+    db = tmp_path / "inv.db"
+    ids, unchanged = _observe(db, [("i-1", "running"), ("i-2", "stopped")])
+    assert ids == ["i-1", "i-2"]
+    assert unchanged == 0
+    rows = sqlite3.connect(db).execute("SELECT arn, resource_type, fingerprint FROM resources ORDER BY arn").fetchall()
+    assert rows == [
+        (f"arn:aws:ec2:us-east-1:{ACCOUNT}:instance/i-1", "instance", "running"),
+        (f"arn:aws:ec2:us-east-1:{ACCOUNT}:instance/i-2", "instance", "stopped"),
+    ]
+
+
+def test_incremental_yields_only_new_or_changed(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [("i-1", "running"), ("i-2", "running")])
+    ids, unchanged = _observe(db, [("i-1", "running"), ("i-2", "stopped"), ("i-3", "running")])
+    assert ids == ["i-2", "i-3"]
+    assert unchanged == 1
+
+
+def test_non_incremental_yields_everything_but_updates_snapshot(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [("i-1", "running")])
+    ids, _ = _observe(db, [("i-1", "running")], incremental=False)
+    assert ids == ["i-1"]
+
+
+def test_dry_run_snapshot_does_not_hide_resources_from_real_run(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [("i-1", "running")], dry_run=True)
+    assert _observe(db, [("i-1", "running")], dry_run=False)[0] == ["i-1"]
+    # Processed for real: a later dry run has nothing new to report
+    assert _observe(db, [("i-1", "running")], dry_run=True)[0] == []
+
+
+def test_vanished_resources_are_pruned_per_region_and_type(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [("i-1", "running"), ("i-2", "running")])
+    _observe(db, [("i-9", "running")], region="eu-west-1")
+    _observe(db, [("i-1", "running")])
+    regions = sqlite3.connect(db).execute("SELECT resource_id, region FROM resources ORDER BY resource_id").fetchall()
+    assert regions == [("i-1", "us-east-1"), ("i-9", "eu-west-1")]
+    # i-2 came back: it is new again
+    assert _observe(db, [("i-1", "running"), ("i-2", "running")])[0] == ["i-2"]
+
+
+def test_runs_are_recorded(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [])
+    _observe(db, [], dry_run=False, incremental=False)
+    runs = sqlite3.connect(db).execute("SELECT dry_run, incremental, finished_at IS NOT NULL FROM runs").fetchall()
+    assert runs == [(1, 1, 1), (0, 0, 1)]
+
+
+def test_large_batches(tmp_path):
+    db = tmp_path / "inv.db"
+    records = [(f"i-{n}", "running") for n in range(1234)]
+    assert len(_observe(db, records)[0]) == 1234
+    ids, unchanged = _observe(db, [*records, ("i-new", "running")])
+    assert ids == ["i-new"]
+    assert unchanged == 1234
+
+
+def test_real_run_counts_only_successful_deletes_as_processed(tmp_path):
+    db = tmp_path / "inv.db"
+    inventory = Inventory(db, dry_run=False, incremental=True)
+    assert list(inventory.observe("us-east-1", ACCOUNT, "ec2:instance", [("i-1", "running"), ("i-2", "running")]))
+    inventory.mark([f"arn:aws:ec2:us-east-1:{ACCOUNT}:instance/i-1"], "done")
+    inventory.mark([f"arn:aws:ec2:us-east-1:{ACCOUNT}:instance/i-2"], "failed")
+    inventory.close()
+    # i-1 still shows up (e.g. shutting down); the failed i-2 is retried
+    ids, unchanged = _observe(db, [("i-1", "running"), ("i-2", "running")], dry_run=False)
+    assert ids == ["i-2"]
+    assert unchanged == 1
+
+
+def test_incremental_real_run_retries_failed_deletes(monkeypatch, tmp_path):
+    from fake_aws import FakeAWS, FakeClient, _error
+    from test_orchestrator import _fake_config
+
+    from costcutter.conf.config import Config
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(key_pairs=3)
+    config = Config({
+        **_fake_config(fake.regions).to_dict(),
+        "inventory": {"enabled": True, "path": str(tmp_path / "inv.db")},
+    })
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    delete_key_pair = FakeClient.delete_key_pair
+
+    def failing_delete(self, **kwargs):
+        if kwargs["KeyPairId"].endswith("1"):
+            raise _error("UnauthorizedOperation", "DeleteKeyPair")
+        return delete_key_pair(self, **kwargs)
+
+    monkeypatch.setattr(FakeClient, "delete_key_pair", failing_delete)
+    orchestrate_services(dry_run=False, incremental=True)
+    assert fake.remaining()["key_pairs"] == 1
+    monkeypatch.setattr(FakeClient, "delete_key_pair", delete_key_pair)
+    summary = orchestrate_services(dry_run=False, incremental=True)
+    assert fake.remaining()["key_pairs"] == 0
+    assert summary["unchanged"] == 0
+
+
+def test_partial_or_failed_listings_do_not_prune(tmp_path):
+    db = tmp_path / "inv.db"
+    _observe(db, [("i-1", "running"), ("i-2", "running")])
+    inventory = Inventory(db, dry_run=True, incremental=True)
+    # A selection-narrowed listing
+    assert list(inventory.observe("us-east-1", ACCOUNT, "ec2:instance", [("i-1", "running")], prune=False)) == []
+
+    def failing():
+        yield "i-1", "running"
+        raise RuntimeError("throttled")
+
+    with pytest.raises(RuntimeError):
+        list(inventory.observe("us-east-1", ACCOUNT, "ec2:instance", failing()))
+    inventory.close()
+    assert _observe(db, [("i-1", "running"), ("i-2", "running")]) == ([], 2)
+
+
+def test_selected_run_keeps_the_rest_of_the_inventory(monkeypatch, tmp_path):
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.conf.config import Config
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=4, key_pairs=0)
+    fake.tag("us-east-1", "i-00000000000000000", team="ci")
+    base = {**_fake_config(fake.regions).to_dict(), "inventory": {"enabled": True, "path": str(tmp_path / "inv.db")}}
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    for config in (Config(base), Config({**base, "selection": {"tags": {"team": "ci"}}})):
+        monkeypatch.setattr("costcutter.orchestrator.get_config", lambda config=config: config)
+        monkeypatch.setattr("costcutter.core.selection.get_config", lambda config=config: config)
+        orchestrate_services(dry_run=True, incremental=True)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: Config(base))
+    monkeypatch.setattr("costcutter.core.selection.get_config", lambda: Config(base))
+    assert orchestrate_services(dry_run=True, incremental=True)["unchanged"] == 4
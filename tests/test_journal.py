@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from costcutter.core.journal import InterruptedRunError, Journal, get_journal, set_journal
+
+PREFIX = "arn:aws:ec2:us-east-1:123456789012:instance/"
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_journal_passes_ids_through(tmp_path):
+    journal = Journal()
+    assert not journal.enabled
+    assert list(journal.plan("us-east-1", "ec2.instances", PREFIX, ["i-1"])) == ["i-1"]
+    journal.mark(PREFIX + "i-1", "done")
+    journal.close()
+
+
+def test_listeners_see_marks_of_disabled_journals_too():
+    journal = Journal()
+    seen = []
+    journal.subscribe(lambda arns, state: seen.append((arns, state)))
+    journal.mark(PREFIX + "i-1", "done")
+    journal.mark((PREFIX + i for i in ("i-2", "i-3")), "failed")
+    assert seen == [([PREFIX + "i-1"], "done"), ([PREFIX + "i-2", PREFIX + "i-3"], "failed")]
+
+
+def test_records_states_and_node_done(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path, batch_size=1000, flush_interval=3600)
+    ids = list(journal.plan("us-east-1", "ec2.instances", PREFIX, ["i-1", "i-2"]))
+    journal.mark([PREFIX + "i-1", PREFIX + "i-2"], "inflight")
+    journal.mark(PREFIX + "i-1", "done")
+    journal.mark(PREFIX + "i-2", "done")
+    journal.finish_node("us-east-1", "ec2.instances")
+    # Nothing is written until a batch is full or the journal is flushed
+    assert path.read_text() == ""
+    journal.close()
+    assert ids == ["i-1", "i-2"]
+    states = [(e["state"], e.get("arn") or e.get("node")) for e in _lines(path)[1:]]
+    assert states == [
+        ("planned", PREFIX + "i-1"),
+        ("planned", PREFIX + "i-2"),
+        ("inflight", PREFIX + "i-1"),
+        ("inflight", PREFIX + "i-2"),
+        ("done", PREFIX + "i-1"),
+        ("done", PREFIX + "i-2"),
+        ("node_done", "us-east-1/ec2.instances"),
+    ]
+
+
+def test_node_with_failed_arn_is_not_done(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    list(journal.plan("us-east-1", "ec2.instances", PREFIX, ["i-1", "i-2"]))
+    journal.mark(PREFIX + "i-1", "done")
+    journal.mark(PREFIX + "i-2", "failed")
+    journal.finish_node("us-east-1", "ec2.instances")
+    journal.close()
+    assert all(e["state"] != "node_done" for e in _lines(path))
+
+
+def test_resume_skips_completed_arns_and_nodes(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    first = Journal(path)
+    list(first.plan("us-east-1", "ec2.instances", PREFIX, ["i-1", "i-2", "i-3"]))
+    first.mark(PREFIX + "i-1", "done")
+    first.mark(PREFIX + "i-2", "inflight")
+    list(first.plan("us-east-1", "ec2.key_pairs", PREFIX, []))
+    first.finish_node("us-east-1", "ec2.key_pairs")
+    first.flush()
+    # Crash: the file ends with a torn line and the journal is never closed
+    with path.open("a") as fh:
+        fh.write('{"state":"do')
+
+    resumed = Journal(path, resume=True)
+    assert resumed.node_done("us-east-1", "ec2.key_pairs")
+    assert not resumed.node_done("us-east-1", "ec2.instances")
+    assert list(resumed.plan("us-east-1", "ec2.instances", PREFIX, ["i-1", "i-2", "i-3"])) == ["i-2", "i-3"]
+    assert resumed.skipped == 1
+    resumed.close()
+    first.close()
+
+
+def test_new_run_starts_a_fresh_journal(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    first = Journal(path)
+    list(first.plan("us-east-1", "ec2.instances", PREFIX, ["i-1"]))
+    first.mark(PREFIX + "i-1", "done")
+    first.finish()
+    first.close()
+    second = Journal(path)
+    assert list(second.plan("us-east-1", "ec2.instances", PREFIX, ["i-1"])) == ["i-1"]
+    second.close()
+    assert [line["state"] for line in _lines(path)] == ["run", "planned"]
+
+
+def test_new_run_keeps_the_journal_of_an_unfinished_run(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    first = Journal(path)
+    list(first.plan("us-east-1", "ec2.instances", PREFIX, ["i-1", "i-2"]))
+    first.mark(PREFIX + "i-1", "done")
+    first.close()
+    with pytest.raises(InterruptedRunError, match="--resume"):
+        Journal(path)
+    assert len(_lines(path)) == 4
+    # Workers of the same run append to it; an explicit discard starts over
+    Journal(path, attach=True).close()
+    Journal(path, discard=True).close()
+    assert [line["state"] for line in _lines(path)] == ["run"]
+
+
+def test_unknown_state_is_rejected(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    with pytest.raises(ValueError):
+        journal.mark(PREFIX + "i-1", "deleted")
+    journal.close()
+
+
+def test_set_journal_restores_disabled_journal(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    set_journal(journal)
+    assert get_journal() is journal
+    set_journal(None)
+    assert not get_journal().enabled
+    journal.close()
@@ -0,0 +1,114 @@
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from costcutter.core.clients import ClientRegistry
+from costcutter.core.metrics import LATENCY_BUCKETS, ApiMetrics, CallStats
+
+REGIONS_XML = (
+    b'<DescribeRegionsResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/"><requestId>r</requestId>'
+    b"<regionInfo><item><regionName>us-east-1</regionName></item></regionInfo></DescribeRegionsResponse>"
+)
+THROTTLE_XML = (
+    b"<Response><Errors><Error><Code>RequestLimitExceeded</Code><Message>Request limit exceeded.</Message>"
+    b"</Error></Errors><RequestID>r</RequestID></Response>"
+)
+
+
+class Raw:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class StubSession:
+    def __init__(self, client):
+        self._client = client
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return self._client
+
+
+def _client():
+    return boto3.client("ec2", region_name="us-east-1", aws_access_key_id="testing", aws_secret_access_key="testing")
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = ApiMetrics()
+    monkeypatch.setattr("costcutter.core.metrics._metrics", metrics)
+    # No real backoff between the SDK's own retries
+    monkeypatch.setattr("botocore.retries.standard.ExponentialBackoff.delay_amount", lambda self, context: 0)
+    return metrics
+
+
+def test_registry_clients_record_sdk_retries_throttles_and_bytes(metrics):
+    client = _client()
+    responses = [(503, THROTTLE_XML), (200, REGIONS_XML)]
+
+    def send(request, **kwargs):
+        status, body = responses.pop(0)
+        return AWSResponse(request.url, status, {}, Raw(body))
+
+    client.meta.events.register("before-send", send)
+    registered = ClientRegistry().get(StubSession(client), "ec2", "us-east-1")
+    assert registered.describe_regions()["Regions"][0]["RegionName"] == "us-east-1"
+    ((key, stats),) = metrics.rows()
+    assert key == ("us-east-1", "ec2", "DescribeRegions")
+    assert (stats.calls, stats.retries, stats.throttles, stats.errors) == (1, 1, 1, 0)
+    assert stats.response_bytes == len(THROTTLE_XML) + len(REGIONS_XML)
+
+
+def test_stubbed_errors_count_as_errors_and_throttles(metrics):
+    client = _client()
+    metrics.instrument(client, "ec2", None)
+    with Stubber(client) as stub:
+        stub.add_client_error("delete_key_pair", service_error_code="Throttling", http_status_code=400)
+        stub.add_response("delete_key_pair", {"Return": True})
+        with pytest.raises(ClientError):
+            client.delete_key_pair(KeyPairId="key-1")
+        client.delete_key_pair(KeyPairId="key-2")
+    stats = metrics.snapshot()[("us-east-1", "ec2", "DeleteKeyPair")]
+    assert (stats.calls, stats.errors, stats.throttles) == (2, 1, 1)
+
+
+def test_call_stats_quantiles_and_merge():
+    stats = CallStats()
+    for seconds in (0.001, 0.002, 0.2, 30.0):
+        stats.observe(seconds)
+    assert stats.quantile(0.5) == LATENCY_BUCKETS[0]
+    assert stats.quantile(0.75) == 0.25
+    assert stats.quantile(1.0) == 30.0
+    other = CallStats()
+    other.observe(0.004)
+    stats.merge(other)
+    assert (stats.calls, stats.buckets[0], stats.buckets[-1]) == (5, 3, 1)
+
+
+def test_drain_and_merge_combine_worker_metrics():
+    worker, parent = ApiMetrics(), ApiMetrics()
+    for metrics in (worker, parent):
+        metrics.merge({("us-east-1", "ec2", "TerminateInstances"): CallStats(calls=1, seconds=0.5)})
+    parent.merge(worker.drain())
+    assert worker.snapshot() == {}
+    assert parent.snapshot()[("us-east-1", "ec2", "TerminateInstances")].calls == 2
+
+
+def test_openmetrics_exposition(tmp_path):
+    metrics = ApiMetrics()
+    stats = CallStats(throttles=2, response_bytes=512)
+    stats.observe(0.03)
+    metrics.merge({("eu-west-1", "ec2", "DescribeInstances"): stats})
+    path = metrics.write_openmetrics(tmp_path / "out" / "metrics.txt")
+    text = path.read_text()
+    labels = 'region="eu-west-1",service="ec2",operation="DescribeInstances"'
+    assert f'costcutter_api_call_duration_seconds_bucket{{{labels},le="0.025"}} 0' in text
+    assert f'costcutter_api_call_duration_seconds_bucket{{{labels},le="0.05"}} 1' in text
+    assert f'costcutter_api_call_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"costcutter_api_throttles_total{{{labels}}} 2" in text
+    assert "# UNIT costcutter_api_response_bytes bytes" in text
+    assert text.endswith("# EOF\n")
@@ -1,11 +1,13 @@
 import pytest
 
-from costcutter.orchestrator import _service_supported_in_region, orchestrate_services, process_region_service
-
-
-def test_service_supported_in_region():
-    assert _service_supported_in_region({"svc": {"us-east-1"}}, "svc", "us-east-1")
-    assert _service_supported_in_region({}, "svc", "us-east-1")
+from costcutter.core.dag import ResourceHandler
+from costcutter.orchestrator import (
+    RESOURCE_HANDLERS,
+    SERVICE_HANDLERS,
+    _build_graph,
+    orchestrate_services,
+    process_region_service,
+)
 
 
 def test_process_region_service(monkeypatch):
@@ -31,5 +33,384 @@ def test_orchestrate_services(monkeypatch):
         "costcutter.orchestrator.create_aws_session",
         lambda cfg: type("Session", (), {"get_available_regions": lambda self, svc: ["us-east-1"]})(),
     )
-    monkeypatch.setattr("costcutter.orchestrator.cleanup_ec2", lambda session, region, dry_run: None)
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "123456789012")
+    calls = []
+
+    def instances(session, region, dry_run, scheduler):
+        calls.append((region, "instances"))
+
+    def volumes(session, region, dry_run, scheduler):
+        assert (region, "instances") in calls
+        calls.append((region, "volumes"))
+
+    monkeypatch.setitem(
+        RESOURCE_HANDLERS,
+        "ec2",
+        {"instances": ResourceHandler(instances), "volumes": ResourceHandler(volumes, ("instances",))},
+    )
+    summary = orchestrate_services(dry_run=True)
+    assert calls == [("us-east-1", "instances"), ("us-east-1", "volumes")]
+    assert summary["tasks"] == 2
+    assert summary["failed"] == 0
+    assert {"clients_created", "client_cache_hits", "client_create_ms"} <= summary.keys()
+
+
+def test_build_graph_qualifies_and_drops_unselected_dependencies(monkeypatch):
+    def handler(session, region, dry_run, scheduler):
+        return None
+
+    monkeypatch.setitem(
+        RESOURCE_HANDLERS,
+        "ec2",
+        {"instances": ResourceHandler(handler), "volumes": ResourceHandler(handler, ("instances", "s3.buckets"))},
+    )
+    monkeypatch.setitem(SERVICE_HANDLERS, "lambda", handler)
+    graph, handlers = _build_graph(["ec2", "lambda"])
+    assert graph == {"ec2.instances": (), "ec2.volumes": ("ec2.instances",), "lambda": ()}
+    assert handlers["lambda"] == ("lambda", handler)
+
+
+def test_orchestrate_services_incremental_passes_only_deltas(monkeypatch, tmp_path):
+    inventory_cfg = type("Inv", (), {"enabled": True, "path": str(tmp_path / "inv.db")})()
+    monkeypatch.setattr(
+        "costcutter.orchestrator.get_config",
+        lambda: type(
+            "Cfg",
+            (),
+            {
+                "aws": type("AWS", (), {"services": ["ec2"], "region": ["us-east-1"], "max_workers": 1})(),
+                "inventory": inventory_cfg,
+            },
+        )(),
+    )
+    monkeypatch.setattr(
+        "costcutter.orchestrator.create_aws_session",
+        lambda cfg: type("Session", (), {"get_available_regions": lambda self, svc: ["us-east-1"]})(),
+    )
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "123456789012")
+    inventory = [("i-1", "running"), ("i-2", "running")]
+    processed = []
+
+    def instances(session, region, dry_run, scheduler, discovered):
+        processed.append(list(discovered))
+
+    monkeypatch.setitem(
+        RESOURCE_HANDLERS,
+        "ec2",
+        {"instances": ResourceHandler(instances, (), "ec2:instance", lambda session, region: iter(inventory))},
+    )
+    assert orchestrate_services(dry_run=True)["unchanged"] == 0
+    inventory[1] = ("i-2", "stopped")
+    summary = orchestrate_services(dry_run=True, incremental=True)
+    assert processed == [["i-1", "i-2"], ["i-2"]]
+    assert summary["unchanged"] == 1
+
+
+def test_orchestrate_services_resume_skips_journaled_work(monkeypatch, tmp_path):
+    journal_cfg = type("Journal", (), {"enabled": True, "path": str(tmp_path / "journal.jsonl")})()
+    monkeypatch.setattr(
+        "costcutter.orchestrator.get_config",
+        lambda: type(
+            "Cfg",
+            (),
+            {
+                "aws": type("AWS", (), {"services": ["ec2"], "region": ["us-east-1"], "max_workers": 1})(),
+                "journal": journal_cfg,
+            },
+        )(),
+    )
+    monkeypatch.setattr(
+        "costcutter.orchestrator.create_aws_session",
+        lambda cfg: type("Session", (), {"get_available_regions": lambda self, svc: ["us-east-1"]})(),
+    )
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "123456789012")
+    prefix = "arn:aws:ec2:us-east-1:123456789012:instance/"
+    processed = []
+
+    def instances(session, region, dry_run, scheduler, discovered):
+        from costcutter.core.journal import get_journal
+
+        for instance_id in discovered:
+            processed.append(instance_id)
+            # Interrupted run: i-2 never completes
+            if instance_id != "i-2":
+                get_journal().mark(prefix + instance_id, "done")
+
+    def key_pairs(session, region, dry_run, scheduler, discovered):
+        processed.extend(discovered)
+
+    monkeypatch.setitem(
+        RESOURCE_HANDLERS,
+        "ec2",
+        {
+            "instances": ResourceHandler(
+                instances, (), "ec2:instance", lambda session, region: iter([("i-1", ""), ("i-2", "")])
+            ),
+            "key_pairs": ResourceHandler(key_pairs, (), "ec2:key-pair", lambda session, region: iter([])),
+        },
+    )
+    orchestrate_services(dry_run=False)
+    assert sorted(processed) == ["i-1", "i-2"]
+    processed.clear()
+    summary = orchestrate_services(dry_run=False, resume=True)
+    # key_pairs finished and is skipped; only the unfinished instance is retried
+    assert processed == ["i-2"]
+    assert summary["resumed_skipped"] == 1
+
+
+def test_orchestrate_services_keeps_the_journal_of_an_interrupted_run(monkeypatch, tmp_path):
+    from costcutter.core.journal import InterruptedRunError
+
+    journal_cfg = type("Journal", (), {"enabled": True, "path": str(tmp_path / "journal.jsonl")})()
+    monkeypatch.setattr(
+        "costcutter.orchestrator.get_config",
+        lambda: type(
+            "Cfg",
+            (),
+            {
+                "aws": type("AWS", (), {"services": ["ec2"], "region": ["us-east-1"], "max_workers": 1})(),
+                "journal": journal_cfg,
+            },
+        )(),
+    )
+    monkeypatch.setattr(
+        "costcutter.orchestrator.create_aws_session",
+        lambda cfg: type("Session", (), {"get_available_regions": lambda self, svc: ["us-east-1"]})(),
+    )
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "123456789012")
+    runs = []
+
+    def instances(session, region, dry_run, scheduler):
+        runs.append(dry_run)
+
+    monkeypatch.setitem(RESOURCE_HANDLERS, "ec2", {"instances": ResourceHandler(instances)})
+    orchestrate_services(dry_run=False)
+    # The first run finished, so the next one may start a new journal
+    orchestrate_services(dry_run=False)
+
+    def interrupted(*args, **kwargs):
+        raise RuntimeError("connection dropped")
+
+    with monkeypatch.context() as m:
+        m.setattr("costcutter.orchestrator._run_threaded", interrupted)
+        with pytest.raises(RuntimeError, match="connection dropped"):
+            orchestrate_services(dry_run=False)
+    with pytest.raises(InterruptedRunError):
+        orchestrate_services(dry_run=False)
+    # Dry runs are not journaled, and an explicit discard starts over
+    orchestrate_services(dry_run=True)
+    orchestrate_services(dry_run=False, discard_journal=True)
+    assert runs == [False, False, True, False]
+
+
+def test_orchestrate_services_organization_mode(monkeypatch):
+    from costcutter.core.organizations import Account
+    from costcutter.progress import RunProgress
+
+    org_cfg = type("Org", (), {"enabled": True, "max_accounts_parallel": 2, "max_workers_per_account": 1})()
+    monkeypatch.setattr(
+        "costcutter.orchestrator.get_config",
+        lambda: type(
+            "Cfg",
+            (),
+            {
+                "aws": type(
+                    "AWS",
+                    (),
+                    {"services": ["ec2"], "region": ["us-east-1"], "max_workers": 4, "organization": org_cfg},
+                )()
+            },
+        )(),
+    )
+    monkeypatch.setattr(
+        "costcutter.orchestrator.create_aws_session",
+        lambda cfg: type("Session", (), {"get_available_regions": lambda self, svc: ["us-east-1"]})(),
+    )
+    monkeypatch.setattr(
+        "costcutter.orchestrator.list_member_accounts",
+        lambda session, include, exclude: [Account("111111111111"), Account("222222222222")],
+    )
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "000000000000")
+
+    class FakeRoleSessions:
+        assumed = 1
+
+        def __init__(self, base, **kwargs):
+            pass
+
+        def get(self, account_id):
+            return f"session-{account_id}"
+
+    monkeypatch.setattr("costcutter.orchestrator.RoleSessions", FakeRoleSessions)
+    calls = []
+
+    def instances(session, region, dry_run, scheduler):
+        calls.append((session, scheduler.max_workers))
+
+    monkeypatch.setitem(RESOURCE_HANDLERS, "ec2", {"instances": ResourceHandler(instances)})
+    progress = RunProgress()
+    summary = orchestrate_services(dry_run=True, progress=progress)
+    assert sorted(calls) == [("session-111111111111", 1), ("session-222222222222", 1)]
+    assert progress.snapshot() == {"111111111111/us-east-1": (1, 0, 1), "222222222222/us-east-1": (1, 0, 1)}
+    assert (summary["accounts"], summary["tasks"], summary["roles_assumed"]) == (2, 2, 1)
+
+
+def test_organization_mode_checks_enabled_regions_per_account(monkeypatch):
+    from costcutter.core.organizations import Account
+    from costcutter.core.regions import RegionInfo
+    from costcutter.progress import RunProgress
+
+    org_cfg = type("Org", (), {"enabled": True, "max_accounts_parallel": 2})()
+    monkeypatch.setattr(
+        "costcutter.orchestrator.get_config",
+        lambda: type(
+            "Cfg",
+            (),
+            {
+                "aws": type(
+                    "AWS",
+                    (),
+                    {"services": ["ec2"], "region": ["us-east-1", "ap-east-1"], "organization": org_cfg},
+                )()
+            },
+        )(),
+    )
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: "management")
+    monkeypatch.setattr("costcutter.orchestrator._get_account_id", lambda session: "000000000000")
+    monkeypatch.setattr(
+        "costcutter.orchestrator.list_member_accounts",
+        lambda session, include, exclude: [Account("111111111111"), Account("222222222222")],
+    )
+    # The opt-in ap-east-1 is enabled in one member account only, not in the management account
+    enabled = {"000000000000": {"us-east-1"}, "111111111111": {"us-east-1", "ap-east-1"}, "222222222222": {"us-east-1"}}
+    resolved = []
+
+    def resolve(session, account_id, service_keys, cache_path=None, ttl_seconds=None):
+        resolved.append((session, account_id))
+        return RegionInfo(enabled=set(enabled[account_id]), available={"ec2": {"us-east-1", "ap-east-1"}})
+
+    monkeypatch.setattr("costcutter.orchestrator.resolve_regions", resolve)
+
+    class FakeRoleSessions:
+        assumed = 2
+
+        def __init__(self, base, **kwargs):
+            pass
+
+        def get(self, account_id):
+            return f"session-{account_id}"
+
+    monkeypatch.setattr("costcutter.orchestrator.RoleSessions", FakeRoleSessions)
+    calls = []
+
+    def instances(session, region, dry_run, scheduler):
+        calls.append((session, region))
+
+    monkeypatch.setitem(RESOURCE_HANDLERS, "ec2", {"instances": ResourceHandler(instances)})
+    progress = RunProgress()
+    summary = orchestrate_services(dry_run=True, progress=progress)
+    assert sorted(calls) == [
+        ("session-111111111111", "ap-east-1"),
+        ("session-111111111111", "us-east-1"),
+        ("session-222222222222", "us-east-1"),
+    ]
+    assert sorted(resolved) == [
+        ("management", "000000000000"),
+        ("session-111111111111", "111111111111"),
+        ("session-222222222222", "222222222222"),
+    ]
+    # The skipped region still completes its progress bar, without counting as failed
+    assert progress.snapshot()["222222222222/ap-east-1"] == (1, 0, 1)
+    assert (summary["tasks"], summary["skipped"], summary["failed"]) == (3, 1, 0)
+
+
+def _fake_config(regions, **aws):
+    from costcutter.conf.config import Config
+
+    return Config({
+        "aws": {
+            "services": ["ec2"],
+            "region": list(regions),
+            "max_workers": 4,
+            "rate_limit": {"requests_per_second": 1000, "burst": 1000},
+            **aws,
+        },
+        "journal": {"enabled": False},
+    })
+
+
+@pytest.mark.parametrize("discovery", ["describe", "tagging"])
+def test_orchestrate_services_against_fake_aws_deletes_everything(monkeypatch, discovery):
+    from fake_aws import FakeAWS
+
+    from costcutter.reporter import Reporter
+
+    regions = ("us-east-1", "eu-west-1")
+    fake = FakeAWS(regions, instances=250, key_pairs=5, throttle_rate=0.3, page_size=100)
+    if discovery == "tagging":
+        # The tagging API only lists tagged resources; instances carry a Name tag already
+        for region in regions:
+            for n in range(5):
+                fake.tag(region, f"key-{n:017x}", team="ci")
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: _fake_config(regions, discovery=discovery))
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    summary = orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 0, "key_pairs": 0}
+    assert summary["failed"] == 0
+    assert summary["throttled"] == fake.throttled > 0
+    assert reporter.counts()[("ec2", "instance", "terminate")] == 2 * 250
+
+
+def test_tagging_discovery_warns_that_untagged_resources_are_kept(monkeypatch, caplog):
+    from fake_aws import FakeAWS
+
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=4, key_pairs=2)
+    fake.tag("us-east-1", "key-00000000000000000", team="ci")
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: _fake_config(fake.regions, discovery="tagging"))
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 0, "key_pairs": 1}
+    assert "untagged resources of types ['ec2:instance', 'ec2:key-pair'] are NOT cleaned up" in caplog.text
+
+
+def test_orchestrate_services_aborts_before_deleting_without_an_account_id(monkeypatch):
+    from fake_aws import FakeAWS, FakeClient, _error
+
+    from costcutter.reporter import Reporter
+    from costcutter.services.common import AccountIdError
+
+    def denied(self):
+        raise _error("AccessDenied", "GetCallerIdentity")
+
+    fake = FakeAWS(instances=5, key_pairs=2)
+    monkeypatch.setattr(FakeClient, "get_caller_identity", denied)
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: _fake_config(fake.regions))
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    with pytest.raises(AccountIdError):
+        orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 5, "key_pairs": 2}
+    assert fake.calls["TerminateInstances"] == fake.calls["DeleteKeyPair"] == 0
+
+
+def test_orchestrate_services_dry_run_against_fake_aws_keeps_everything(monkeypatch):
+    from fake_aws import FakeAWS
+
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=30, key_pairs=3, page_size=7)
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: _fake_config(fake.regions))
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
     orchestrate_services(dry_run=True)
+    assert fake.remaining() == {"instances": 30, "key_pairs": 3}
+    assert fake.calls["DescribeInstances"] == 5
+    assert {e.arn for e in reporter.snapshot() if e.resource == "key_pair"} == {
+        f"arn:aws:ec2:us-east-1:123456789012:key-pair/key-{n:017x}" for n in range(3)
+    }
@@ -0,0 +1,113 @@
+from datetime import UTC, datetime, timedelta
+
+import boto3
+from botocore.stub import Stubber
+
+from costcutter.core.clients import get_client_registry
+from costcutter.core.organizations import Account, RoleSessions, list_member_accounts
+from costcutter.services.common import _get_account_id, _set_account_id
+
+
+class StubSession:
+    region_name = "us-east-1"
+
+    def __init__(self, clients):
+        self._clients = clients
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return self._clients[service_name]
+
+
+def _client(service):
+    return boto3.client(service, region_name="us-east-1", aws_access_key_id="testing", aws_secret_access_key="testing")
+
+
+def _credentials(expiration):
+    return {
+        "Credentials": {
+            "AccessKeyId": "AKIDASSUMED00000000",
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": expiration,
+        }
+    }
+
+
+def setup_function(_):
+    get_client_registry().clear()
+
+
+def test_list_member_accounts_filters_inactive_and_excluded():
+    client = _client("organizations")
+    with Stubber(client) as stub:
+        stub.add_response(
+            "list_accounts",
+            {
+                "Accounts": [
+                    {"Id": "222222222222", "Name": "dev", "Status": "ACTIVE"},
+                    {"Id": "333333333333", "Name": "old", "Status": "SUSPENDED"},
+                ],
+                "NextToken": "t",
+            },
+        )
+        stub.add_response(
+            "list_accounts",
+            {
+                "Accounts": [
+                    {"Id": "111111111111", "Name": "mgmt", "Status": "ACTIVE"},
+                    {"Id": "444444444444", "Name": "prod", "Status": "ACTIVE"},
+                ]
+            },
+            {"NextToken": "t"},
+        )
+        accounts = list_member_accounts(StubSession({"organizations": client}), exclude=["444444444444"])
+    assert accounts == [Account("111111111111", "mgmt"), Account("222222222222", "dev")]
+
+
+def test_role_sessions_assume_once_per_account_and_reuse_base_account():
+    sts = _client("sts")
+    base = StubSession({"sts": sts})
+    _set_account_id(base, "111111111111")
+    expiration = datetime.now(UTC) + timedelta(hours=1)
+    with Stubber(sts) as stub:
+        stub.add_response(
+            "assume_role",
+            _credentials(expiration),
+            {
+                "RoleArn": "arn:aws:iam::222222222222:role/CleanupRole",
+                "RoleSessionName": "costcutter",
+                "DurationSeconds": 900,
+                "ExternalId": "ext",
+            },
+        )
+        sessions = RoleSessions(base, role_name="CleanupRole", duration_seconds=900, external_id="ext")
+        member = sessions.get("222222222222")
+        assert sessions.get("222222222222") is member
+        assert sessions.get("111111111111") is base
+    assert sessions.assumed == 1
+    assert _get_account_id(member) == "222222222222"
+    creds = member.get_credentials().get_frozen_credentials()
+    assert (creds.access_key, creds.token) == ("AKIDASSUMED00000000", "token")
+
+
+def test_role_sessions_refresh_expiring_credentials():
+    sts = _client("sts")
+    base = StubSession({"sts": sts})
+    _set_account_id(base, "111111111111")
+    with Stubber(sts) as stub:
+        # Already inside botocore's refresh window, so the first use assumes the role again
+        stub.add_response("assume_role", _credentials(datetime.now(UTC) + timedelta(minutes=5)))
+        fresh = _credentials(datetime.now(UTC) + timedelta(hours=1))
+        fresh["Credentials"]["AccessKeyId"] = "AKIDREFRESHED000000"
+        stub.add_response("assume_role", fresh)
+        sessions = RoleSessions(base)
+        member = sessions.get("222222222222")
+        assert member.get_credentials().get_frozen_credentials().access_key == "AKIDREFRESHED000000"
+    assert sessions.assumed == 2
+
+
+def test_account_ids_are_cached_per_session():
+    first, second = StubSession({}), StubSession({})
+    _set_account_id(first, "111111111111")
+    _set_account_id(second, "222222222222")
+    assert (_get_account_id(first), _get_account_id(second)) == ("111111111111", "222222222222")
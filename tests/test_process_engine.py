@@ -0,0 +1,144 @@
+import os
+import threading
+
+import pytest
+
+from costcutter.core.dag import ResourceHandler
+from costcutter.core.journal import Journal
+from costcutter.core.organizations import Account
+from costcutter.orchestrator import RESOURCE_HANDLERS, RunSettings, _run_threaded
+from costcutter.process_engine import _EventForwarder, run_sharded
+from costcutter.progress import RunProgress
+from costcutter.reporter import Reporter
+
+REGIONS = ("us-east-1", "eu-west-1", "ap-south-1")
+
+
+class FakeSession:
+    region_name = "us-east-1"
+
+
+def _instances(session, region, dry_run, scheduler):
+    from costcutter.reporter import get_reporter
+
+    for n in range(250):
+        get_reporter().record(
+            region,
+            "ec2",
+            "instance",
+            "catalog",
+            arn=f"arn:aws:ec2:{region}:123456789012:instance/i-{n}",
+            meta={"status": "discovered", "dry_run": dry_run},
+        )
+
+
+def _key_pairs(session, region, dry_run, scheduler):
+    from costcutter.reporter import get_reporter
+
+    get_reporter().record(region, "ec2", "key_pair", "catalog", arn=None, meta={"n": 1})
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.process_engine.create_aws_session", lambda config: FakeSession())
+    monkeypatch.setattr("costcutter.process_engine.setup_logging", lambda config: None)
+    monkeypatch.setitem(
+        RESOURCE_HANDLERS,
+        "ec2",
+        {"instances": ResourceHandler(_instances), "key_pairs": ResourceHandler(_key_pairs, ("instances",))},
+    )
+    settings = RunSettings(
+        dry_run=True,
+        service_keys=("ec2",),
+        nodes_by_region={r: ["ec2.instances", "ec2.key_pairs"] for r in REGIONS},
+        max_workers=2,
+    )
+    return reporter, settings
+
+
+def _comparable(reporter):
+    return sorted((e.region, e.resource, e.arn or "", tuple(sorted(e.meta.items()))) for e in reporter.snapshot())
+
+
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_process_engine_matches_thread_engine(fake_run):
+    reporter, settings = fake_run
+    config = {"aws": {"services": ["ec2"]}, "journal": {"enabled": False}}
+    progress = RunProgress()
+    progress.set_totals(dict.fromkeys(REGIONS, 2))
+    stats = run_sharded(
+        settings, config, [Account("123456789012")], max_processes=2, progress=progress, start_method="fork"
+    )
+    sharded = _comparable(reporter)
+    assert len(sharded) == 3 * 251
+    assert len(stats) == 3
+    assert sum(s["failed"] for s in stats) == 0
+    assert progress.snapshot() == dict.fromkeys(REGIONS, (2, 0, 2))
+
+    reporter.clear()
+    _run_threaded(settings, None, FakeSession(), [Account("123456789012")], 1, None, Journal(), None)
+    assert _comparable(reporter) == sharded
+
+
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_process_engine_returns_worker_spans(fake_run):
+    from costcutter.core.tracing import start_tracing, stop_tracing
+
+    _, settings = fake_run
+    config = {"aws": {"services": ["ec2"]}, "journal": {"enabled": False}}
+    start_tracing()
+    try:
+        stats = run_sharded(settings, config, [Account("123456789012")], max_processes=1, start_method="fork")
+    finally:
+        stop_tracing()
+    spans = [e for s in stats for e in s["trace_events"] if e["ph"] == "X"]
+    assert sorted(e["name"] for e in spans if e["cat"] == "shard") == [
+        f"shard 123456789012/{r}" for r in sorted(REGIONS)
+    ]
+    assert {e["pid"] for e in spans} != {os.getpid()}
+
+
+def test_spawned_workers_report_every_shard():
+    # No nodes to run: exercises pickling, worker start-up and the shard handshake
+    settings = RunSettings(
+        dry_run=True, service_keys=("ec2",), nodes_by_region={"us-east-1": [], "eu-west-1": []}, max_workers=1
+    )
+    config = {
+        "logging": {"enabled": False},
+        "aws": {"aws_access_key_id": "testing", "aws_secret_access_key": "testing"},
+        "journal": {"enabled": False},
+    }
+    stats = run_sharded(settings, config, [Account("123456789012")], max_processes=1)
+    assert [s["failed"] for s in stats] == [0, 0]
+
+
+def test_event_forwarder_batches_and_drops_sequence_numbers():
+    class Out:
+        def __init__(self):
+            self.messages = []
+
+        def put(self, msg):
+            self.messages.append(msg)
+
+    out = Out()
+    forwarder = _EventForwarder(out, batch_size=2, flush_interval=3600)
+    forwarder.put((7, 1, "r", "s", "res", "a", None, {}))
+    assert out.messages == []
+    forwarder.put((8, 2, "r", "s", "res", "a", None, {}))
+    forwarder.put((9, 3, "r", "s", "res", "a", None, {}))
+    forwarder.flush()
+    assert [len(batch) for _, batch in out.messages] == [2, 1]
+    assert out.messages[0][1][0] == (1, "r", "s", "res", "a", None, {})
+
+
+def test_reporter_ingest_keeps_timestamps_and_notifies():
+    reporter = Reporter()
+    wake = threading.Event()
+    reporter.subscribe(wake)
+    reporter.ingest([(1_700_000_000_000_000, "us-east-1", "ec2", "instance", "catalog", None, {"k": "v"})])
+    assert wake.is_set()
+    (event,) = reporter.snapshot()
+    assert event.timestamp.startswith("2023-11-14T22:13:20")
+    assert event.meta == {"k": "v"}
@@ -0,0 +1,40 @@
+import threading
+
+from costcutter.core.dag import DagExecutor
+from costcutter.progress import RunProgress
+
+
+def test_run_progress_counts_and_notifies():
+    progress = RunProgress()
+    wake = threading.Event()
+    progress.subscribe(wake)
+    progress.set_totals({"us-east-1": 2, "eu-west-1": 1})
+    assert wake.is_set()
+    wake.clear()
+    progress.advance("us-east-1")
+    progress.advance("us-east-1", failed=True)
+    assert wake.is_set()
+    assert progress.snapshot() == {"us-east-1": (2, 1, 2), "eu-west-1": (0, 0, 1)}
+    progress.unsubscribe(wake)
+    wake.clear()
+    progress.advance("eu-west-1")
+    assert not wake.is_set()
+
+
+def test_dag_reports_every_node_to_progress():
+    progress = RunProgress()
+    progress.set_totals({"r1": 3})
+
+    def run_node(region, node):
+        if node == "a":
+            raise RuntimeError("boom")
+
+    DagExecutor(
+        {"a": (), "b": ("a",), "c": ()},
+        ["r1"],
+        run_node,
+        max_workers=2,
+        on_node_done=lambda region, node, status: progress.advance(region, failed=status != "completed"),
+    ).run()
+    # a failed, b blocked, c completed
+    assert progress.snapshot() == {"r1": (3, 2, 3)}
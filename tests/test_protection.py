@@ -0,0 +1,147 @@
+import pytest
+
+from costcutter.conf.config import Config
+from costcutter.core.protection import ProtectionIndex
+
+ARN = "arn:aws:ec2:us-east-1:123456789012:instance/i-0123456789abcdef0"
+
+
+def test_exact_arns_and_prefix_patterns():
+    index = ProtectionIndex([ARN, "arn:aws:ec2:us-east-1:123456789012:key-pair/key-ci*", "arn:aws:s3:::tfstate-*"])
+    assert index.reason(ARN) == ARN
+    assert index.reason(ARN[:-1] + "1") is None
+    assert index.reason("arn:aws:ec2:us-east-1:123456789012:key-pair/key-ci") == (
+        "arn:aws:ec2:us-east-1:123456789012:key-pair/key-ci*"
+    )
+    assert index.reason("arn:aws:ec2:us-east-1:123456789012:key-pair/key-c") is None
+    assert index.reason("arn:aws:s3:::tfstate-prod") == "arn:aws:s3:::tfstate-*"
+    assert index.reason("arn:aws:s3:::other") is None
+    assert len(index) == 3
+
+
+def test_patterns_sharing_a_prefix_split_the_trie():
+    patterns = ["arn:aws:ec2:*:*:key-pair/bastion-*", "arn:aws:ec2:eu-*", "arn:aws:ec2:eu-west-1:1*", "arn:*/x"]
+    index = ProtectionIndex(patterns)
+    assert index.reason("arn:aws:ec2:eu-central-1:9:instance/i-1") == "arn:aws:ec2:eu-*"
+    assert index.reason("arn:aws:ec2:ap-south-1:9:key-pair/bastion-1") == patterns[0]
+    assert index.reason("arn:aws:ec2:us-east-1:9:key-pair/basti") is None
+    assert index.reason("arn:aws:ec2:us-east-1:9:instance/x") == "arn:*/x"
+    assert index.reason("arn:aws:ec2:us-east-1:9:instance/xy") is None
+
+
+def test_region_and_account_wildcards_and_mid_string_wildcards():
+    index = ProtectionIndex([
+        "arn:aws:ec2:*:123456789012:key-pair/ci-deploy",
+        "arn:aws:ec2:us-east-1:*:instance/i-0abc*",
+        "arn:aws:ec2:us-?ast-1:123456789012:instance/i-*-keep",
+    ])
+    assert index.reason("arn:aws:ec2:eu-west-1:123456789012:key-pair/ci-deploy") == (
+        "arn:aws:ec2:*:123456789012:key-pair/ci-deploy"
+    )
+    assert index.reason("arn:aws:ec2:eu-west-1:210987654321:key-pair/ci-deploy") is None
+    assert index.reason("arn:aws:ec2:us-east-1:210987654321:instance/i-0abcdef") is not None
+    assert index.reason("arn:aws:ec2:us-west-2:210987654321:instance/i-0abcdef") is None
+    assert index.reason("arn:aws:ec2:us-east-1:123456789012:instance/i-1-keep") is not None
+    assert index.reason("arn:aws:ec2:us-east-1:123456789012:instance/i-1-keep2") is None
+
+
+def test_tag_rules_protect_the_arns_discovery_notes():
+    index = ProtectionIndex(tags={"protected": "*", "role": ["bastion", "ci"]})
+    assert index.has_tag_rules
+    assert index.note(ARN, {"Name": "web", "role": "web"}) is None
+    assert index.reason(ARN) is None
+    assert index.note(ARN, {"role": "ci"}) == "tag:role=ci"
+    assert index.reason(ARN) == "tag:role=ci"
+    assert index.tag_reason({"protected": ""}) == "tag:protected"
+    assert not ProtectionIndex().has_tag_rules
+
+
+def test_from_config_reads_the_rules_file(tmp_path):
+    path = tmp_path / "protected.txt"
+    path.write_text(f"# bastions\n{ARN}\n\narn:aws:ec2:*:*:key-pair/ci-*\ntag:keep\ntag:team = platform\n")
+    config = Config({"protection": {"arns": ["arn:aws:s3:::state"], "tags": {"owner": ["sre"]}, "file": str(path)}})
+    index = ProtectionIndex.from_config(config)
+    assert len(index) == 6
+    assert index.reason(ARN) == ARN
+    assert index.reason("arn:aws:ec2:us-east-1:1:key-pair/ci-1") == "arn:aws:ec2:*:*:key-pair/ci-*"
+    assert index.tag_reason({"team": "platform"}) == "tag:team=platform"
+    assert index.tag_reason({"keep": "no"}) == "tag:keep"
+    assert index.tag_reason({"owner": "sre"}) == "tag:owner=sre"
+    assert len(ProtectionIndex.from_config(Config({}))) == 0
+
+
+@pytest.mark.parametrize("discovery", ["describe", "tagging"])
+def test_protected_resources_are_reported_and_kept(monkeypatch, discovery):
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=10, key_pairs=3, page_size=4)
+    # The tagging API only lists tagged resources
+    for n in range(3):
+        fake.tag("us-east-1", f"key-{n:017x}", owner="ci")
+    fake.tag("us-east-1", "i-00000000000000003", protected="yes")
+    protected_arn = "arn:aws:ec2:us-east-1:123456789012:instance/i-00000000000000005"
+    config = Config({
+        **_fake_config(fake.regions, discovery=discovery).to_dict(),
+        "protection": {"arns": [protected_arn, "arn:aws:ec2:*:*:key-pair/key-*2"], "tags": {"protected": "*"}},
+    })
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 2, "key_pairs": 1}
+    rules = {e.arn: e.meta["rule"] for e in reporter.snapshot() if e.action == "protected"}
+    assert rules == {
+        protected_arn: protected_arn,
+        "arn:aws:ec2:us-east-1:123456789012:instance/i-00000000000000003": "tag:protected",
+        "arn:aws:ec2:us-east-1:123456789012:key-pair/key-00000000000000002": "arn:aws:ec2:*:*:key-pair/key-*2",
+    }
+    assert reporter.counts()[("ec2", "instance", "delete")] == 8
+
+
+def test_protected_resources_complete_the_journal_and_the_inventory(monkeypatch, tmp_path):
+    import json
+
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=3, key_pairs=2)
+    fake.tag("us-east-1", "i-00000000000000001", protected="yes")
+    journal_path = tmp_path / "journal.jsonl"
+    config = Config({
+        **_fake_config(fake.regions).to_dict(),
+        "protection": {"arns": ["arn:aws:ec2:*:*:key-pair/key-*1"], "tags": {"protected": "*"}},
+        "journal": {"enabled": True, "path": str(journal_path)},
+        "inventory": {"enabled": True, "path": str(tmp_path / "inv.db")},
+    })
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False, incremental=True)
+    assert fake.remaining() == {"instances": 1, "key_pairs": 1}
+    entries = [json.loads(line) for line in journal_path.read_text().splitlines()]
+    assert sorted(e["arn"].rsplit("/", 1)[1] for e in entries if e["state"] == "skipped") == [
+        "i-00000000000000001",
+        "key-00000000000000001",
+    ]
+    assert sorted(e["node"] for e in entries if e["state"] == "node_done") == [
+        "us-east-1/ec2.instances",
+        "us-east-1/ec2.key_pairs",
+    ]
+    # The next incremental run leaves the unchanged protected resources alone
+    reporter.clear()
+    summary = orchestrate_services(dry_run=False, incremental=True)
+    assert summary["unchanged"] == 2
+    assert not [e for e in reporter.snapshot() if e.action == "protected"]
+    # Lifting a tag protection is a change, so the instance is handled again
+    fake.untag("us-east-1", "i-00000000000000001", "protected")
+    orchestrate_services(dry_run=False, incremental=True)
+    assert fake.remaining() == {"instances": 0, "key_pairs": 1}
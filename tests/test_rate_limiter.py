@@ -0,0 +1,114 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.paginate import TokenEncoder
+from botocore.stub import Stubber
+
+from costcutter.core import rate_limiter
+from costcutter.core.rate_limiter import AdaptiveLimiter, ThrottledError, is_throttle_error
+
+
+def _throttle():
+    return ClientError({"Error": {"Code": "RequestLimitExceeded", "Message": "slow down"}}, "TerminateInstances")
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(_throttle())
+    assert not is_throttle_error(ClientError({"Error": {"Code": "UnauthorizedOperation"}}, "X"))
+    assert not is_throttle_error(ValueError())
+
+
+def test_aimd_window_halves_on_throttle_and_grows_on_success():
+    limiter = AdaptiveLimiter(rate=1000, burst=1000, max_concurrency=8)
+    with pytest.raises(ThrottledError), limiter.limit("us-east-1", "TerminateInstances"):
+        raise _throttle()
+    bucket = limiter._buckets[("", "us-east-1", "TerminateInstances")]
+    assert bucket.window == 4
+    for _ in range(4):
+        bucket.tokens = 1000
+        with limiter.limit("us-east-1", "TerminateInstances"):
+            pass
+    assert 4 < bucket.window < 6
+    # Other regions and actions keep their own window
+    with limiter.limit("eu-west-1", "TerminateInstances"):
+        pass
+    assert limiter._buckets[("", "eu-west-1", "TerminateInstances")].window == 8
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_accounts_have_their_own_buckets():
+    limiter = AdaptiveLimiter(rate=1000, burst=1000, max_concurrency=8)
+    with pytest.raises(ThrottledError), limiter.limit("us-east-1", "TerminateInstances", "111111111111"):
+        raise _throttle()
+    assert limiter._buckets[("111111111111", "us-east-1", "TerminateInstances")].window == 4
+    # A throttle in one member account does not slow down another
+    assert limiter.call("us-east-1", "TerminateInstances", lambda: "ok", account="222222222222") == "ok"
+    assert limiter._buckets[("222222222222", "us-east-1", "TerminateInstances")].window == 8
+
+
+def test_acquire_times_out_when_window_is_full():
+    limiter = AdaptiveLimiter(rate=1000, burst=1000, max_concurrency=1)
+    assert limiter.acquire("r", "A", timeout=0.01)
+    assert not limiter.acquire("r", "A", timeout=0.01)
+    limiter.release("r", "A")
+    assert limiter.acquire("r", "A", timeout=0.01)
+
+
+def test_token_bucket_limits_burst():
+    limiter = AdaptiveLimiter(rate=0.5, burst=2, max_concurrency=10)
+    assert limiter.acquire("r", "A", timeout=0)
+    assert limiter.acquire("r", "A", timeout=0)
+    assert not limiter.acquire("r", "A", timeout=0.01)
+
+
+def test_paginate_resumes_after_throttle(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backoff", lambda attempt: None)
+    calls = []
+
+    class Paginator:
+        def paginate(self, PaginationConfig):  # noqa: N803
+            calls.append(dict(PaginationConfig))
+            start = PaginationConfig.get("StartingToken")
+            if start is None:
+                yield {"Items": [1], "NextToken": "t1"}
+                raise _throttle()
+            yield {"Items": [2]}
+
+    limiter = AdaptiveLimiter(rate=1000, burst=1000)
+    pages = list(limiter.paginate("r", "List", Paginator(), PaginationConfig={"PageSize": 1}))
+    assert [p["Items"] for p in pages] == [[1], [2]]
+    assert calls == [{"PageSize": 1}, {"PageSize": 1, "StartingToken": TokenEncoder().encode({"NextToken": "t1"})}]
+
+
+def test_paginate_resumes_a_botocore_paginator_after_a_mid_pagination_throttle(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backoff", lambda attempt: None)
+    client = boto3.client("ec2", region_name="us-east-1", aws_access_key_id="testing", aws_secret_access_key="testing")
+    # EC2 tokens are themselves base64 JSON, which botocore must not mistake for one of its own
+    token = "eyJ2IjoiMiIsImMiOiJhYmMiLCJzIjoxfQ=="
+    first = {"MaxResults": 5}
+    resumed = {"MaxResults": 5, "NextToken": token}
+    with Stubber(client) as stub:
+        stub.add_response("describe_instances", {"Reservations": [{"ReservationId": "r-1"}], "NextToken": token}, first)
+        stub.add_client_error("describe_instances", "RequestLimitExceeded", expected_params=resumed)
+        stub.add_response("describe_instances", {"Reservations": [{"ReservationId": "r-2"}]}, resumed)
+        limiter = AdaptiveLimiter(rate=1000, burst=1000)
+        pages = limiter.paginate(
+            "us-east-1",
+            "DescribeInstances",
+            client.get_paginator("describe_instances"),
+            PaginationConfig={"PageSize": 5},
+        )
+        assert [p["Reservations"][0]["ReservationId"] for p in pages] == ["r-1", "r-2"]
+        stub.assert_no_pending_responses()
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_call_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backoff", lambda attempt: None)
+    limiter = AdaptiveLimiter(rate=1000, burst=1000)
+
+    def always_throttled():
+        raise _throttle()
+
+    with pytest.raises(ThrottledError):
+        limiter.call("r", "A", always_throttled)
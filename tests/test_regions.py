@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+
+from costcutter.core import regions as regions_mod
+from costcutter.core.clients import get_client_registry
+from costcutter.core.regions import RegionInfo, resolve_regions
+
+ACCOUNT = "111111111111"
+
+
+class EC2Client:
+    def __init__(self, session):
+        self.session = session
+
+    def describe_regions(self, **kwargs):
+        self.session.describe_calls += 1
+        if self.session.fail:
+            raise RuntimeError("denied")
+        return {"Regions": [{"RegionName": r} for r in self.session.enabled]}
+
+
+class DummySession:
+    region_name = "us-east-1"
+
+    def __init__(self, profile_name="dev", enabled=("us-east-1", "eu-west-1"), fail=False):
+        self.profile_name = profile_name
+        self.enabled = enabled
+        self.fail = fail
+        self.describe_calls = 0
+        self.available_calls = 0
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return EC2Client(self)
+
+    def get_available_regions(self, service):
+        self.available_calls += 1
+        return ["us-east-1", "eu-west-1", "ap-east-1"]
+
+
+def setup_function(_):
+    get_client_registry().clear()
+
+
+def test_usable_checks_enabled_regions_and_allows_unknown_availability():
+    info = RegionInfo(enabled={"us-east-1", "eu-west-1"}, available={"svc": {"us-east-1"}, "unknown": set()})
+    assert info.usable("svc", "us-east-1")
+    assert not info.usable("svc", "eu-west-1")
+    assert info.usable("unknown", "eu-west-1")
+    assert info.usable("other", "eu-west-1")
+    assert not info.usable("unknown", "ap-east-1")
+    assert RegionInfo(enabled=None, available={}).usable("svc", "ap-east-1")
+
+
+def test_resolve_regions_caches_between_runs(tmp_path):
+    path = tmp_path / "regions.json"
+    first = resolve_regions(DummySession(), ACCOUNT, ["ec2"], cache_path=path)
+    assert first.enabled == {"us-east-1", "eu-west-1"}
+    assert not first.from_cache
+    assert not first.usable("ec2", "ap-east-1")
+    assert first.usable("ec2", "eu-west-1")
+
+    session = DummySession()
+    second = resolve_regions(session, ACCOUNT, ["ec2"], cache_path=path)
+    assert second.from_cache
+    assert second.available == first.available
+    assert session.describe_calls == 0
+    assert session.available_calls == 0
+    assert list(json.loads(path.read_text())) == [ACCOUNT]
+
+
+def test_concurrent_accounts_all_land_in_the_cache(tmp_path, monkeypatch):
+    path = tmp_path / "regions.json"
+    accounts = [f"{n:012d}" for n in range(8)]
+    start = threading.Barrier(len(accounts))
+    load = regions_mod._load_cache
+
+    def slow_load(p):
+        # Widen the window between reading the file and replacing it
+        data = load(p)
+        time.sleep(0.01)
+        return data
+
+    monkeypatch.setattr(regions_mod, "_load_cache", slow_load)
+
+    def resolve(account):
+        start.wait()
+        resolve_regions(DummySession(), account, ["ec2"], cache_path=path)
+
+    threads = [threading.Thread(target=resolve, args=(a,)) for a in accounts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(json.loads(path.read_text())) == accounts
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_resolve_regions_keys_the_cache_by_account(tmp_path):
+    path = tmp_path / "regions.json"
+    resolve_regions(DummySession(profile_name="dev"), ACCOUNT, ["ec2"], cache_path=path)
+    # Another profile for the same account reuses the entry
+    same = resolve_regions(DummySession(profile_name="ci"), ACCOUNT, ["ec2"], cache_path=path)
+    assert same.from_cache
+    # The same profile pointing at another account does not
+    session = DummySession(profile_name="dev", enabled=("us-east-1",))
+    other = resolve_regions(session, "222222222222", ["ec2"], cache_path=path)
+    assert not other.from_cache
+    assert other.enabled == {"us-east-1"}
+    assert session.describe_calls == 1
+
+
+def test_resolve_regions_refreshes_after_ttl(tmp_path, monkeypatch):
+    path = tmp_path / "regions.json"
+    resolve_regions(DummySession(), ACCOUNT, ["ec2"], cache_path=path, ttl_seconds=60)
+    later = time.time() + 120
+    monkeypatch.setattr(regions_mod.time, "time", lambda: later)
+    session = DummySession(enabled=("us-east-1",))
+    info = resolve_regions(session, ACCOUNT, ["ec2"], cache_path=path, ttl_seconds=60)
+    assert not info.from_cache
+    assert info.enabled == {"us-east-1"}
+    assert session.describe_calls == 1
+
+
+def test_resolve_regions_fetches_only_missing_services(tmp_path):
+    path = tmp_path / "regions.json"
+    resolve_regions(DummySession(), ACCOUNT, ["ec2"], cache_path=path)
+    session = DummySession()
+    info = resolve_regions(session, ACCOUNT, ["ec2", "s3"], cache_path=path)
+    assert set(info.available) == {"ec2", "s3"}
+    assert session.available_calls == 1
+    assert session.describe_calls == 0
+
+
+def test_unknown_enabled_regions_are_not_cached(tmp_path):
+    path = tmp_path / "regions.json"
+    info = resolve_regions(DummySession(fail=True), ACCOUNT, ["ec2"], cache_path=path)
+    assert info.enabled is None
+    assert info.usable("ec2", "ap-east-1")
+    assert not path.exists()
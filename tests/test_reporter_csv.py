@@ -1,3 +1,5 @@
+import threading
+from datetime import datetime
 from pathlib import Path
 
 from costcutter.reporter import Reporter
@@ -23,7 +25,7 @@ def test_reporter_write_csv(tmp_path: Path):
     # header + 2 rows
     assert len(content) == 3
     header = content[0].split(",")
-    assert header == ["timestamp", "region", "service", "resource", "action", "arn", "meta"]
+    assert header == ["timestamp", "region", "service", "resource", "action", "arn", "meta", "account"]
 
     # append mode
     r.record(
@@ -37,3 +39,68 @@ def test_reporter_write_csv(tmp_path: Path):
     r.write_csv(out_file, overwrite=False)
     content2 = out_file.read_text().strip().splitlines()
     assert len(content2) == 4  # one more row, header not duplicated
+
+
+def test_reporter_tail_counts_and_version():
+    r = Reporter(tail_size=3)
+    assert r.version == 0
+    for i in range(5):
+        r.record(region="us-east-1", service="ec2", resource="instance", action="delete", arn=f"arn:{i}")
+    r.record(region="us-east-1", service="ec2", resource="key_pair", action="delete")
+    assert r.version == 6
+    assert r.count() == 6
+    assert [e.arn for e in r.tail()] == ["arn:3", "arn:4", None]
+    assert [e.arn for e in r.tail(2)] == ["arn:4", None]
+    assert r.counts() == {("ec2", "instance", "delete"): 5, ("ec2", "key_pair", "delete"): 1}
+    r.clear()
+    assert r.tail() == []
+    assert r.counts() == {}
+    assert r.version == 7
+
+
+def test_event_store_round_trips_events():
+    r = Reporter()
+    r.record("us-east-1", "ec2", "instance", "catalog", arn="arn:1", meta={"status": "discovered", "dry_run": True})
+    r.record("us-east-1", "ec2", "instance", "terminate", arn="arn:1", meta={"status": "failed", "error": "boom"})
+    r.record("eu-west-1", "ec2", "key_pair", "delete", meta={"dry_run": 1, "ids": ["a", "b"]})
+    r.record("eu-west-1", "ec2", "key_pair", "delete")
+
+    events = r.snapshot()
+    assert [e.meta for e in events] == [
+        {"status": "discovered", "dry_run": True},
+        {"status": "failed", "error": "boom"},
+        {"dry_run": 1, "ids": ["a", "b"]},
+        {},
+    ]
+    assert events[0].meta["dry_run"] is True
+    assert events[2].meta["dry_run"] == 1 and events[2].meta["dry_run"] is not True
+    assert [(e.region, e.resource, e.action, e.arn) for e in events][2] == ("eu-west-1", "key_pair", "delete", None)
+    assert datetime.fromisoformat(events[0].timestamp).tzinfo is not None
+    assert list(r.iter()) == events
+    assert r.to_dicts()[1]["meta"] == {"status": "failed", "error": "boom"}
+
+
+def test_reporter_record_is_thread_safe_and_ordered():
+    r = Reporter()
+    threads_n, per_thread = 8, 2000
+    barrier = threading.Barrier(threads_n)
+
+    def work(t):
+        barrier.wait()
+        for i in range(per_thread):
+            r.record("us-east-1", "ec2", f"res-{t}", "delete", arn=str(i))
+            if i % 500 == 0:
+                r.count()  # merges concurrently with recording
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(threads_n)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    events = r.snapshot()
+    assert r.count() == len(events) == threads_n * per_thread
+    for t in range(threads_n):
+        assert [int(e.arn) for e in events if e.resource == f"res-{t}"] == list(range(per_thread))
+    assert sum(r.counts().values()) == threads_n * per_thread
+    assert r.version == threads_n * per_thread
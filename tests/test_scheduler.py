@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from costcutter.core.scheduler import InflightLimit, RequeueTask, Scheduler, scheduler_scope
+
+
+class ConcurrencyProbe:
+    """Records peak concurrency overall and per region while tasks sleep."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = Counter()
+        self.peak = Counter()
+
+    def __call__(self, region):
+        with self.lock:
+            self.active[region] += 1
+            self.active["*"] += 1
+            for key in (region, "*"):
+                self.peak[key] = max(self.peak[key], self.active[key])
+        time.sleep(0.01)
+        with self.lock:
+            self.active[region] -= 1
+            self.active["*"] -= 1
+
+
+def test_global_cap_across_regions():
+    probe = ConcurrencyProbe()
+    with Scheduler(max_workers=3) as sched:
+        futures = [sched.submit(probe, r, region=r, service="ec2") for r in ["a", "b", "c", "d"] * 5]
+        for f in futures:
+            f.result()
+    assert probe.peak["*"] == 3
+    assert sched.peak_inflight == 3
+
+
+def test_per_region_limit():
+    probe = ConcurrencyProbe()
+    with Scheduler(max_workers=4, region_limit=1) as sched:
+        futures = [sched.submit(probe, r, region=r, service="ec2") for r in ["a", "b"] * 6]
+        for f in futures:
+            f.result()
+    assert probe.peak["a"] == 1
+    assert probe.peak["b"] == 1
+    assert probe.peak["*"] == 2
+
+
+def test_shared_limit_caps_calls_across_schedulers():
+    probe = ConcurrencyProbe()
+    shared = InflightLimit(3)
+    with Scheduler(max_workers=2, shared=shared) as one, Scheduler(max_workers=2, shared=shared) as two:
+        futures = [sched.submit(probe, r, region=r, service="ec2") for sched, r in [(one, "a"), (two, "b")] * 10]
+        # Discovery slots draw from the same limit
+        with one.slot("a", "ec2"), two.slot("b", "ec2"):
+            pass
+        for f in futures:
+            f.result(timeout=5)
+    assert probe.peak["*"] == 3
+    assert probe.peak["a"] == 2
+    assert probe.peak["b"] == 2
+
+
+def test_slot_counts_against_cap():
+    with Scheduler(max_workers=1) as sched:
+        started = threading.Event()
+        with sched.slot("a", "ec2"):
+            fut = sched.submit(started.set, region="a", service="ec2")
+            # The only slot is held by the caller, so the task cannot start yet
+            assert not started.wait(timeout=0.05)
+        fut.result(timeout=5)
+        assert started.is_set()
+
+
+def test_map_starts_before_discovery_finishes():
+    first_done = threading.Event()
+
+    def producer():
+        yield 1
+        # The second "page" is only requested once the first item was handled
+        assert first_done.wait(timeout=5)
+        yield 2
+
+    with Scheduler(max_workers=1) as sched:
+        assert sched.map(sched.iter_limited(producer(), "a", "ec2"), lambda i: first_done.set(), "a", "ec2") == 2
+
+
+def test_submit_applies_backpressure():
+    release = threading.Event()
+    produced = []
+
+    def producer():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    sched = Scheduler(max_workers=1, max_pending=2)
+    t = threading.Thread(target=sched.map, args=(producer(), lambda i: release.wait(timeout=5), "a", "ec2"))
+    t.start()
+    # The producer may only run ahead by the running task plus the pending bound
+    t.join(timeout=0.2)
+    assert len(produced) <= 4
+    release.set()
+    t.join(timeout=5)
+    sched.shutdown()
+    assert produced == list(range(10))
+
+
+def test_map_reraises_first_error():
+    def worker(item):
+        raise RuntimeError("boom")
+
+    with scheduler_scope(None) as sched, pytest.raises(RuntimeError, match="boom"):
+        sched.map(iter([1, 2, 3]), worker, "a", "ec2")
+
+
+def test_requeued_task_runs_retry(monkeypatch):
+    attempts = []
+
+    def task():
+        attempts.append("first")
+        raise RequeueTask("throttled", delay=0.01, retry=lambda: attempts.append("retry") or "done")
+
+    with Scheduler(max_workers=2) as sched:
+        fut = sched.submit(task, region="a", service="ec2")
+        assert fut.result(timeout=5) == "done"
+    assert attempts == ["first", "retry"]
+    assert sched.requeued == 1
+
+
+def test_requeue_gives_up_after_limit(monkeypatch):
+    monkeypatch.setattr("costcutter.core.scheduler.MAX_REQUEUES", 2)
+
+    def task():
+        raise RequeueTask("still throttled", delay=0)
+
+    with Scheduler(max_workers=1) as sched:
+        fut = sched.submit(task, region="a", service="ec2")
+        with pytest.raises(RequeueTask):
+            fut.result(timeout=5)
+    assert sched.requeued == 2
@@ -0,0 +1,173 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from costcutter.conf.config import Config
+from costcutter.core.selection import ResourceFields, Selection, tag_map
+from costcutter.services.ec2.instances import SELECTION_FIELDS as INSTANCE_FIELDS
+from costcutter.services.ec2.key_pairs import SELECTION_FIELDS as KEY_PAIR_FIELDS
+
+NOW = datetime(2025, 6, 1, tzinfo=UTC)
+
+
+def _instance(name, state="running", days=30, **tags):
+    return {
+        "InstanceId": name,
+        "State": {"Name": state},
+        "LaunchTime": NOW - timedelta(days=days),
+        "Tags": [{"Key": k, "Value": v} for k, v in {"Name": name, **tags}.items()],
+    }
+
+
+def test_from_config_normalizes_tag_values():
+    selection = Selection.from_config(
+        Config({"selection": {"tags": {"env": ["dev", "test"], "owner": "*", "team": None}, "min_age_days": 2}})
+    )
+    assert selection.tags == (("env", ("dev", "test")), ("owner", ("*",)), ("team", ()))
+    assert selection.min_age_days == 2.0
+    assert not Selection.from_config(Config({}))
+    assert not Selection.from_config(Config({"selection": {"tags": {}, "instance_states": []}}))
+
+
+def test_empty_selection_compiles_to_nothing():
+    compiled = Selection().compile(INSTANCE_FIELDS)
+    assert (compiled.filters, compiled.predicate) == ([], None)
+    items = [_instance("a")]
+    assert list(compiled.select(items)) == items
+
+
+def test_instance_rules_become_filters_where_ec2_supports_them():
+    selection = Selection(
+        tags=(("env", ("dev",)), ("owner", ())), states=("running", "stopped"), name_patterns=("ci-*",)
+    )
+    compiled = selection.compile(INSTANCE_FIELDS)
+    assert compiled.filters == [
+        {"Name": "tag:env", "Values": ["dev"]},
+        {"Name": "tag:owner", "Values": ["*"]},
+        {"Name": "instance-state-name", "Values": ["running", "stopped"]},
+        {"Name": "tag:Name", "Values": ["ci-*"]},
+    ]
+    assert compiled.predicate is None
+
+
+def test_age_exclusions_and_unfilterable_rules_run_as_python_checks():
+    selection = Selection(
+        tags=(("Name", ("ci-*",)),),
+        exclude_tags=(("keep", ()), ("env", ("prod*",))),
+        min_age_days=7,
+        name_patterns=("ci-web-?",),
+    )
+    compiled = selection.compile(INSTANCE_FIELDS, now=NOW)
+    # The Name tag filter is taken by the tag rule, so name patterns are checked locally
+    assert compiled.filters == [{"Name": "tag:Name", "Values": ["ci-*"]}]
+    items = [
+        _instance("ci-web-1"),
+        _instance("ci-web-2", days=1),
+        _instance("ci-web-3", keep="yes"),
+        _instance("ci-web-4", env="production"),
+        _instance("ci-web-10"),
+        _instance("ci-web-5", env="dev"),
+    ]
+    assert [i["InstanceId"] for i in compiled.select(items)] == ["ci-web-1", "ci-web-5"]
+
+
+def test_state_rules_without_a_filter_are_checked_and_match_nothing_without_a_state():
+    fields = ResourceFields(name_of=lambda i: i["InstanceId"], state_of=lambda i: i["State"]["Name"])
+    compiled = Selection(states=("stopped",)).compile(fields)
+    assert compiled.filters == []
+    assert [i["InstanceId"] for i in compiled.select([_instance("a"), _instance("b", "stopped")])] == ["b"]
+    compiled = Selection(states=("stopped",)).compile(KEY_PAIR_FIELDS)
+    assert compiled.unsupported == ("instance_states",)
+    assert list(compiled.select([{"KeyName": "ci"}])) == []
+
+
+def test_key_pair_names_are_filters_and_unknown_ages_are_kept():
+    compiled = Selection(name_patterns=("tmp-*",), min_age_days=1).compile(KEY_PAIR_FIELDS, now=NOW)
+    assert compiled.filters == [{"Name": "key-name", "Values": ["tmp-*"]}]
+    key_pairs = [
+        {"KeyName": "tmp-1", "CreateTime": "2025-05-01T00:00:00Z"},
+        {"KeyName": "tmp-2", "CreateTime": NOW.isoformat()},
+        {"KeyName": "tmp-3"},
+    ]
+    assert [k["KeyName"] for k in compiled.select(key_pairs)] == ["tmp-1"]
+
+
+def test_tagging_filters_only_when_the_tagging_api_can_apply_every_rule():
+    selection = Selection(tags=(("env", ("dev", "test")), ("owner", ("*",))), exclude_tags=(("keep", ()),))
+    assert selection.tagging_filters() == [{"Key": "env", "Values": ["dev", "test"]}, {"Key": "owner"}]
+    assert selection.exclusion()(tag_map(_instance("a", keep="")))
+    assert Selection(tags=(("env", ("dev*",)),)).tagging_filters() is None
+    assert Selection(states=("running",)).tagging_filters() is None
+    assert Selection().exclusion() is None
+
+
+@pytest.mark.parametrize("discovery", ["describe", "tagging"])
+def test_selected_run_deletes_only_matching_resources(monkeypatch, discovery):
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=40, key_pairs=4, page_size=10)
+    ids = [f"i-{n:017x}" for n in range(40)]
+    for instance_id in ids[:20]:
+        fake.tag("us-east-1", instance_id, team="ci")
+    fake.tag("us-east-1", ids[0], keep="true")
+    fake.tag("us-east-1", "key-00000000000000000", team="ci")
+    config = Config({
+        **_fake_config(fake.regions, discovery=discovery).to_dict(),
+        "selection": {"tags": {"team": "ci"}, "exclude_tags": {"keep": "*"}},
+    })
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.core.selection.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 21, "key_pairs": 3}
+    assert reporter.counts()[("ec2", "instance", "terminate")] == 19
+    if discovery == "describe":
+        # Only the 20 tagged instances were listed: two pages instead of four
+        assert fake.calls["DescribeInstances"] == 2
+    else:
+        assert fake.calls["DescribeInstances"] == 0
+
+
+def test_state_rules_leave_key_pairs_alone(monkeypatch, caplog):
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=2, key_pairs=3)
+    config = Config({**_fake_config(fake.regions).to_dict(), "selection": {"instance_states": ["running"]}})
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.core.selection.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    assert fake.remaining() == {"instances": 0, "key_pairs": 3}
+    assert fake.calls["DescribeKeyPairs"] == 0
+    assert "key pairs cannot be selected by instance_states" in caplog.text
+
+
+def test_tagging_discovery_falls_back_to_describe_for_rules_it_cannot_apply(monkeypatch, caplog):
+    from fake_aws import FakeAWS
+    from test_orchestrator import _fake_config
+
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=6, page_size=10)
+    fake.set_created("us-east-1", "i-00000000000000000", datetime.now(UTC))
+    config = Config({**_fake_config(fake.regions, discovery="tagging").to_dict(), "selection": {"min_age_days": 1}})
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.core.selection.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    assert fake.remaining()["instances"] == 1
+    assert fake.calls["GetResources"] == 0
+    assert "ignoring aws.discovery: tagging" in caplog.text
@@ -0,0 +1,49 @@
+import csv
+import gzip
+import json
+import time
+
+from costcutter.reporter import Reporter
+from costcutter.sinks import CsvSink, JsonlSink
+
+
+def _record(reporter, n):
+    for i in range(n):
+        reporter.record("us-east-1", "ec2", "instance", "delete", arn=f"arn:{i}", meta={"status": "executing"})
+
+
+def test_reporter_streams_csv_and_gzipped_jsonl(tmp_path):
+    r = Reporter()
+    r.add_sink(CsvSink(tmp_path / "events.csv"), batch_size=2, flush_interval=60)
+    r.add_sink(JsonlSink(tmp_path / "events.jsonl.gz"), batch_size=2, flush_interval=60)
+    _record(r, 5)
+    paths = r.close_sinks()
+    assert paths == [tmp_path / "events.csv", tmp_path / "events.jsonl.gz"]
+
+    rows = list(csv.DictReader((tmp_path / "events.csv").open()))
+    assert [row["arn"] for row in rows] == [f"arn:{i}" for i in range(5)]
+    assert rows[0]["meta"] == "status=executing"
+
+    with gzip.open(tmp_path / "events.jsonl.gz", "rt") as fh:
+        events = [json.loads(line) for line in fh]
+    assert [e["arn"] for e in events] == [f"arn:{i}" for i in range(5)]
+    assert events[0]["meta"] == {"status": "executing"}
+
+
+def test_background_writer_flushes_before_close(tmp_path):
+    r = Reporter()
+    writer = r.add_sink(JsonlSink(tmp_path / "events.jsonl"), batch_size=1000, flush_interval=0.05)
+    _record(r, 3)
+    deadline = time.monotonic() + 2
+    while writer.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Already on disk while the sink is still open
+    assert len((tmp_path / "events.jsonl").read_text().splitlines()) == 3
+    r.close_sinks()
+
+
+def test_empty_csv_sink_still_writes_header(tmp_path):
+    r = Reporter()
+    r.add_sink(CsvSink(tmp_path / "empty.csv"))
+    r.close_sinks()
+    assert (tmp_path / "empty.csv").read_text().startswith("timestamp,region")
@@ -0,0 +1,105 @@
+import json
+import threading
+
+import pytest
+
+from costcutter.core import tracing
+from costcutter.core.tracing import span, start_tracing, stop_tracing, traced
+
+
+@pytest.fixture
+def tracer():
+    tracer = start_tracing()
+    yield tracer
+    stop_tracing()
+
+
+@traced("cleanup", service="ec2", resource="thing")
+def cleanup_things(session, region, dry_run=True):
+    if dry_run is None:
+        raise ValueError("boom")
+    return region
+
+
+@traced("catalog", service="ec2", resource="thing")
+def catalog_things(session, region):
+    yield from ("a", "b", "c")
+
+
+def test_spans_are_noops_while_tracing_is_off():
+    assert tracing.get_tracer() is None
+    assert span("x", region="r") is span("y")
+    assert cleanup_things(None, "us-east-1") == "us-east-1"
+    assert list(catalog_things(None, region="us-east-1")) == ["a", "b", "c"]
+
+
+def test_traced_functions_record_region_thread_and_errors(tracer):
+    cleanup_things(None, "us-east-1")
+    worker = threading.Thread(target=lambda: cleanup_things(None, region="eu-west-1"), name="worker-1")
+    worker.start()
+    worker.join()
+    with pytest.raises(ValueError):
+        cleanup_things(None, "ap-south-1", dry_run=None)
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    assert [(s["name"], s["args"]["region"]) for s in spans] == [
+        ("cleanup_things", "us-east-1"),
+        ("cleanup_things", "eu-west-1"),
+        ("cleanup_things", "ap-south-1"),
+    ]
+    assert spans[0]["tid"] != spans[1]["tid"]
+    assert spans[1]["args"] == {"region": "eu-west-1", "service": "ec2", "resource": "thing"}
+    assert spans[2]["args"]["error"] == "ValueError"
+    names = {e["tid"]: e["args"]["name"] for e in tracer.events() if e["ph"] == "M"}
+    assert names[spans[1]["tid"]] == "worker-1"
+
+
+def test_traced_generators_span_their_items(tracer):
+    items = catalog_things(None, "us-east-1")
+    assert len(tracer) == 0
+    assert next(items) == "a"
+    items.close()
+    assert list(catalog_things(None, "us-east-1")) == ["a", "b", "c"]
+    first, second = (e for e in tracer.events() if e["ph"] == "X")
+    assert (first["args"]["items"], second["args"]["items"]) == (1, 3)
+    assert "error" not in first["args"]
+
+
+def test_trace_file_is_chrome_trace_json(tracer, tmp_path):
+    with span("ec2.instances", "node", region="us-east-1") as args:
+        args["note"] = "done"
+    data = json.loads(tracer.write(tmp_path / "trace.json").read_text())
+    (event,) = [e for e in data["traceEvents"] if e["ph"] == "X"]
+    assert event["cat"] == "node"
+    assert event["dur"] >= 0
+    assert event["args"] == {"region": "us-east-1", "note": "done"}
+
+
+def test_orchestrated_run_is_traced(monkeypatch, tracer):
+    from fake_aws import FakeAWS
+
+    from costcutter.conf.config import Config
+    from costcutter.orchestrator import orchestrate_services
+    from costcutter.reporter import Reporter
+
+    fake = FakeAWS(instances=150, key_pairs=2, page_size=100)
+    config = Config({
+        "aws": {"services": ["ec2"], "region": ["us-east-1"], "max_workers": 2},
+        "journal": {"enabled": False},
+    })
+    monkeypatch.setattr("costcutter.reporter._reporter", Reporter())
+    monkeypatch.setattr("costcutter.orchestrator.get_config", lambda: config)
+    monkeypatch.setattr("costcutter.orchestrator.create_aws_session", lambda cfg: fake.session())
+    orchestrate_services(dry_run=False)
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    names = {(s["cat"], s["name"]) for s in spans}
+    assert {
+        ("node", "ec2.instances"),
+        ("node", "ec2.key_pairs"),
+        ("catalog", "catalog_instance_records"),
+        ("catalog", "catalog_key_pair_records"),
+        ("cleanup", "cleanup_instances"),
+        ("cleanup", "cleanup_instance_batch"),
+        ("cleanup", "cleanup_key_pair"),
+    } <= names
+    assert sum(s["name"] == "cleanup_key_pair" for s in spans) == 2
+    assert all(s["args"]["region"] == "us-east-1" for s in spans)
@@ -0,0 +1,177 @@
+import os
+from datetime import UTC, date, datetime
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from costcutter.conf import config as config_mod
+from costcutter.core.clients import get_client_registry
+from costcutter.watch import BudgetsSource, CostExplorerSource, Spend, Trigger, run_watch
+
+
+class StubSession:
+    def __init__(self, client):
+        self._client = client
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return self._client
+
+
+def _client(service):
+    return boto3.client(service, region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    get_client_registry().clear()
+    yield
+    config_mod._settings = None
+
+
+def test_budgets_source_reads_actual_and_forecast(monkeypatch):
+    monkeypatch.setattr("costcutter.watch._get_account_id", lambda session: "123456789012")
+    client = _client("budgets")
+    with Stubber(client) as stub:
+        stub.add_response(
+            "describe_budget",
+            {
+                "Budget": {
+                    "BudgetName": "monthly",
+                    "BudgetLimit": {"Amount": "100.0", "Unit": "USD"},
+                    "TimeUnit": "MONTHLY",
+                    "BudgetType": "COST",
+                    "TimePeriod": {"Start": datetime(2026, 10, 1, tzinfo=UTC)},
+                    "CalculatedSpend": {
+                        "ActualSpend": {"Amount": "42.5", "Unit": "USD"},
+                        "ForecastedSpend": {"Amount": "120", "Unit": "USD"},
+                    },
+                }
+            },
+            {"AccountId": "123456789012", "BudgetName": "monthly"},
+        )
+        spend = BudgetsSource(StubSession(client), "monthly").fetch()
+    assert spend == Spend(actual=42.5, limit=100.0, forecast=120.0, unit="USD", period="2026-10")
+
+
+def _ce_day(day, amount):
+    return {
+        "TimePeriod": {"Start": day, "End": day},
+        "Total": {"UnblendedCost": {"Amount": str(amount), "Unit": "USD"}},
+        "Estimated": False,
+    }
+
+
+def test_cost_explorer_source_only_refetches_unsettled_days():
+    client = _client("ce")
+    today = [date(2026, 10, 5)]
+    source = CostExplorerSource(StubSession(client), limit=50, today=lambda: today[0])
+    base = {"Granularity": "DAILY", "Metrics": ["UnblendedCost"]}
+    with Stubber(client) as stub:
+        stub.add_response(
+            "get_cost_and_usage",
+            {"ResultsByTime": [_ce_day(f"2026-10-0{d}", d) for d in range(1, 6)]},
+            {**base, "TimePeriod": {"Start": "2026-10-01", "End": "2026-10-06"}},
+        )
+        # Days before 10-03 are settled and kept; only 10-03 onwards is asked again
+        stub.add_response(
+            "get_cost_and_usage",
+            {"ResultsByTime": [_ce_day("2026-10-03", 4), _ce_day("2026-10-04", 4), _ce_day("2026-10-05", 10)]},
+            {**base, "TimePeriod": {"Start": "2026-10-03", "End": "2026-10-06"}},
+        )
+        assert source.fetch().actual == 15
+        assert source.fetch().actual == 1 + 2 + 4 + 4 + 10
+        stub.assert_no_pending_responses()
+
+
+def test_trigger_fires_once_per_period():
+    trigger = Trigger(threshold_percent=80)
+    assert not trigger.check(Spend(actual=70, limit=100, period="2026-10"))
+    assert trigger.check(Spend(actual=85, limit=100, period="2026-10"))
+    assert not trigger.check(Spend(actual=95, limit=100, period="2026-10"))
+    assert trigger.check(Spend(actual=90, limit=100, period="2026-11"))
+    assert Trigger(use_forecast=True).check(Spend(actual=10, limit=100, forecast=130, period="x"))
+
+
+class StubSource:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def fetch(self):
+        return Spend(actual=self.values.pop(0), limit=100, period="2026-10")
+
+
+def test_run_watch_triggers_and_reloads_config_on_mtime_change(tmp_path):
+    cfg = tmp_path / "config.yaml"
+    cfg.write_text("logging:\n  enabled: false\nwatch:\n  interval_seconds: 7\n  threshold_percent: 90\n")
+    built = []
+    sleeps = []
+    runs = []
+
+    def factory(config, session):
+        built.append(config.watch.threshold_percent)
+        return source
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            # Lower the threshold and change the interval; the source settings stay the same
+            cfg.write_text("logging:\n  enabled: false\nwatch:\n  interval_seconds: 3\n  threshold_percent: 50\n")
+            os.utime(cfg, ns=(1, 1))
+
+    source = StubSource([10, 60, 60, 95])
+    fired = run_watch(
+        config_file=cfg,
+        dry_run=True,
+        max_polls=4,
+        sleep=sleep,
+        source_factory=factory,
+        orchestrate=lambda dry_run, discard_journal: runs.append(dry_run),
+        echo=lambda line: None,
+    )
+    # 60% only crosses the threshold after the reload; 95% is the same period, so no second run
+    assert fired == 1
+    assert runs == [True]
+    assert sleeps == [7, 7, 3]
+    assert built == [90]
+
+
+def test_run_watch_rearms_after_a_failed_cleanup_and_streams_each_run(tmp_path, monkeypatch):
+    from costcutter.reporter import Reporter
+
+    reporter = Reporter()
+    monkeypatch.setattr("costcutter.reporter._reporter", reporter)
+    events = tmp_path / "events.jsonl"
+    cfg = tmp_path / "config.yaml"
+    cfg.write_text(
+        "logging:\n  enabled: false\n"
+        f"reporting:\n  jsonl:\n    enabled: true\n    path: {events}\n"
+        "watch:\n  threshold_percent: 90\n"
+    )
+    runs = []
+
+    def orchestrate(dry_run, discard_journal):
+        runs.append(dry_run)
+        reporter.record("us-east-1", "ec2", "instance", "terminate", arn=f"arn-{len(runs)}")
+        if len(runs) == 1:
+            raise RuntimeError("throttled away")
+
+    lines = []
+    fired = run_watch(
+        config_file=cfg,
+        dry_run=True,
+        max_polls=3,
+        sleep=lambda seconds: None,
+        source_factory=lambda config, session: StubSource([95, 95, 95]),
+        orchestrate=orchestrate,
+        echo=lines.append,
+    )
+    # The failed cleanup does not use up the period; the second one succeeds and the third poll stays quiet
+    assert fired == 2
+    assert runs == [True, True]
+    assert "cleanup failed: throttled away" in lines
+    assert lines.count(f"events exported to: {events}") == 2
+    # Each run's events go to its own report and are cleared from the reporter afterwards
+    assert '"arn": "arn-2"' in events.read_text()
+    assert "arn-1" not in events.read_text()
+    assert reporter.count() == 0